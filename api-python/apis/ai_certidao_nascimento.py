@@ -1,12 +1,4 @@
-import os
-from dotenv import load_dotenv
-import json
-import fitz
-import tempfile
-from openai import OpenAI
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+from apis.ingestao import TipoDocumento, registrar_tipo_documento, processar_documento
 
 PROMPT_ANALISAR = """
 Você é um especialista em análise de documentos de registro civil, focado em certidões de nascimento. Sua tarefa é analisar a imagem enviada se é um documento de certidão de nascimento original, ANALISAR E IDENTIFICAR todos os dados relevantes de uma certidão de nascimento, VALIDAR esses dados e, em seguida, organizar em um objeto JSON apenas com os campos necessários, caso contrário retorne {"eh_certidao_valida": false, "motivos": ["Documento não é uma certidão de nascimento original."], "dados_organizados": {}}.
@@ -58,88 +50,21 @@ JSON
 }
 """
 
-def carregar_arquivos_para_vision(file_path: str):
-    input_content = []
-    ext = os.path.splitext(file_path)[1].lower()
-
-    if ext == ".pdf":
-        print(f"Processando PDF: {file_path}")
-        doc = fitz.open(file_path)
-
-        for page_num, page in enumerate(doc, start=1):
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-            image_bytes = pix.tobytes("png")
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                tmp_file.write(image_bytes)
-                tmp_file_path = tmp_file.name
-
-            with open(tmp_file_path, "rb") as f:
-                file_obj = client.files.create(file=f, purpose="vision")
-                input_content.append({"type": "input_image", "file_id": file_obj.id})
-
-            print(f"Página {page_num} convertida e enviada")
-
-            os.remove(tmp_file_path)
-    else:
-        print(f"Processando imagem: {file_path}")
-        with open(file_path, "rb") as f:
-            file_obj = client.files.create(file=f, purpose="vision")
-            input_content.append({"type": "input_image", "file_id": file_obj.id})
-
-    return input_content
-
-
-def analisar_com_ia(file_path: str):
-    imagens = carregar_arquivos_para_vision(file_path)
-
-    response = client.responses.create(
-        # model="gpt-5-nano",
-        model="gpt-5-mini",
-        input=[{
-            "role": "user",
-            "content": [
-                {"type": "input_text", "text": PROMPT_ANALISAR},
-                *imagens
-            ]
-        }]
-    )
-
-    raw_output = response.output_text
-    print("\nResposta bruta do GPT:\n", raw_output)
-
-    try:
-        result = json.loads(raw_output)
-    except json.JSONDecodeError:
-        result = {
-            "eh_certidao_valida": False,
-            "motivoErro": ["Erro: resposta não pôde ser convertida em JSON."],
-            "dados_organizados": {}
-        }
-
-    return result
-
-def processar_certidao_nascimento(file_path: str) -> dict:
-    try:
-        resultado_ia = analisar_com_ia(file_path)
-
-        if resultado_ia.get("eh_certidao_valida"):
-            status = "aprovado"
-            motivo_erro = None
-        else:
-            status = "reprovado"
-            motivo_erro = ", ".join(resultado_ia.get("motivoErro", ["Motivo não especificado."]))
+TIPO_CERTIDAO_NASCIMENTO = registrar_tipo_documento(TipoDocumento(
+    nome="certidao_nascimento",
+    rotulo="certidão de nascimento",
+    prompt=PROMPT_ANALISAR,
+    chave_validade="eh_certidao_valida",
+    esquema={
+        "nome_registrado": "string",
+        "data_nascimento": "data",
+        "local_nascimento": "string",
+        "filiacao": {"mae": "string", "pai": "string"},
+    },
+    opcionais=("filiacao.pai",),
+    max_paginas=2,
+))
 
-        return {
-            "status": status,
-            "dadosExtraidos": resultado_ia.get("dados_organizados", {}),
-            "motivoErro": motivo_erro
-        }
 
-    except Exception as e:
-        print(f"Erro crítico ao processar RG: {e}")
-        return {
-            "status": "erro",
-            "dadosExtraidos": {},
-            "motivoErro": f"Erro inesperado no módulo de IA: {str(e)}"
-        }
+def processar_certidao_nascimento(arquivo, nome_arquivo: str = None) -> dict:
+    return processar_documento(TIPO_CERTIDAO_NASCIMENTO, arquivo, nome_arquivo)
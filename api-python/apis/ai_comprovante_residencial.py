@@ -1,12 +1,8 @@
-import os
-from dotenv import load_dotenv
-import json
-import fitz
-import tempfile
-from openai import OpenAI
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+from apis.ingestao import TipoDocumento, registrar_tipo_documento, processar_documento
+from apis.templates import (
+    Template, CampoTemplate, registrar_template, somente_numeros, NA_MESMA_LINHA,
+    PADRAO_CPF, PADRAO_NOME, PADRAO_DATA, PADRAO_CEP, PADRAO_UF
+)
 
 PROMPT_ANALISAR = """
 Você é um especialista em análise de documentos de registro civil, focado em comprovante de residência. Sua tarefa é analisar a imagem enviada se é um documento de comprovante de residência, ANALISAR E IDENTIFICAR todos os dados relevantes de um comprovante de residência, VALIDAR esses dados e, em seguida, organizar em um objeto JSON apenas com os campos necessários, caso contrário retorne {"eh_comprovante_valido": false, "motivos": ["Documento não é um Comprovante de Residência original."], "dados_organizados": {}}
@@ -72,88 +68,68 @@ JSON
 }
 """
 
-def carregar_arquivos_para_vision(file_path: str):
-    input_content = []
-    ext = os.path.splitext(file_path)[1].lower()
-
-    if ext == ".pdf":
-        print(f"📄 Processando PDF: {file_path}")
-        doc = fitz.open(file_path)
-
-        for page_num, page in enumerate(doc, start=1):
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-            image_bytes = pix.tobytes("png")
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                tmp_file.write(image_bytes)
-                tmp_file_path = tmp_file.name
-
-            with open(tmp_file_path, "rb") as f:
-                file_obj = client.files.create(file=f, purpose="vision")
-                input_content.append({"type": "input_image", "file_id": file_obj.id})
-
-            print(f"✅ Página {page_num} convertida e enviada")
-
-            os.remove(tmp_file_path)
-    else:
-        print(f"🖼 Processando imagem: {file_path}")
-        with open(file_path, "rb") as f:
-            file_obj = client.files.create(file=f, purpose="vision")
-            input_content.append({"type": "input_image", "file_id": file_obj.id})
-
-    return input_content
-
-
-def analisar_com_ia(file_path: str):
-    imagens = carregar_arquivos_para_vision(file_path)
-
-    response = client.responses.create(
-        # model="gpt-5-nano",
-        model="gpt-5-mini",
-        input=[{
-            "role": "user",
-            "content": [
-                {"type": "input_text", "text": PROMPT_ANALISAR},
-                *imagens
-            ]
-        }]
-    )
-
-    raw_output = response.output_text
-    print("\nResposta bruta do GPT:\n", raw_output)
-
-    try:
-        result = json.loads(raw_output)
-    except json.JSONDecodeError:
-        result = {
-            "eh_comprovante_valido": False,
-            "motivoErro": ["Erro: resposta não pôde ser convertida em JSON."],
-            "dados_organizados": {}
-        }
-
-    return result
-
-def processar_comprovante_residencial(file_path: str) -> dict:
-    try:
-        resultado_ia = analisar_com_ia(file_path)
-
-        if resultado_ia.get("eh_comprovante_valido"):
-            status = "aprovado"
-            motivo_erro = None
-        else:
-            status = "reprovado"
-            motivo_erro = ", ".join(resultado_ia.get("motivoErro", ["Motivo não especificado."]))
-
-        return {
-            "status": status,
-            "dadosExtraidos": resultado_ia.get("dados_organizados", {}),
-            "motivoErro": motivo_erro
-        }
-
-    except Exception as e:
-        print(f"Erro crítico ao processar RG: {e}")
-        return {
-            "status": "erro",
-            "dadosExtraidos": {},
-            "motivoErro": f"Erro inesperado no módulo de IA: {str(e)}"
-        }
+TIPO_COMPROVANTE_RESIDENCIAL = registrar_tipo_documento(TipoDocumento(
+    nome="comprovante_residencial",
+    rotulo="comprovante de residência",
+    prompt=PROMPT_ANALISAR,
+    chave_validade="eh_comprovante_valido",
+    esquema={
+        "nome_titular": "string",
+        "rua_avenida": "string",
+        "numero_endereco": "string",
+        "bairro": "string",
+        "cidade": "string",
+        "estado_uf": "string",
+        "cep": "string",
+        "data_emissao": "data",
+        "empresa_emissora": "string",
+        "cpf_vinculado": "string",
+        "tipo_documento": "string",
+    },
+    opcionais=("cpf_vinculado",),
+    max_paginas=3,
+    aceita_camada_texto=True,
+))
+
+
+# Contas de concessionárias: endereço impresso como "RUA X, 123" seguido de "BAIRRO - CIDADE - UF" e do CEP
+LOGRADOURO = r"((?:RUA|R\.|AVENIDA|AV\.?|ALAMEDA|AL\.|TRAVESSA|TV\.|ESTRADA|RODOVIA|PRA[CÇ]A)\s+[^,\n]+?)\s*,\s*(?:N[ºo°]?\s*)?\d+"
+NUMERO = r"(?:RUA|R\.|AVENIDA|AV\.?|ALAMEDA|AL\.|TRAVESSA|TV\.|ESTRADA|RODOVIA|PRA[CÇ]A)\s+[^,\n]+?\s*,\s*(?:N[ºo°]?\s*)?(\d+)"
+BAIRRO = r"\n([^\n\d-]+?)\s+-\s+[^\n\d-]+?\s+-\s+[A-Z]{2}\b"
+CIDADE = r"\n[^\n\d-]+?\s+-\s+([^\n\d-]+?)\s+-\s+[A-Z]{2}\b"
+UF = r"\n[^\n\d-]+?\s+-\s+[^\n\d-]+?\s+-\s+" + PADRAO_UF
+
+CAMPOS_CONTA = {
+    "nome_titular": CampoTemplate(rotulo="Nome", caixa=NA_MESMA_LINHA, padrao=PADRAO_NOME),
+    "rua_avenida": CampoTemplate(padrao=LOGRADOURO),
+    "numero_endereco": CampoTemplate(padrao=NUMERO),
+    "bairro": CampoTemplate(padrao=BAIRRO),
+    "cidade": CampoTemplate(padrao=CIDADE),
+    "estado_uf": CampoTemplate(padrao=UF),
+    "cep": CampoTemplate(padrao=r"CEP\s*:?\s*" + PADRAO_CEP, conversor=somente_numeros),
+    "data_emissao": CampoTemplate(padrao=r"(?:Data\s+de\s+)?Emiss[aã]o\s*:?\s*" + PADRAO_DATA),
+    "cpf_vinculado": CampoTemplate(padrao=r"CPF\s*:?\s*" + PADRAO_CPF, conversor=somente_numeros),
+}
+
+registrar_template(Template(
+    nome="conta_energia_enel",
+    tipo_documento=TIPO_COMPROVANTE_RESIDENCIAL.nome,
+    ancoras=("Enel", "Conta de Energia"),
+    campos={
+        **CAMPOS_CONTA,
+        "empresa_emissora": CampoTemplate(padrao=r"(Enel Distribui[cç][aã]o [^\n,]+)"),
+    },
+    fixos={"tipo_documento": "conta de luz"},
+))
+
+registrar_template(Template(
+    nome="conta_agua_sabesp",
+    tipo_documento=TIPO_COMPROVANTE_RESIDENCIAL.nome,
+    ancoras=("Sabesp", "Consumo"),
+    campos=CAMPOS_CONTA,
+    fixos={"tipo_documento": "conta de água", "empresa_emissora": "Sabesp"},
+))
+
+
+def processar_comprovante_residencial(arquivo, nome_arquivo: str = None) -> dict:
+    return processar_documento(TIPO_COMPROVANTE_RESIDENCIAL, arquivo, nome_arquivo)
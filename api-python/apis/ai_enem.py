@@ -1,12 +1,7 @@
-import os
-from dotenv import load_dotenv
-import json
-import fitz
-import tempfile
-from openai import OpenAI
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+from apis.ingestao import TipoDocumento, registrar_tipo_documento, processar_documento
+from apis.templates import (
+    Template, CampoTemplate, registrar_template, somente_numeros, NA_MESMA_LINHA, PADRAO_CPF, PADRAO_NOME
+)
 
 PROMPT_ANALISAR = """
 Você é um especialista em análise de documentos educacionais brasileiros, focado em Boletins de Desempenho do ENEM.
@@ -60,88 +55,34 @@ Responda **apenas** em JSON no seguinte formato:
 }
 """
 
-def carregar_arquivos_para_vision(file_path: str):
-    input_content = []
-    ext = os.path.splitext(file_path)[1].lower()
-
-    if ext == ".pdf":
-        print(f"📄 Processando PDF: {file_path}")
-        doc = fitz.open(file_path)
-
-        for page_num, page in enumerate(doc, start=1):
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-            image_bytes = pix.tobytes("png")
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                tmp_file.write(image_bytes)
-                tmp_file_path = tmp_file.name
-
-            with open(tmp_file_path, "rb") as f:
-                file_obj = client.files.create(file=f, purpose="vision")
-                input_content.append({"type": "input_image", "file_id": file_obj.id})
-
-            print(f"✅ Página {page_num} convertida e enviada")
-
-            os.remove(tmp_file_path)
-    else:
-        print(f"🖼 Processando imagem: {file_path}")
-        with open(file_path, "rb") as f:
-            file_obj = client.files.create(file=f, purpose="vision")
-            input_content.append({"type": "input_image", "file_id": file_obj.id})
-
-    return input_content
-
-
-def analisar_com_ia(file_path: str):
-    imagens = carregar_arquivos_para_vision(file_path)
-
-    response = client.responses.create(
-        # model="gpt-5-nano",
-        model="gpt-5-mini",
-        input=[{
-            "role": "user",
-            "content": [
-                {"type": "input_text", "text": PROMPT_ANALISAR},
-                *imagens
-            ]
-        }]
-    )
-
-    raw_output = response.output_text
-    print("\nResposta bruta do GPT:\n", raw_output)
-
-    try:
-        result = json.loads(raw_output)
-    except json.JSONDecodeError:
-        result = {
-            "eh_certificado_reservista_valido": False,
-            "motivoErro": ["Erro: resposta não pôde ser convertida em JSON."],
-            "dados_organizados": {}
-        }
-
-    return result
-
-def processar_enem(file_path: str) -> dict:
-    try:
-        resultado_ia = analisar_com_ia(file_path)
-
-        if resultado_ia.get("eh_certificado_reservista_valido"):
-            status = "aprovado"
-            motivo_erro = None
-        else:
-            status = "reprovado"
-            motivo_erro = ", ".join(resultado_ia.get("motivoErro", ["Motivo não especificado."]))
-
-        return {
-            "status": status,
-            "dadosExtraidos": resultado_ia.get("dados_organizados", {}),
-            "motivoErro": motivo_erro
-        }
-
-    except Exception as e:
-        print(f"Erro crítico ao processar RG: {e}")
-        return {
-            "status": "erro",
-            "dadosExtraidos": {},
-            "motivoErro": f"Erro inesperado no módulo de IA: {str(e)}"
-        }
+TIPO_ENEM = registrar_tipo_documento(TipoDocumento(
+    nome="enem",
+    rotulo="boletim do ENEM",
+    prompt=PROMPT_ANALISAR,
+    chave_validade="eh_boletim_valido",
+    esquema={
+        "nome_participante": "string",
+        "cpf": "string",
+        "ano_enem": "integer",
+    },
+    opcionais=("cpf",),
+    max_paginas=3,
+    aceita_camada_texto=True,
+))
+
+
+# Boletim de Desempenho emitido pela Página do Participante do INEP
+registrar_template(Template(
+    nome="boletim_inep",
+    tipo_documento=TIPO_ENEM.nome,
+    ancoras=("INEP", "ENEM", "Inscrição", "Redação", "Matemática e suas Tecnologias"),
+    campos={
+        "nome_participante": CampoTemplate(rotulo="Nome", caixa=NA_MESMA_LINHA, padrao=PADRAO_NOME),
+        "cpf": CampoTemplate(padrao=r"CPF\s*:?\s*" + PADRAO_CPF, conversor=somente_numeros),
+        "ano_enem": CampoTemplate(padrao=r"ENEM\s*(\d{4})", conversor=int),
+    },
+))
+
+
+def processar_enem(arquivo, nome_arquivo: str = None) -> dict:
+    return processar_documento(TIPO_ENEM, arquivo, nome_arquivo)
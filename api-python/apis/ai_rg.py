@@ -1,12 +1,6 @@
-import os
-from dotenv import load_dotenv
-import json
-import fitz
-import tempfile
-from openai import OpenAI
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+from apis.ingestao import TipoDocumento, registrar_tipo_documento, processar_documento
+from apis.ocr import MapaOcr, registrar_mapa_ocr
+from apis.templates import somente_numeros
 
 PROMPT_ANALISAR_RG = """
 Você é um especialista em análise de documentos de identificação brasileiros (RGs).
@@ -71,88 +65,42 @@ Responda **somente em JSON**, no seguinte formato:
 }
 """
 
-def carregar_arquivos_para_vision(file_path: str):
-    input_content = []
-    ext = os.path.splitext(file_path)[1].lower()
-
-    if ext == ".pdf":
-        print(f"📄 Processando PDF: {file_path}")
-        doc = fitz.open(file_path)
-
-        for page_num, page in enumerate(doc, start=1):
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-            image_bytes = pix.tobytes("png")
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                tmp_file.write(image_bytes)
-                tmp_file_path = tmp_file.name
-
-            with open(tmp_file_path, "rb") as f:
-                file_obj = client.files.create(file=f, purpose="vision")
-                input_content.append({"type": "input_image", "file_id": file_obj.id})
-
-            print(f"✅ Página {page_num} convertida e enviada")
-
-            os.remove(tmp_file_path)
-    else:
-        print(f"🖼 Processando imagem: {file_path}")
-        with open(file_path, "rb") as f:
-            file_obj = client.files.create(file=f, purpose="vision")
-            input_content.append({"type": "input_image", "file_id": file_obj.id})
-
-    return input_content
-
-
-def analisar_com_ia(file_path: str):
-    imagens = carregar_arquivos_para_vision(file_path)
-
-    response = client.responses.create(
-        # model="gpt-5-nano",
-        model="gpt-5-mini",
-        input=[{
-            "role": "user",
-            "content": [
-                {"type": "input_text", "text": PROMPT_ANALISAR_RG},
-                *imagens
-            ]
-        }]
-    )
-
-    raw_output = response.output_text
-    print("\nResposta bruta do GPT:\n", raw_output)
-
-    try:
-        result = json.loads(raw_output)
-    except json.JSONDecodeError:
-        result = {
-            "eh_rg_valido": False,
-            "motivoErro": ["Erro: resposta não pôde ser convertida em JSON."],
-            "dados_organizados": {}
-        }
-
-    return result
-
-def processar_rg(file_path: str) -> dict:
-    try:
-        resultado_ia = analisar_com_ia(file_path)
-
-        if resultado_ia.get("eh_rg_valido"):
-            status = "aprovado"
-            motivo_erro = None
-        else:
-            status = "reprovado"
-            motivo_erro = ", ".join(resultado_ia.get("motivoErro", ["Motivo não especificado."]))
+TIPO_RG = registrar_tipo_documento(TipoDocumento(
+    nome="rg",
+    rotulo="RG",
+    prompt=PROMPT_ANALISAR_RG,
+    chave_validade="eh_rg_valido",
+    esquema={
+        "nome": "string",
+        "cpf": "string",
+        "data_nascimento": "data",
+        "registro_geral": "string",
+        "data_expedicao": "data",
+        "filiacao": {"mae": "string", "pai": "string"},
+        "naturalidade": "string",
+    },
+    opcionais=("cpf", "filiacao.pai"),
+    max_paginas=2,
+))
+
+# No RG os rótulos ficam acima dos valores: cada regex pega a linha seguinte ao rótulo (texto OCR em maiúsculas).
+# O OCR só pré-preenche os campos: a autenticidade (foto, assinatura, não ser impressão) exige a análise visual
+registrar_mapa_ocr(TIPO_RG.nome, MapaOcr(
+    ancoras=("REGISTRO GERAL", "TERRITÓRIO NACIONAL"),
+    campos={
+        "nome": r"^NOME\s*\n([A-ZÁÉÍÓÚÂÊÔÃÕÇ' ]{5,})$",
+        "filiacao.pai": r"FILIA[CÇ][AÃ]O\s*\n([A-ZÁÉÍÓÚÂÊÔÃÕÇ' ]{5,})$",
+        "filiacao.mae": r"FILIA[CÇ][AÃ]O\s*\n[^\n]+\n([A-ZÁÉÍÓÚÂÊÔÃÕÇ' ]{5,})$",
+        "naturalidade": r"NATURALIDADE[^\n]*\n([A-ZÁÉÍÓÚÂÊÔÃÕÇ' .]+-\s*[A-Z]{2})\b",
+        "data_nascimento": r"DATA DE NASCIMENTO[^\n]*\n(?:[^\n]*?)(\d{2}/\d{2}/\d{4})",
+        "registro_geral": r"REGISTRO GERAL[^\n]*?(\d{1,2}\.?\d{3}\.?\d{3}-?[\dX])",
+        "data_expedicao": r"(?:DATA DE EXPEDI[CÇ][AÃ]O|EXPEDI[CÇ][AÃ]O)[^\n]*?(\d{2}/\d{2}/\d{4})",
+        "cpf": r"CPF[^\n]*?(\d{3}\.?\d{3}\.?\d{3}[-/]?\d{2})",
+    },
+    conversores={"cpf": somente_numeros},
+    dispensa_ia=False,
+))
 
-        return {
-            "status": status,
-            "dadosExtraidos": resultado_ia.get("dados_organizados", {}),
-            "motivoErro": motivo_erro
-        }
 
-    except Exception as e:
-        print(f"Erro crítico ao processar RG: {e}")
-        return {
-            "status": "erro",
-            "dadosExtraidos": {},
-            "motivoErro": f"Erro inesperado no módulo de IA: {str(e)}"
-        }
+def processar_rg(arquivo, nome_arquivo: str = None) -> dict:
+    return processar_documento(TIPO_RG, arquivo, nome_arquivo)
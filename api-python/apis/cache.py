@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CACHE_ATIVO = os.getenv('CACHE_EXTRACAO_ATIVO', 'true').lower() == 'true'
+CACHE_DB_PATH = os.getenv('CACHE_EXTRACAO_DB', os.path.join(tempfile.gettempdir(), 'cache_extracao.sqlite3'))
+CACHE_TTL = int(os.getenv('CACHE_EXTRACAO_TTL', str(7 * 24 * 3600)))
+CACHE_MAX_ENTRADAS = int(os.getenv('CACHE_EXTRACAO_MAX_ENTRADAS', '5000'))
+
+CACHE_UPLOADS_ATIVO = os.getenv('CACHE_UPLOADS_ATIVO', 'true').lower() == 'true'
+CACHE_UPLOADS_TTL = int(os.getenv('CACHE_UPLOADS_TTL', str(24 * 3600)))
+# Tempo extra antes de apagar um upload expirado, para não remover arquivos de requisições em andamento
+CACHE_UPLOADS_MARGEM = int(os.getenv('CACHE_UPLOADS_MARGEM', '600'))
+CACHE_UPLOADS_INTERVALO_LIMPEZA = int(os.getenv('CACHE_UPLOADS_INTERVALO_LIMPEZA', '900'))
+
+CACHE_AUDITORIA_ATIVO = os.getenv('CACHE_AUDITORIA_ATIVO', 'true').lower() == 'true'
+CACHE_AUDITORIA_TTL = int(os.getenv('CACHE_AUDITORIA_TTL', str(30 * 24 * 3600)))
+
+
+def hash_conteudo(conteudo: bytes) -> str:
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def abrir_banco(caminho):
+    # Uma conexão por processo; o acesso entre threads é serializado pelo lock de cada armazém
+    conn = sqlite3.connect(caminho, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class CacheResultados:
+    """
+    Cache local de resultados de extração, com expiração por TTL e
+    remoção dos itens menos acessados (LRU) quando passa de `max_entradas`.
+    """
+
+    def __init__(self, caminho=CACHE_DB_PATH, ttl=CACHE_TTL, max_entradas=CACHE_MAX_ENTRADAS):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._conn = abrir_banco(caminho)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS resultados (
+                chave TEXT PRIMARY KEY,
+                resultado TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_resultados_acesso ON resultados (acessado_em)")
+
+    @staticmethod
+    def montar_chave(hash_arquivo, tipo_documento, versao_prompt):
+        return f"{hash_arquivo}:{tipo_documento}:{versao_prompt}"
+
+    def obter(self, chave):
+        agora = time.time()
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT resultado FROM resultados WHERE chave = ? AND criado_em >= ?",
+                (chave, agora - self.ttl)
+            ).fetchone()
+            if not linha:
+                return None
+            self._conn.execute("UPDATE resultados SET acessado_em = ? WHERE chave = ?", (agora, chave))
+        return json.loads(linha[0])
+
+    def salvar(self, chave, resultado):
+        agora = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resultados (chave, resultado, criado_em, acessado_em) VALUES (?, ?, ?, ?)",
+                (chave, json.dumps(resultado, ensure_ascii=False), agora, agora)
+            )
+            self._remover_excedentes(agora)
+
+    def _remover_excedentes(self, agora):
+        self._conn.execute("DELETE FROM resultados WHERE criado_em < ?", (agora - self.ttl,))
+        self._conn.execute("""
+            DELETE FROM resultados WHERE chave IN (
+                SELECT chave FROM resultados ORDER BY acessado_em DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entradas,))
+
+
+class CacheUploads:
+    """
+    Mapeia o hash de uma imagem de página para o file_id já enviado à OpenAI,
+    permitindo reaproveitar uploads e apagar os que expiraram.
+    """
+
+    def __init__(self, caminho=CACHE_DB_PATH, ttl=CACHE_UPLOADS_TTL, margem=CACHE_UPLOADS_MARGEM):
+        self.ttl = ttl
+        self.margem = margem
+        self._lock = threading.Lock()
+        self._conn = abrir_banco(caminho)
+        # Indexado por file_id: uploads concorrentes da mesma imagem ficam registrados e são limpos depois
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                file_id TEXT PRIMARY KEY,
+                hash_imagem TEXT NOT NULL,
+                criado_em REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_uploads_hash ON uploads (hash_imagem, criado_em)")
+
+    def obter(self, hash_imagem):
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT file_id FROM uploads WHERE hash_imagem = ? AND criado_em >= ? ORDER BY criado_em DESC LIMIT 1",
+                (hash_imagem, time.time() - self.ttl)
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def salvar(self, hash_imagem, file_id):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (file_id, hash_imagem, criado_em) VALUES (?, ?, ?)",
+                (file_id, hash_imagem, time.time())
+            )
+
+    def remover_expirados(self, apagar_remoto):
+        """Apaga no provedor e no cache os uploads que passaram do TTL mais a margem"""
+        with self._lock:
+            expirados = [linha[0] for linha in self._conn.execute(
+                "SELECT file_id FROM uploads WHERE criado_em < ?",
+                (time.time() - self.ttl - self.margem,)
+            ).fetchall()]
+
+        removidos = 0
+        for file_id in expirados:
+            try:
+                apagar_remoto(file_id)
+            except Exception as e:
+                # 404: outro processo já apagou o arquivo; demais erros ficam para a próxima limpeza
+                if getattr(e, "status_code", None) != 404:
+                    print(f"Aviso: não foi possível apagar upload {file_id}: {e}")
+                    continue
+            with self._lock:
+                self._conn.execute("DELETE FROM uploads WHERE file_id = ?", (file_id,))
+            removidos += 1
+        return removidos
+
+    def iniciar_limpeza(self, apagar_remoto, intervalo=CACHE_UPLOADS_INTERVALO_LIMPEZA):
+        def loop():
+            while True:
+                try:
+                    removidos = self.remover_expirados(apagar_remoto)
+                    if removidos:
+                        print(f"🧹 {removidos} uploads expirados removidos")
+                except Exception as e:
+                    print(f"Erro na limpeza de uploads expirados: {e}")
+                time.sleep(intervalo)
+
+        threading.Thread(target=loop, name="limpeza-uploads", daemon=True).start()
+
+
+class CacheAuditoria:
+    """
+    Última auditoria de cada matrícula: impressão das entradas de cada regra e os findings gerados,
+    para a próxima verificação reavaliar só as regras cujos documentos mudaram.
+    """
+
+    def __init__(self, caminho=CACHE_DB_PATH, ttl=CACHE_AUDITORIA_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = abrir_banco(caminho)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS auditorias (
+                matricula_id INTEGER PRIMARY KEY,
+                impressoes TEXT NOT NULL,
+                findings TEXT NOT NULL,
+                atualizado_em REAL NOT NULL
+            )
+        """)
+
+    def obter(self, matricula_id):
+        """Retorna (impressões por regra, findings por regra) ou (None, None)"""
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT impressoes, findings FROM auditorias WHERE matricula_id = ? AND atualizado_em >= ?",
+                (matricula_id, time.time() - self.ttl)
+            ).fetchone()
+        if not linha:
+            return None, None
+        return json.loads(linha[0]), json.loads(linha[1])
+
+    def salvar(self, matricula_id, impressoes, findings):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO auditorias (matricula_id, impressoes, findings, atualizado_em) VALUES (?, ?, ?, ?)",
+                (matricula_id, json.dumps(impressoes), json.dumps(findings, ensure_ascii=False), time.time())
+            )
+            self._conn.execute("DELETE FROM auditorias WHERE atualizado_em < ?", (time.time() - self.ttl,))
+
+
+cache_resultados = CacheResultados() if CACHE_ATIVO else None
+cache_uploads = CacheUploads() if CACHE_UPLOADS_ATIVO else None
+cache_auditoria = CacheAuditoria() if CACHE_AUDITORIA_ATIVO else None
@@ -0,0 +1,49 @@
+import os
+import fitz
+from dotenv import load_dotenv
+from apis.renderizacao import pagina_eh_fotografica
+
+load_dotenv()
+
+# PDFs gerados digitalmente (boletim do INEP, contas, certificados do gov.br) já trazem o texto:
+# mandar esse texto à IA é bem mais barato e rápido do que rasterizar e enviar imagens
+CAMADA_TEXTO_ATIVA = os.getenv('CAMADA_TEXTO_ATIVA', 'true').lower() == 'true'
+# Mínimo de caracteres visíveis por página para considerar que a camada de texto cobre o documento
+TEXTO_MIN_CARACTERES_PAGINA = int(os.getenv('TEXTO_MIN_CARACTERES_PAGINA', '200'))
+TEXTO_MAX_CARACTERES = int(os.getenv('TEXTO_MAX_CARACTERES', '20000'))
+# Fontes com codificação quebrada geram texto "lixo"; abaixo dessa fração de letras/dígitos o texto é descartado
+TEXTO_MIN_FRACAO_LEGIVEL = float(os.getenv('TEXTO_MIN_FRACAO_LEGIVEL', '0.6'))
+
+
+def texto_legivel(texto: str) -> bool:
+    visiveis = [c for c in texto if not c.isspace()]
+    if not visiveis:
+        return False
+    legiveis = sum(1 for c in visiveis if c.isalnum() or c in ".,:;/-()ºª°$%")
+    return legiveis / len(visiveis) >= TEXTO_MIN_FRACAO_LEGIVEL
+
+
+def extrair_camada_texto(conteudo: bytes, nome_arquivo: str = None):
+    """
+    Retorna o texto do PDF quando todas as páginas têm camada de texto suficiente; caso contrário None.
+    Páginas escaneadas (cobertas por imagem) ficam de fora: o texto delas, se existir, vem de OCR de terceiros.
+    """
+    if not CAMADA_TEXTO_ATIVA or os.path.splitext(nome_arquivo or "")[1].lower() != ".pdf":
+        return None
+
+    try:
+        with fitz.open(stream=conteudo, filetype="pdf") as doc:
+            paginas = []
+            for page in doc:
+                texto = page.get_text("text", sort=True).strip()
+                if len("".join(texto.split())) < TEXTO_MIN_CARACTERES_PAGINA or pagina_eh_fotografica(page):
+                    return None
+                paginas.append(texto)
+    except Exception as e:
+        print(f"Aviso: não foi possível ler a camada de texto de {nome_arquivo}: {e}")
+        return None
+
+    texto = "\n\n".join(f"--- Página {i + 1} ---\n{t}" for i, t in enumerate(paginas))
+    if len(texto) > TEXTO_MAX_CARACTERES or not texto_legivel(texto):
+        return None
+    return texto
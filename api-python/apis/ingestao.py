@@ -0,0 +1,561 @@
+import os
+import asyncio
+import base64
+import hashlib
+import mimetypes
+import threading
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from dotenv import load_dotenv
+import json
+import fitz
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from apis.renderizacao import renderizar_pagina, otimizar_imagem
+from apis.camada_texto import extrair_camada_texto
+from apis.templates import extrair_com_template
+from apis.ocr import ocr_disponivel, reconhecer_paginas, extrair_com_ocr, montar_dica
+from apis.validadores import validar_contra_esquema, validar_dados, VERSAO_REGRAS
+from apis.triagem import triar_arquivo, resultado_triagem, TRIAGEM_MAX_PAGINAS, TRIAGEM_MAX_PIXELS
+from apis.cache import CacheResultados, cache_resultados, cache_uploads, hash_conteudo
+
+load_dotenv()
+
+MODELO_PADRAO = os.getenv('OPENAI_MODELO_EXTRACAO', 'gpt-5-mini')
+# Ex: "gpt-5-nano,gpt-5-mini": tenta o modelo barato e só escala quando a resposta não passa na validação
+MODELOS_CASCATA = [m.strip() for m in os.getenv('OPENAI_MODELOS_CASCATA', '').split(',') if m.strip()]
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '120'))
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+OPENAI_MAX_CONEXOES = int(os.getenv('OPENAI_MAX_CONEXOES', '20'))
+# Imagens vão embutidas (data URL) na própria chamada quando o total cabe neste limite
+IMAGENS_INLINE = os.getenv('OPENAI_IMAGENS_INLINE', 'true').lower() == 'true'
+LIMITE_INLINE_BYTES = int(os.getenv('OPENAI_LIMITE_INLINE_BYTES', str(4 * 1024 * 1024)))
+UPLOAD_THREADS = int(os.getenv('OPENAI_UPLOAD_THREADS', '4'))
+
+# Pools compartilhados por todos os documentos em processamento no processo.
+# O render fica numa única thread: o PyMuPDF não suporta uso concorrente (nem com Documents separados)
+# e não libera o GIL, então várias threads só arriscavam travar o interpretador sem ganhar tempo.
+# O ganho vem de enviar cada página enquanto a seguinte é renderizada.
+executor_render = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+executor_uploads = ThreadPoolExecutor(max_workers=UPLOAD_THREADS, thread_name_prefix="upload")
+
+# Cliente único para todos os tipos de documento, com pool de conexões compartilhado
+client = OpenAI(
+    api_key=os.getenv('OPENAI_API_KEY'),
+    timeout=OPENAI_TIMEOUT,
+    max_retries=OPENAI_MAX_RETRIES,
+    http_client=DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONEXOES,
+            max_keepalive_connections=OPENAI_MAX_CONEXOES
+        )
+    )
+)
+
+# Versão assíncrona usada pelo pipeline asyncio (pipeline_async.py)
+async_client = AsyncOpenAI(
+    api_key=os.getenv('OPENAI_API_KEY'),
+    timeout=OPENAI_TIMEOUT,
+    max_retries=OPENAI_MAX_RETRIES,
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONEXOES,
+            max_keepalive_connections=OPENAI_MAX_CONEXOES
+        )
+    )
+)
+
+if cache_uploads is not None:
+    cache_uploads.iniciar_limpeza(client.files.delete)
+
+
+@dataclass(frozen=True)
+class TipoDocumento:
+    """Tudo o que diferencia um tipo de documento no pipeline de extração"""
+    nome: str
+    rotulo: str
+    prompt: str
+    # Chave booleana do JSON da IA que indica se o documento é válido (ex: "eh_rg_valido")
+    chave_validade: str
+    # Campos esperados em "dados_organizados": "string", "data" (DD/MM/AAAA), "integer" ou "boolean"
+    esquema: dict
+    modelo: str = MODELO_PADRAO
+    # Campos do esquema que podem vir nulos sem indicar extração ruim (ex: "filiacao.pai")
+    opcionais: tuple = ()
+    # Limites da triagem: acima deles o arquivo é reprovado sem render nem chamada à IA
+    max_paginas: int = TRIAGEM_MAX_PAGINAS
+    max_pixels: int = TRIAGEM_MAX_PIXELS
+    # Só documentos nascidos digitais dispensam a imagem; RG, certidão e histórico exigem conferência visual
+    # (foto, assinatura, "não é um PDF de texto") e nunca passam pela camada de texto
+    aceita_camada_texto: bool = False
+
+    @property
+    def modelos(self) -> list:
+        return MODELOS_CASCATA or [self.modelo]
+
+    @property
+    def versao_prompt(self) -> str:
+        # Qualquer mudança no prompt, nos modelos ou nas regras de validação invalida os resultados em cache
+        chave = f"{','.join(self.modelos)}\n{VERSAO_REGRAS}\n{self.prompt}"
+        return hashlib.sha256(chave.encode("utf-8")).hexdigest()[:12]
+
+
+TIPOS_DOCUMENTO = {}
+
+
+def registrar_tipo_documento(tipo: TipoDocumento) -> TipoDocumento:
+    TIPOS_DOCUMENTO[tipo.nome] = tipo
+    return tipo
+
+
+def obter_tipo_documento(tipo) -> TipoDocumento:
+    return tipo if isinstance(tipo, TipoDocumento) else TIPOS_DOCUMENTO[tipo]
+
+
+def ler_arquivo(arquivo, nome_arquivo: str = None):
+    """Normaliza caminho, bytes ou file-like para (bytes, nome_arquivo)"""
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, "rb") as f:
+            return f.read(), nome_arquivo or os.fspath(arquivo)
+    if hasattr(arquivo, "read"):
+        return arquivo.read(), nome_arquivo
+    return bytes(arquivo), nome_arquivo
+
+
+def buscar_upload(conteudo: bytes, nome_arquivo: str):
+    """Retorna (hash, file_id já enviado ou None)"""
+    hash_imagem = hash_conteudo(conteudo)
+    if cache_uploads is not None:
+        file_id = cache_uploads.obter(hash_imagem)
+        if file_id:
+            print(f"♻️ Imagem {nome_arquivo} já enviada anteriormente ({file_id})")
+            return hash_imagem, file_id
+    return hash_imagem, None
+
+
+def registrar_upload(hash_imagem: str, file_id: str):
+    if cache_uploads is not None:
+        cache_uploads.salvar(hash_imagem, file_id)
+
+
+def enviar_imagem(conteudo: bytes, nome_arquivo: str, mime: str = None) -> str:
+    """Envia uma imagem para a OpenAI, reaproveitando o upload se a mesma imagem já foi enviada"""
+    hash_imagem, file_id = buscar_upload(conteudo, nome_arquivo)
+    if file_id:
+        return file_id
+
+    arquivo = (nome_arquivo, conteudo, mime) if mime else (nome_arquivo, conteudo)
+    file_obj = client.files.create(file=arquivo, purpose="vision")
+    registrar_upload(hash_imagem, file_obj.id)
+    return file_obj.id
+
+
+async def enviar_imagem_async(conteudo: bytes, nome_arquivo: str, mime: str = None) -> str:
+    hash_imagem, file_id = buscar_upload(conteudo, nome_arquivo)
+    if file_id:
+        return file_id
+
+    arquivo = (nome_arquivo, conteudo, mime) if mime else (nome_arquivo, conteudo)
+    file_obj = await async_client.files.create(file=arquivo, purpose="vision")
+    registrar_upload(hash_imagem, file_obj.id)
+    print(f"✅ {nome_arquivo} enviada")
+    return file_obj.id
+
+
+def renderizar_paginas(conteudo: bytes, futuros):
+    """Roda na thread de render: abre o PDF uma vez e entrega cada página no seu Future assim que fica pronta"""
+    try:
+        with fitz.open(stream=conteudo, filetype="pdf") as doc:
+            for indice, futuro in enumerate(futuros):
+                image_bytes, mime = renderizar_pagina(doc[indice])
+                ext_imagem = ".jpg" if mime == "image/jpeg" else ".png"
+                print(f"✅ Página {indice + 1} convertida")
+                futuro.set_result((image_bytes, f"pagina_{indice + 1}{ext_imagem}", mime))
+    except Exception as e:
+        for futuro in futuros:
+            if not futuro.done():
+                futuro.set_exception(e)
+
+
+def preparar_imagem(conteudo: bytes, nome_arquivo: str = None):
+    conteudo, nome_imagem, mime = otimizar_imagem(conteudo, nome_arquivo)
+    nome_imagem = os.path.basename(nome_imagem or "imagem")
+    return conteudo, nome_imagem, mime or mimetypes.guess_type(nome_imagem)[0] or "image/png"
+
+
+def preparar_imagens(conteudo: bytes, nome_arquivo: str = None):
+    """Dispara a conversão do documento em imagens; retorna um Future de (bytes, nome, mime) por página, em ordem"""
+    ext = os.path.splitext(nome_arquivo or "")[1].lower()
+
+    if ext == ".pdf":
+        print(f"📄 Processando PDF: {nome_arquivo}")
+        with fitz.open(stream=conteudo, filetype="pdf") as doc:
+            total_paginas = doc.page_count
+        futuros = [Future() for _ in range(total_paginas)]
+        executor_render.submit(renderizar_paginas, conteudo, futuros)
+        return futuros
+
+    print(f"🖼 Processando imagem: {nome_arquivo}")
+    futuro = Future()
+    futuro.set_result(preparar_imagem(conteudo, nome_arquivo))
+    return [futuro]
+
+
+def enviar_imagem_em_paralelo(imagem, nome_imagem, mime):
+    file_id = enviar_imagem(imagem, nome_imagem, mime)
+    print(f"✅ {nome_imagem} enviada")
+    return file_id
+
+
+def carregar_arquivos_para_vision(arquivo, nome_arquivo: str = None, paginas=None):
+    """`arquivo` pode ser um caminho local, bytes ou um objeto file-like; `paginas` reaproveita imagens já renderizadas"""
+    conteudo, nome_arquivo = ler_arquivo(arquivo, nome_arquivo)
+    paginas = paginas or preparar_imagens(conteudo, nome_arquivo)
+    indices = {futuro: i for i, futuro in enumerate(paginas)}
+
+    # Começa embutindo as imagens na chamada da IA; se o total passar do limite, troca para
+    # upload e já envia cada página assim que ela termina de renderizar
+    inline = IMAGENS_INLINE
+    total_bytes = 0
+    uploads = [None] * len(paginas)
+    concluidas = []
+
+    for futuro in as_completed(paginas):
+        imagem = futuro.result()
+        total_bytes += len(imagem[0])
+        if inline and total_bytes > LIMITE_INLINE_BYTES:
+            inline = False
+            for anterior in concluidas:
+                uploads[indices[anterior]] = executor_uploads.submit(enviar_imagem_em_paralelo, *anterior.result())
+        if not inline:
+            uploads[indices[futuro]] = executor_uploads.submit(enviar_imagem_em_paralelo, *imagem)
+        concluidas.append(futuro)
+
+    if inline:
+        return montar_imagens_inline([futuro.result() for futuro in paginas])
+
+    return [{"type": "input_image", "file_id": upload.result()} for upload in uploads]
+
+
+def montar_imagens_inline(imagens):
+    print(f"📎 {len(imagens)} imagem(ns) embutida(s) na requisição")
+    return [
+        {"type": "input_image", "image_url": f"data:{mime};base64,{base64.b64encode(imagem).decode('ascii')}"}
+        for imagem, _, mime in imagens
+    ]
+
+
+async def carregar_arquivos_para_vision_async(arquivo, nome_arquivo: str = None, paginas=None):
+    conteudo, nome_arquivo = ler_arquivo(arquivo, nome_arquivo)
+    # Otimizar uma foto grande é trabalho de CPU: fica fora do event loop
+    paginas = paginas or await asyncio.to_thread(preparar_imagens, conteudo, nome_arquivo)
+
+    # Mesma estratégia da versão síncrona: passou do limite inline, cada página sobe assim que é renderizada
+    inline = IMAGENS_INLINE
+    total_bytes = 0
+    imagens = []
+    uploads = []
+    for futuro in paginas:
+        imagem = await asyncio.wrap_future(futuro)
+        imagens.append(imagem)
+        total_bytes += len(imagem[0])
+        if inline and total_bytes > LIMITE_INLINE_BYTES:
+            inline = False
+            uploads = [asyncio.ensure_future(enviar_imagem_async(*anterior)) for anterior in imagens[:-1]]
+        if not inline:
+            uploads.append(asyncio.ensure_future(enviar_imagem_async(*imagem)))
+
+    if inline:
+        return montar_imagens_inline(imagens)
+
+    file_ids = await asyncio.gather(*uploads)
+    return [{"type": "input_image", "file_id": file_id} for file_id in file_ids]
+
+
+def montar_entrada(tipo: TipoDocumento, imagens, dica_ocr: str = None):
+    dica = [{"type": "input_text", "text": (
+        "Texto reconhecido por OCR local nas imagens abaixo. Pode conter erros de leitura: "
+        "use apenas como apoio e prevaleça sempre o que está na imagem.\n\n" + dica_ocr
+    )}] if dica_ocr else []
+    return [{
+        "role": "user",
+        "content": [
+            {"type": "input_text", "text": tipo.prompt},
+            *dica,
+            *imagens
+        ]
+    }]
+
+
+def montar_entrada_texto(tipo: TipoDocumento, texto: str):
+    return [{
+        "role": "user",
+        "content": [
+            {"type": "input_text", "text": tipo.prompt},
+            {"type": "input_text", "text": (
+                "O documento foi enviado como o texto extraído do PDF, e não como imagem. "
+                "Avalie o conteúdo textual abaixo com os mesmos critérios:\n\n" + texto
+            )}
+        ]
+    }]
+
+
+def uploads_temporarios(imagens):
+    """Sem o cache de uploads ninguém reaproveita os arquivos, então são apagados logo após o uso"""
+    if cache_uploads is not None:
+        return []
+    return [imagem["file_id"] for imagem in imagens if "file_id" in imagem]
+
+
+def interpretar_resposta(tipo: TipoDocumento, raw_output: str) -> dict:
+    print("\nResposta bruta do GPT:\n", raw_output)
+
+    try:
+        return json.loads(raw_output)
+    except json.JSONDecodeError:
+        return {
+            tipo.chave_validade: False,
+            "motivoErro": ["Erro: resposta não pôde ser convertida em JSON."],
+            "dados_organizados": {},
+            "erro_formato": True
+        }
+
+
+estatisticas_cascata = {}
+estatisticas_lock = threading.Lock()
+
+
+def copiar_estatisticas_cascata() -> dict:
+    """Cópia consistente dos contadores (os workers os atualizam em aceitar_resposta)"""
+    with estatisticas_lock:
+        return {tipo: dict(por_modelo) for tipo, por_modelo in estatisticas_cascata.items()}
+
+
+def aceitar_resposta(tipo: TipoDocumento, nivel: int, resultado_ia: dict, modo: str = "imagem") -> bool:
+    """
+    Decide se a resposta do modelo no `nivel` da cascata é aceita ou se escala para o próximo.
+    No modo "texto" nenhum nível é o último: o que não passar na validação volta para o caminho por imagem.
+    """
+    modelos = tipo.modelos
+    ultimo_nivel = modo == "imagem" and nivel == len(modelos) - 1
+
+    problemas = []
+    if resultado_ia.get("erro_formato"):
+        problemas.append("JSON inválido")
+    elif not resultado_ia.get(tipo.chave_validade):
+        # Só o último modelo pode reprovar: uma reprovação errada obriga o aluno a reenviar
+        problemas.append("documento reprovado")
+    else:
+        dados = resultado_ia.get("dados_organizados") or {}
+        problemas = validar_contra_esquema(tipo.esquema, dados, tipo.opcionais) + validar_dados(dados)
+
+    aceita = ultimo_nivel or not problemas
+    nome_nivel = modelos[nivel] if modo == "imagem" else f"{modelos[nivel]} ({modo})"
+    if len(modelos) > 1 or modo != "imagem":
+        with estatisticas_lock:
+            por_modelo = estatisticas_cascata.setdefault(tipo.nome, {m: 0 for m in modelos})
+            if aceita:
+                por_modelo[nome_nivel] = por_modelo.get(nome_nivel, 0) + 1
+            total = sum(por_modelo.values())
+            resumo = ", ".join(f"{m}={n / total * 100:.1f}%" for m, n in por_modelo.items()) if total else ""
+        if aceita:
+            print(f"[Cascata] {tipo.rotulo} resolvido por {nome_nivel} (acertos por nível: {resumo})")
+        else:
+            proximo = modelos[nivel + 1] if nivel + 1 < len(modelos) else "imagem"
+            print(f"[Cascata] {nome_nivel} não resolveu {tipo.rotulo} ({'; '.join(problemas)}), escalando para {proximo}")
+    return aceita
+
+
+def analisar_texto(tipo: TipoDocumento, texto: str):
+    """Tenta extrair pelo texto do PDF; retorna None para seguir pelo caminho por imagem"""
+    print(f"📝 Camada de texto encontrada ({len(texto)} caracteres), enviando sem imagens")
+    for nivel, modelo in enumerate(tipo.modelos):
+        response = client.responses.create(model=modelo, input=montar_entrada_texto(tipo, texto))
+        resultado_ia = interpretar_resposta(tipo, response.output_text)
+        if aceitar_resposta(tipo, nivel, resultado_ia, modo="texto"):
+            return resultado_ia
+    return None
+
+
+async def analisar_texto_async(tipo: TipoDocumento, texto: str):
+    print(f"📝 Camada de texto encontrada ({len(texto)} caracteres), enviando sem imagens")
+    for nivel, modelo in enumerate(tipo.modelos):
+        response = await async_client.responses.create(model=modelo, input=montar_entrada_texto(tipo, texto))
+        resultado_ia = interpretar_resposta(tipo, response.output_text)
+        if aceitar_resposta(tipo, nivel, resultado_ia, modo="texto"):
+            return resultado_ia
+    return None
+
+
+def executar_ocr(tipo: TipoDocumento, paginas):
+    """Retorna (resultado aceito localmente ou None, texto OCR para apoiar a IA ou None)"""
+    try:
+        linhas = reconhecer_paginas([futuro.result() for futuro in paginas])
+    except Exception as e:
+        print(f"Aviso: OCR local falhou, seguindo só com a IA: {e}")
+        return None, None
+    resultado, campos = extrair_com_ocr(tipo, linhas)
+    return resultado, montar_dica(linhas, campos)
+
+
+def analisar_com_ia(tipo, arquivo, nome_arquivo: str = None):
+    tipo = obter_tipo_documento(tipo)
+    conteudo, nome_arquivo = ler_arquivo(arquivo, nome_arquivo)
+
+    resultado_template = extrair_com_template(tipo, conteudo, nome_arquivo)
+    if resultado_template:
+        return resultado_template
+
+    texto = extrair_camada_texto(conteudo, nome_arquivo) if tipo.aceita_camada_texto else None
+    if texto:
+        resultado_ia = analisar_texto(tipo, texto)
+        if resultado_ia:
+            return resultado_ia
+
+    paginas, dica_ocr = None, None
+    if ocr_disponivel(tipo):
+        paginas = preparar_imagens(conteudo, nome_arquivo)
+        resultado_ocr, dica_ocr = executar_ocr(tipo, paginas)
+        if resultado_ocr:
+            return resultado_ocr
+
+    imagens = carregar_arquivos_para_vision(conteudo, nome_arquivo, paginas)
+
+    try:
+        for nivel, modelo in enumerate(tipo.modelos):
+            response = client.responses.create(model=modelo, input=montar_entrada(tipo, imagens, dica_ocr))
+            resultado_ia = interpretar_resposta(tipo, response.output_text)
+            if aceitar_resposta(tipo, nivel, resultado_ia):
+                return resultado_ia
+    finally:
+        for file_id in uploads_temporarios(imagens):
+            try:
+                client.files.delete(file_id)
+            except Exception as e:
+                print(f"Aviso: não foi possível apagar upload {file_id}: {e}")
+
+
+async def analisar_com_ia_async(tipo, arquivo, nome_arquivo: str = None):
+    tipo = obter_tipo_documento(tipo)
+    conteudo, nome_arquivo = ler_arquivo(arquivo, nome_arquivo)
+
+    resultado_template = await asyncio.to_thread(extrair_com_template, tipo, conteudo, nome_arquivo)
+    if resultado_template:
+        return resultado_template
+
+    texto = await asyncio.to_thread(extrair_camada_texto, conteudo, nome_arquivo) if tipo.aceita_camada_texto else None
+    if texto:
+        resultado_ia = await analisar_texto_async(tipo, texto)
+        if resultado_ia:
+            return resultado_ia
+
+    paginas, dica_ocr = None, None
+    if ocr_disponivel(tipo):
+        paginas = await asyncio.to_thread(preparar_imagens, conteudo, nome_arquivo)
+        resultado_ocr, dica_ocr = await asyncio.to_thread(executar_ocr, tipo, paginas)
+        if resultado_ocr:
+            return resultado_ocr
+
+    imagens = await carregar_arquivos_para_vision_async(conteudo, nome_arquivo, paginas)
+
+    try:
+        for nivel, modelo in enumerate(tipo.modelos):
+            response = await async_client.responses.create(model=modelo, input=montar_entrada(tipo, imagens, dica_ocr))
+            resultado_ia = interpretar_resposta(tipo, response.output_text)
+            if aceitar_resposta(tipo, nivel, resultado_ia):
+                return resultado_ia
+    finally:
+        for file_id in uploads_temporarios(imagens):
+            try:
+                await async_client.files.delete(file_id)
+            except Exception as e:
+                print(f"Aviso: não foi possível apagar upload {file_id}: {e}")
+
+
+def consultar_cache(tipo: TipoDocumento, conteudo: bytes):
+    """Retorna (chave do cache ou None, resultado em cache ou None)"""
+    if cache_resultados is None:
+        return None, None
+    chave_cache = CacheResultados.montar_chave(hash_conteudo(conteudo), tipo.nome, tipo.versao_prompt)
+    resultado_cache = cache_resultados.obter(chave_cache)
+    if resultado_cache is not None:
+        print(f"♻️ Resultado de {tipo.rotulo} encontrado em cache, IA não será chamada")
+    return chave_cache, resultado_cache
+
+
+def montar_resultado(tipo: TipoDocumento, resultado_ia: dict, chave_cache: str = None) -> dict:
+    # Mesmo aprovado pelo modelo, dado inconsistente (CPF, datas, UF, formatos) reprova já aqui
+    problemas = validar_dados(resultado_ia.get("dados_organizados") or {})
+    if resultado_ia.get(tipo.chave_validade) and problemas:
+        print(f"[Validação] {tipo.rotulo} aprovado pela IA reprovado localmente: {'; '.join(problemas)}")
+        status = "reprovado"
+        motivo_erro = ", ".join(problemas)
+    elif resultado_ia.get(tipo.chave_validade):
+        status = "aprovado"
+        motivo_erro = None
+    else:
+        status = "reprovado"
+        # Alguns prompts pedem "motivos" no caso de documento não reconhecido
+        motivos = resultado_ia.get("motivoErro") or resultado_ia.get("motivos") or ["Motivo não especificado."]
+        motivo_erro = ", ".join(motivos)
+
+    resultado = {
+        "status": status,
+        "dadosExtraidos": resultado_ia.get("dados_organizados", {}),
+        "motivoErro": motivo_erro
+    }
+
+    # Respostas malformadas da IA não são reaproveitadas
+    if chave_cache is not None and not resultado_ia.get("erro_formato"):
+        cache_resultados.salvar(chave_cache, resultado)
+
+    return resultado
+
+
+def resultado_erro(tipo: TipoDocumento, e: Exception) -> dict:
+    print(f"Erro crítico ao processar {tipo.rotulo}: {e}")
+    return {
+        "status": "erro",
+        "dadosExtraidos": {},
+        "motivoErro": f"Erro inesperado no módulo de IA: {str(e)}"
+    }
+
+
+def processar_documento(tipo, arquivo, nome_arquivo: str = None) -> dict:
+    tipo = obter_tipo_documento(tipo)
+    try:
+        conteudo, nome_arquivo = ler_arquivo(arquivo, nome_arquivo)
+
+        motivo_triagem, nome_arquivo = triar_arquivo(tipo, conteudo, nome_arquivo)
+        if motivo_triagem:
+            return resultado_triagem(tipo, motivo_triagem)
+
+        chave_cache, resultado_cache = consultar_cache(tipo, conteudo)
+        if resultado_cache is not None:
+            return resultado_cache
+
+        resultado_ia = analisar_com_ia(tipo, conteudo, nome_arquivo)
+        return montar_resultado(tipo, resultado_ia, chave_cache)
+
+    except Exception as e:
+        return resultado_erro(tipo, e)
+
+
+async def processar_documento_async(tipo, arquivo, nome_arquivo: str = None) -> dict:
+    tipo = obter_tipo_documento(tipo)
+    try:
+        conteudo, nome_arquivo = ler_arquivo(arquivo, nome_arquivo)
+
+        motivo_triagem, nome_arquivo = await asyncio.to_thread(triar_arquivo, tipo, conteudo, nome_arquivo)
+        if motivo_triagem:
+            return resultado_triagem(tipo, motivo_triagem)
+
+        chave_cache, resultado_cache = consultar_cache(tipo, conteudo)
+        if resultado_cache is not None:
+            return resultado_cache
+
+        resultado_ia = await analisar_com_ia_async(tipo, conteudo, nome_arquivo)
+        return montar_resultado(tipo, resultado_ia, chave_cache)
+
+    except Exception as e:
+        return resultado_erro(tipo, e)
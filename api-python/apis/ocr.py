@@ -0,0 +1,180 @@
+import io
+import os
+import json
+import re
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from apis.validadores import validar_contra_esquema, validar_dados
+from apis.templates import definir
+
+load_dotenv()
+
+# OCR local (Tesseract) antes da IA: documentos lidos com alta confiança dispensam a chamada remota
+# quando o mapa do tipo permite; os demais seguem para a IA com o texto reconhecido como apoio
+OCR_ATIVO = os.getenv('OCR_ATIVO', 'true').lower() == 'true'
+# Cada página roda num processo "tesseract" próprio (o pytesseract chama o binário); as threads só esperam
+OCR_PROCESSOS = int(os.getenv('OCR_PROCESSOS', str(max(1, (os.cpu_count() or 2) - 1))))
+OCR_IDIOMA = os.getenv('OCR_IDIOMA', 'por')
+# Confiança média mínima (0-100, escala do Tesseract) das palavras de cada campo para aceitar sem a IA
+OCR_CONFIANCA_MINIMA = float(os.getenv('OCR_CONFIANCA_MINIMA', '90'))
+OCR_MAX_CARACTERES_DICA = int(os.getenv('OCR_MAX_CARACTERES_DICA', '4000'))
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:
+    pytesseract = None
+    if OCR_ATIVO:
+        print("Aviso: pytesseract/Pillow não instalados, OCR local desativado")
+
+
+@dataclass(frozen=True)
+class MapaOcr:
+    """Regex por campo aplicadas ao texto OCR em maiúsculas, com re.MULTILINE (^ e $ casam por linha)"""
+    # Trechos que precisam aparecer para o documento ser aceito sem a IA
+    ancoras: tuple
+    # Caminho do campo em "dados_organizados" (ex: "filiacao.mae") -> regex com o valor no grupo 1
+    campos: dict
+    conversores: dict = field(default_factory=dict)
+    # False quando a validade depende de inspeção visual (foto, assinatura, não ser cópia impressa):
+    # os campos lidos só apoiam a IA, que continua decidindo a validade
+    dispensa_ia: bool = True
+
+
+MAPAS_OCR = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+_tesseract_instalado = None
+
+
+def registrar_mapa_ocr(tipo_documento: str, mapa: MapaOcr) -> MapaOcr:
+    MAPAS_OCR[tipo_documento] = mapa
+    return mapa
+
+
+def tesseract_instalado() -> bool:
+    """Confere o binário uma única vez: sem ele o OCR fica desligado em vez de falhar a cada documento"""
+    global _tesseract_instalado
+    if _tesseract_instalado is None:
+        try:
+            pytesseract.get_tesseract_version()
+            _tesseract_instalado = True
+        except Exception as e:
+            print(f"Aviso: binário do Tesseract indisponível, OCR local desativado: {e}")
+            _tesseract_instalado = False
+    return _tesseract_instalado
+
+
+def ocr_disponivel(tipo=None) -> bool:
+    """Com `tipo`, só vale a pena rodar o OCR se ele tiver um MapaOcr registrado"""
+    if not OCR_ATIVO or pytesseract is None:
+        return False
+    if tipo is not None and tipo.nome not in MAPAS_OCR:
+        return False
+    return tesseract_instalado()
+
+
+def obter_executor():
+    # O reconhecimento acontece no processo "tesseract" disparado pelo pytesseract, fora do GIL:
+    # threads bastam e não reimportam o __main__ (server/process_sqs) como um pool de processos faria
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=OCR_PROCESSOS, thread_name_prefix="ocr")
+    return _executor
+
+
+def ocr_pagina(conteudo: bytes):
+    """Roda numa thread do pool: retorna as linhas [(texto, [(palavra, confiança), ...])] da imagem"""
+    dados = pytesseract.image_to_data(
+        Image.open(io.BytesIO(conteudo)), lang=OCR_IDIOMA, output_type=pytesseract.Output.DICT
+    )
+    linhas = {}
+    for i, palavra in enumerate(dados["text"]):
+        confianca = float(dados["conf"][i])
+        if not palavra.strip() or confianca < 0:
+            continue
+        chave = (dados["block_num"][i], dados["par_num"][i], dados["line_num"][i])
+        linhas.setdefault(chave, []).append((palavra.strip(), confianca))
+    return [(" ".join(p for p, _ in palavras), palavras) for _, palavras in sorted(linhas.items())]
+
+
+def reconhecer_paginas(imagens):
+    """OCR de todas as páginas em paralelo; retorna as linhas em ordem de leitura"""
+    resultados = obter_executor().map(ocr_pagina, [imagem for imagem, _, _ in imagens])
+    return [linha for linhas in resultados for linha in linhas]
+
+
+def confianca_trecho(trecho: str, linhas) -> float:
+    """Confiança média das palavras do trecho na linha em que ele foi lido"""
+    alvo = trecho.upper().split()
+    for texto, palavras in linhas:
+        if trecho.upper() in texto.upper():
+            confiancas = [c for p, c in palavras if p.upper() in alvo]
+            if confiancas:
+                return sum(confiancas) / len(confiancas)
+    # Trecho quebrado entre linhas: melhor ocorrência de cada palavra
+    confiancas = [
+        max((c for _, palavras in linhas for p, c in palavras if p.upper() == palavra), default=0.0)
+        for palavra in alvo
+    ]
+    return sum(confiancas) / len(confiancas) if confiancas else 0.0
+
+
+def ler_campos_ocr(tipo, mapa: MapaOcr, linhas):
+    """Campos do mapa quando o documento tem as âncoras e todos foram lidos com confiança e validados; senão None"""
+    texto = "\n".join(linha for linha, _ in linhas).upper()
+    if not all(ancora.upper() in texto for ancora in mapa.ancoras):
+        return None
+
+    dados = {}
+    baixa_confianca = []
+    for caminho, padrao in mapa.campos.items():
+        encontrado = re.search(padrao, texto, flags=re.MULTILINE)
+        valor = encontrado.group(1).strip() if encontrado else None
+        if valor:
+            confianca = confianca_trecho(valor, linhas)
+            if confianca < OCR_CONFIANCA_MINIMA:
+                baixa_confianca.append(f"{caminho} ({confianca:.0f})")
+            conversor = mapa.conversores.get(caminho)
+            valor = conversor(valor) if conversor else valor
+        definir(dados, caminho, valor)
+
+    problemas = validar_contra_esquema(tipo.esquema, dados, tipo.opcionais) + validar_dados(dados)
+    if baixa_confianca:
+        problemas.append(f"confiança baixa: {', '.join(baixa_confianca)}")
+    if problemas:
+        print(f"[OCR] {tipo.rotulo} não aceito localmente: {'; '.join(problemas)}")
+        return None
+    return dados
+
+
+def extrair_com_ocr(tipo, linhas):
+    """
+    Aplica o mapa de campos do tipo ao OCR. Retorna (resultado no formato da IA, campos pré-lidos):
+    o resultado só vem quando o mapa dispensa a IA; nos demais casos os campos lidos seguem como apoio.
+    """
+    mapa = MAPAS_OCR.get(tipo.nome)
+    dados = ler_campos_ocr(tipo, mapa, linhas) if mapa else None
+    if not dados:
+        return None, None
+
+    if not mapa.dispensa_ia:
+        print(f"[OCR] {tipo.rotulo} lido localmente; a validade segue para a análise visual da IA")
+        return None, dados
+
+    print(f"[OCR] {tipo.rotulo} aceito localmente, sem chamada à IA")
+    return {tipo.chave_validade: True, "motivoErro": [], "dados_organizados": dados}, None
+
+
+def montar_dica(linhas, campos=None):
+    """Texto OCR (e os campos já lidos com confiança, se houver) enviado junto com as imagens para apoiar a IA"""
+    if not linhas:
+        return None
+    texto = "\n".join(linha for linha, _ in linhas)[:OCR_MAX_CARACTERES_DICA]
+    if campos:
+        texto = f"Campos pré-lidos pelo OCR (confira na imagem): {json.dumps(campos, ensure_ascii=False)}\n\n{texto}"
+    return texto
@@ -0,0 +1,84 @@
+import os
+import math
+import fitz
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RENDER_ADAPTATIVO = os.getenv('RENDER_ADAPTATIVO', 'true').lower() == 'true'
+# Orçamento de pixels por página (~1600x1250); acima disso a IA não ganha precisão, só latência
+RENDER_MAX_PIXELS = int(os.getenv('RENDER_MAX_PIXELS', str(2_000_000)))
+RENDER_ESCALA_MAX = float(os.getenv('RENDER_ESCALA_MAX', '2'))
+# Imagens enviadas diretamente acima deste tamanho são recomprimidas mesmo dentro do orçamento
+RENDER_MAX_BYTES_IMAGEM = int(os.getenv('RENDER_MAX_BYTES_IMAGEM', str(1_500_000)))
+RENDER_QUALIDADE_JPEG = int(os.getenv('RENDER_QUALIDADE_JPEG', '80'))
+# Fração da página coberta por imagens a partir da qual ela é tratada como digitalização/foto
+RENDER_LIMIAR_FOTOGRAFICA = float(os.getenv('RENDER_LIMIAR_FOTOGRAFICA', '0.5'))
+
+
+def escala_para_orcamento(largura, altura, max_pixels=None, escala_max=None):
+    """Maior escala (até escala_max) que mantém largura*altura*escala² dentro do orçamento"""
+    max_pixels = max_pixels or RENDER_MAX_PIXELS
+    escala_max = escala_max or RENDER_ESCALA_MAX
+    if largura <= 0 or altura <= 0:
+        return escala_max
+    escala = min(escala_max, math.sqrt(max_pixels / (largura * altura)))
+    # O pixmap arredonda cada dimensão para cima: sem o ajuste a página passava do orçamento por alguns pixels
+    while math.ceil(largura * escala) * math.ceil(altura * escala) > max_pixels:
+        escala *= 0.999
+    return escala
+
+
+def pagina_eh_fotografica(page) -> bool:
+    """Páginas escaneadas/fotografadas são cobertas por imagens; PDFs gerados digitalmente têm texto vetorial"""
+    area_pagina = abs(page.rect)
+    if not area_pagina:
+        return False
+    area_imagens = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return area_imagens / area_pagina >= RENDER_LIMIAR_FOTOGRAFICA
+
+
+def renderizar_pagina(page):
+    """Retorna (bytes, mime) da página no formato mais compacto para o conteúdo dela"""
+    if not RENDER_ADAPTATIVO:
+        return page.get_pixmap(matrix=fitz.Matrix(2, 2)).tobytes("png"), "image/png"
+
+    escala = escala_para_orcamento(page.rect.width, page.rect.height)
+    matriz = fitz.Matrix(escala, escala)
+
+    if pagina_eh_fotografica(page):
+        pix = page.get_pixmap(matrix=matriz, colorspace=fitz.csRGB, alpha=False)
+        return pix.tobytes("jpeg", jpg_quality=RENDER_QUALIDADE_JPEG), "image/jpeg"
+
+    # Texto em tons de cinza comprime muito melhor em PNG e não perde legibilidade
+    pix = page.get_pixmap(matrix=matriz, colorspace=fitz.csGRAY, alpha=False)
+    return pix.tobytes("png"), "image/png"
+
+
+def otimizar_imagem(conteudo: bytes, nome_arquivo: str):
+    """
+    Reduz fotos enviadas diretamente (JPG/PNG de celular) ao orçamento de pixels.
+    Retorna (bytes, nome_arquivo, mime); mime None mantém o arquivo original.
+    """
+    if not RENDER_ADAPTATIVO:
+        return conteudo, nome_arquivo, None
+
+    try:
+        pix = fitz.Pixmap(conteudo)
+    except Exception:
+        # Formato que o PyMuPDF não decodifica: envia como veio
+        return conteudo, nome_arquivo, None
+
+    escala = escala_para_orcamento(pix.width, pix.height, escala_max=1)
+    if escala >= 1 and len(conteudo) <= RENDER_MAX_BYTES_IMAGEM:
+        return conteudo, nome_arquivo, None
+
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.colorspace and pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    if escala < 1:
+        pix = fitz.Pixmap(pix, int(pix.width * escala), int(pix.height * escala), None)
+
+    base = os.path.splitext(os.path.basename(nome_arquivo or "imagem"))[0]
+    return pix.tobytes("jpeg", jpg_quality=RENDER_QUALIDADE_JPEG), f"{base}.jpg", "image/jpeg"
@@ -0,0 +1,164 @@
+import os
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+import fitz
+from dotenv import load_dotenv
+from apis.validadores import validar_contra_esquema, validar_dados, somente_digitos
+
+load_dotenv()
+
+# Documentos oficiais de layout fixo (boletim do INEP, reservista digital do gov.br, contas de concessionárias)
+# são lidos direto dos spans do PDF, sem chamar a IA. Layout não reconhecido segue para o caminho normal.
+# Desligado por padrão até as caixas serem calibradas com amostras reais (ver tests/teste8_templates.py)
+TEMPLATES_ATIVOS = os.getenv('TEMPLATES_ATIVOS', 'false').lower() == 'true'
+
+# Caixas relativas ao canto superior esquerdo do rótulo, em frações da largura/altura da página
+NA_MESMA_LINHA = (0.0, -0.004, 0.7, 0.016)
+NA_LINHA_ABAIXO = (-0.01, 0.008, 0.7, 0.034)
+
+PADRAO_CPF = r"(\d{3}\.?\d{3}\.?\d{3}[-/]?\d{2})"
+PADRAO_NOME = r"([^\d:/]{5,}?)\s*$"
+PADRAO_DATA = r"(\d{2}/\d{2}/\d{4})"
+PADRAO_CEP = r"(\d{5}-?\d{3})"
+PADRAO_UF = r"\b(AC|AL|AP|AM|BA|CE|DF|ES|GO|MA|MT|MS|MG|PA|PB|PR|PE|PI|RJ|RN|RS|RO|RR|SC|SP|SE|TO)\b"
+
+
+@dataclass(frozen=True)
+class CampoTemplate:
+    # Rótulo impresso no documento; None aplica `padrao` ao texto da página inteira
+    rotulo: Optional[str] = None
+    caixa: tuple = NA_MESMA_LINHA
+    # Regex aplicada ao texto encontrado; o grupo 1 (ou o match inteiro) é o valor
+    padrao: str = r"(.+)"
+    conversor: Optional[Callable] = None
+
+
+@dataclass(frozen=True)
+class Template:
+    nome: str
+    # TipoDocumento.nome ao qual o layout pertence
+    tipo_documento: str
+    # Trechos que precisam aparecer no documento para o layout ser reconhecido
+    ancoras: tuple
+    # Caminho do campo em "dados_organizados" (ex: "filiacao.mae") -> como extraí-lo
+    campos: dict
+    # Valores constantes do layout (ex: o tipo de conta de uma concessionária)
+    fixos: dict = field(default_factory=dict)
+
+
+TEMPLATES = {}
+
+
+def registrar_template(template: Template) -> Template:
+    TEMPLATES.setdefault(template.tipo_documento, []).append(template)
+    return template
+
+
+def normalizar(texto) -> str:
+    texto = unicodedata.normalize("NFKD", str(texto or ""))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto).strip().lower()
+
+
+def somente_numeros(valor):
+    return somente_digitos(valor) or None
+
+
+def eh_rotulo(texto: str, rotulo: str) -> bool:
+    """
+    O span é o rótulo quando termina nele ou continua com ":"; "Nome Social" e "Nome da Mãe"
+    não servem como "Nome"
+    """
+    return re.match(rf"{re.escape(normalizar(rotulo))}\s*(?::|$)", normalizar(texto)) is not None
+
+
+def ler_spans(doc):
+    """Lista (pagina, texto, Rect) de todos os spans do documento, via get_text("dict")"""
+    spans = []
+    for numero, page in enumerate(doc):
+        for bloco in page.get_text("dict")["blocks"]:
+            for linha in bloco.get("lines", []):
+                for span in linha["spans"]:
+                    if span["text"].strip():
+                        spans.append((numero, span["text"].strip(), fitz.Rect(span["bbox"])))
+    return spans
+
+
+def texto_na_caixa(spans, pagina, caixa):
+    dentro = [(r.y0, r.x0, t) for p, t, r in spans if p == pagina and caixa.contains((r.tl + r.br) / 2)]
+    return " ".join(t for _, _, t in sorted(dentro, key=lambda s: (round(s[0]), s[1])))
+
+
+def extrair_campo(campo: CampoTemplate, spans, tamanhos, texto_completo):
+    if campo.rotulo is None:
+        candidatos = [texto_completo]
+    else:
+        candidatos = []
+        for pagina, texto, rect in spans:
+            if not eh_rotulo(texto, campo.rotulo):
+                continue
+            largura, altura = tamanhos[pagina]
+            dx0, dy0, dx1, dy1 = campo.caixa
+            caixa = fitz.Rect(rect.x0 + dx0 * largura, rect.y0 + dy0 * altura, rect.x0 + dx1 * largura, rect.y0 + dy1 * altura)
+            encontrado = texto_na_caixa(spans, pagina, caixa)
+            # O próprio rótulo cai dentro da caixa quando o valor está na mesma linha
+            encontrado = re.sub(rf"^\s*{re.escape(campo.rotulo)}\s*:?\s*", "", encontrado, flags=re.IGNORECASE)
+            candidatos.append(encontrado)
+
+    for texto in candidatos:
+        resultado = re.search(campo.padrao, texto, flags=re.IGNORECASE)
+        if resultado:
+            valor = (resultado.group(1) if resultado.groups() else resultado.group(0)).strip()
+            return campo.conversor(valor) if campo.conversor else valor
+    return None
+
+
+def definir(dados: dict, caminho: str, valor):
+    *pais, ultimo = caminho.split(".")
+    for chave in pais:
+        dados = dados.setdefault(chave, {})
+    dados[ultimo] = valor
+
+
+def extrair_com_template(tipo, conteudo: bytes, nome_arquivo: str = None):
+    """
+    Retorna o resultado no mesmo formato da IA quando um template do tipo reconhece o documento
+    e extrai todos os campos obrigatórios de forma válida; caso contrário None.
+    """
+    templates = TEMPLATES.get(tipo.nome)
+    if not TEMPLATES_ATIVOS or not templates or os.path.splitext(nome_arquivo or "")[1].lower() != ".pdf":
+        return None
+
+    try:
+        with fitz.open(stream=conteudo, filetype="pdf") as doc:
+            spans = ler_spans(doc)
+            tamanhos = [(page.rect.width, page.rect.height) for page in doc]
+            # Texto por linha, na ordem de leitura, para os campos extraídos por regex na página inteira
+            texto_completo = "\n".join(page.get_text("text", sort=True) for page in doc)
+    except Exception as e:
+        print(f"Aviso: não foi possível ler os spans de {nome_arquivo}: {e}")
+        return None
+
+    texto_normalizado = normalizar(texto_completo)
+
+    for template in templates:
+        if not all(normalizar(ancora) in texto_normalizado for ancora in template.ancoras):
+            continue
+
+        dados = {}
+        for caminho, campo in template.campos.items():
+            definir(dados, caminho, extrair_campo(campo, spans, tamanhos, texto_completo))
+        for caminho, valor in template.fixos.items():
+            definir(dados, caminho, valor)
+
+        problemas = validar_contra_esquema(tipo.esquema, dados, tipo.opcionais) + validar_dados(dados)
+        if problemas:
+            print(f"[Template] {template.nome} reconheceu o layout mas não extraiu tudo: {'; '.join(problemas)}")
+            continue
+
+        print(f"[Template] {tipo.rotulo} extraído localmente pelo template {template.nome}")
+        return {tipo.chave_validade: True, "motivoErro": [], "dados_organizados": dados}
+
+    return None
@@ -0,0 +1,154 @@
+import os
+import struct
+import fitz
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Triagem antes de qualquer render ou chamada à IA: arquivo corrompido, formato não suportado,
+# PDF com páginas demais ou foto gigante é reprovado na hora, com o motivo exato para o aluno
+TRIAGEM_ATIVA = os.getenv('TRIAGEM_ATIVA', 'true').lower() == 'true'
+TRIAGEM_MAX_BYTES = int(os.getenv('TRIAGEM_MAX_BYTES', str(20 * 1024 * 1024)))
+# Limites padrão por documento; cada TipoDocumento pode definir os seus
+TRIAGEM_MAX_PAGINAS = int(os.getenv('TRIAGEM_MAX_PAGINAS', '5'))
+TRIAGEM_MAX_PIXELS = int(os.getenv('TRIAGEM_MAX_PIXELS', str(50_000_000)))
+# Abaixo disso (~400x300) uma foto não tem resolução para leitura dos campos
+TRIAGEM_MIN_PIXELS = int(os.getenv('TRIAGEM_MIN_PIXELS', str(120_000)))
+
+FORMATOS_SUPORTADOS = {"pdf": ".pdf", "png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+NOMES_FORMATOS = "PDF, JPG, PNG ou WEBP"
+
+
+class ArquivoGrandeDemais(Exception):
+    """Levantada por quem conhece o tamanho antes de baixar (ex: ContentLength do S3), para nem ler o corpo"""
+
+
+def motivo_tamanho(tamanho: int, limite: int = None):
+    limite = limite or TRIAGEM_MAX_BYTES
+    if tamanho > limite:
+        return (f"Arquivo de {tamanho / 1024 / 1024:.1f} MB excede o limite de "
+                f"{limite / 1024 / 1024:.0f} MB.")
+    return None
+
+
+def detectar_formato(conteudo: bytes):
+    """Formato real pelos bytes iniciais, independente da extensão do arquivo"""
+    inicio = conteudo[:32]
+    # A especificação permite lixo antes do cabeçalho do PDF dentro do primeiro KB
+    if b"%PDF-" in conteudo[:1024]:
+        return "pdf"
+    if inicio.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if inicio.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if inicio[:4] == b"RIFF" and inicio[8:12] == b"WEBP":
+        return "webp"
+    if inicio[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if inicio[:4] in (b"II*\x00", b"MM\x00*"):
+        return "tiff"
+    if inicio[4:8] == b"ftyp" and inicio[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "heic"
+    if inicio.startswith(b"PK\x03\x04"):
+        return "zip"
+    return None
+
+
+def dimensoes_imagem(conteudo: bytes, formato: str):
+    """(largura, altura) lidas do cabeçalho, sem decodificar a imagem; None se o cabeçalho não for legível"""
+    if formato == "png" and len(conteudo) >= 24:
+        return struct.unpack(">II", conteudo[16:24])
+
+    if formato == "jpeg":
+        i = 2
+        while i + 9 < len(conteudo):
+            if conteudo[i] != 0xFF:
+                return None
+            marcador = conteudo[i + 1]
+            tamanho = struct.unpack(">H", conteudo[i + 2:i + 4])[0]
+            # SOF0..SOF15, exceto DHT (C4), JPG (C8) e DAC (CC)
+            if 0xC0 <= marcador <= 0xCF and marcador not in (0xC4, 0xC8, 0xCC):
+                altura, largura = struct.unpack(">HH", conteudo[i + 5:i + 9])
+                return largura, altura
+            i += 2 + tamanho
+        return None
+
+    # WEBP e demais: deixa o PyMuPDF decodificar
+    try:
+        pix = fitz.Pixmap(conteudo)
+        return pix.width, pix.height
+    except Exception:
+        return None
+
+
+def triar_pdf(tipo, conteudo: bytes):
+    try:
+        with fitz.open(stream=conteudo, filetype="pdf") as doc:
+            if doc.needs_pass:
+                return "PDF protegido por senha. Envie o documento sem senha."
+            paginas = doc.page_count
+    except Exception:
+        return "PDF corrompido ou ilegível. Gere o arquivo novamente e reenvie."
+
+    if paginas == 0:
+        return "PDF sem páginas."
+    if paginas > tipo.max_paginas:
+        return (f"PDF com {paginas} páginas; o limite para {tipo.rotulo} é {tipo.max_paginas}. "
+                "Envie apenas as páginas do documento.")
+    return None
+
+
+def triar_imagem(tipo, conteudo: bytes, formato: str):
+    dimensoes = dimensoes_imagem(conteudo, formato)
+    if not dimensoes:
+        return "Imagem corrompida ou ilegível. Tire a foto novamente e reenvie."
+
+    largura, altura = dimensoes
+    pixels = largura * altura
+    if pixels > tipo.max_pixels:
+        return (f"Imagem de {largura}x{altura} pixels excede o limite de "
+                f"{tipo.max_pixels / 1_000_000:.0f} megapixels para {tipo.rotulo}.")
+    if pixels < TRIAGEM_MIN_PIXELS:
+        return f"Imagem de {largura}x{altura} pixels tem resolução baixa demais para leitura do documento."
+    return None
+
+
+def triar_arquivo(tipo, conteudo: bytes, nome_arquivo: str = None):
+    """
+    Retorna (motivo da reprovação ou None, nome do arquivo com a extensão do formato real).
+    O nome corrigido evita que um PDF salvo como ".jpg" siga pelo caminho de imagem.
+    """
+    if not TRIAGEM_ATIVA:
+        return None, nome_arquivo
+
+    if not conteudo:
+        return "Arquivo vazio.", nome_arquivo
+    motivo = motivo_tamanho(len(conteudo))
+    if motivo:
+        return motivo, nome_arquivo
+
+    formato = detectar_formato(conteudo)
+    if formato not in FORMATOS_SUPORTADOS:
+        detectado = f" (detectado: {formato.upper()})" if formato else ""
+        return f"Formato de arquivo não suportado{detectado}. Envie {NOMES_FORMATOS}.", nome_arquivo
+
+    base, ext = os.path.splitext(nome_arquivo or "documento")
+    extensao_real = FORMATOS_SUPORTADOS[formato]
+    if ext.lower() not in (extensao_real, ".jpeg" if formato == "jpeg" else extensao_real):
+        print(f"[Triagem] {nome_arquivo} é na verdade {formato.upper()}, tratando como {extensao_real}")
+        nome_arquivo = base + extensao_real
+
+    if formato == "pdf":
+        motivo = triar_pdf(tipo, conteudo)
+    else:
+        motivo = triar_imagem(tipo, conteudo, formato)
+    return motivo, nome_arquivo
+
+
+def resultado_triagem(tipo, motivo: str) -> dict:
+    print(f"[Triagem] {tipo.rotulo} reprovado antes da IA: {motivo}")
+    return {
+        "status": "reprovado",
+        "dadosExtraidos": {},
+        "motivoErro": motivo
+    }
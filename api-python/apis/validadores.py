@@ -0,0 +1,209 @@
+import re
+from datetime import datetime
+
+# Só o CPF de identificação (RG, reservista, ENEM, responsável) passa pelos dígitos verificadores;
+# o "cpf_vinculado" das contas é apenas informativo e costuma vir mascarado
+CAMPOS_CPF_IDENTIDADE = ("cpf", "cpf_responsavel")
+# Entra na chave do cache de extração: mudou uma regra, suba a versão para não servir reprovações antigas
+VERSAO_REGRAS = "2"
+# Contas e boletos imprimem o CPF parcialmente oculto (ex: "***.456.789-**")
+PADRAO_MASCARA_CPF = re.compile(r"[*xX#•]")
+
+
+def somente_digitos(valor) -> str:
+    return re.sub(r'[^0-9]', '', str(valor or ''))
+
+
+def validar_cpf(cpf) -> bool:
+    """Valida quantidade de dígitos e dígitos verificadores do CPF"""
+    cpf_limpo = somente_digitos(cpf)
+
+    if len(cpf_limpo) != 11:
+        return False
+    if len(set(cpf_limpo)) == 1:
+        return False
+
+    def calcular_digito(cpf, fator):
+        soma = 0
+        for i in range(fator - 1):
+            soma += int(cpf[i]) * (fator - i)
+        resto = soma % 11
+        return 0 if resto < 2 else 11 - resto
+
+    return int(cpf_limpo[9]) == calcular_digito(cpf_limpo, 10) and int(cpf_limpo[10]) == calcular_digito(cpf_limpo, 11)
+
+
+def cpf_mascarado(cpf) -> bool:
+    return bool(PADRAO_MASCARA_CPF.search(str(cpf or '')))
+
+
+def converter_data(data_str):
+    """Converte DD/MM/AAAA em date; retorna None se o formato ou a data forem inválidos"""
+    if not isinstance(data_str, str) or not re.fullmatch(r'\d{2}/\d{2}/\d{4}', data_str.strip()):
+        return None
+    try:
+        return datetime.strptime(data_str.strip(), '%d/%m/%Y').date()
+    except ValueError:
+        return None
+
+
+def validar_campo(tipo_campo, nome_campo, valor) -> bool:
+    if tipo_campo == "data":
+        return converter_data(valor) is not None
+    if tipo_campo == "integer":
+        return isinstance(valor, int) or (isinstance(valor, str) and valor.strip().isdigit())
+    if tipo_campo == "boolean":
+        return isinstance(valor, bool)
+    if nome_campo in CAMPOS_CPF_IDENTIDADE and not cpf_mascarado(valor):
+        return validar_cpf(valor)
+    return isinstance(valor, str) and bool(valor.strip())
+
+
+def validar_contra_esquema(esquema: dict, dados: dict, opcionais=(), prefixo="") -> list:
+    """Lista os problemas de `dados` em relação ao esquema do tipo de documento"""
+    problemas = []
+    for campo, tipo_campo in esquema.items():
+        caminho = f"{prefixo}{campo}"
+        valor = dados.get(campo) if isinstance(dados, dict) else None
+
+        if isinstance(tipo_campo, dict):
+            problemas += validar_contra_esquema(tipo_campo, valor or {}, opcionais, f"{caminho}.")
+        elif valor is None or valor == "":
+            if caminho not in opcionais:
+                problemas.append(f"Campo '{caminho}' ausente")
+        elif not validar_campo(tipo_campo, campo, valor):
+            problemas.append(f"Campo '{caminho}' inválido: {valor!r}")
+    return problemas
+
+
+# Regras de conteúdo aplicadas a todo "dados_organizados" antes de notificar o backend: pegam aqui,
+# na hora, extrações que o esquema aceita mas que só falhariam depois no verify_docs
+UFS = frozenset((
+    "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA", "MT", "MS", "MG", "PA",
+    "PB", "PR", "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO",
+))
+ANO_PRIMEIRO_ENEM = 1998
+DIGITOS_INSCRICAO_ENEM = 12
+
+# Número do RG sem pontuação; UFs fora da tabela usam o formato genérico
+FORMATO_RG_GENERICO = re.compile(r"\d{5,14}X?")
+FORMATOS_RG_POR_UF = {
+    "SP": re.compile(r"\d{8,9}|\d{8}X"),
+    "RJ": re.compile(r"\d{9}"),
+    "MG": re.compile(r"\d{7,8}"),
+    "RS": re.compile(r"\d{10}"),
+}
+PADRAO_UF_NO_TEXTO = re.compile(r"(?:^|[^A-Z])(" + "|".join(sorted(UFS)) + r")(?:[^A-Z]|$)")
+PADRAO_UF_NO_FIM = re.compile(r"[-/,(]\s*([A-Z]{2})\s*\)?$")
+
+# Pares (campo anterior, campo posterior) que precisam estar em ordem cronológica
+ORDEM_DATAS = (("data_nascimento", "data_expedicao"), ("data_nascimento", "data_emissao"))
+CAMPOS_UF = ("estado_uf", "estado", "uf")
+CAMPOS_LOCAL = ("naturalidade", "local_nascimento")
+
+
+def validar_uf(uf) -> bool:
+    return isinstance(uf, str) and uf.strip().upper() in UFS
+
+
+def uf_do_rg(registro_geral: str):
+    """UF emissora quando vem junto do número (ex: "SSP/SP 12.345.678-9", "MG-12.345.678")"""
+    encontrado = PADRAO_UF_NO_TEXTO.search(str(registro_geral or "").upper())
+    return encontrado.group(1) if encontrado else None
+
+
+def validar_rg(registro_geral, uf: str = None) -> bool:
+    texto = str(registro_geral or "").upper()
+    uf = (uf or uf_do_rg(texto) or "").upper()
+    # Siglas de órgão/UF escritas junto do número não fazem parte dele; só o "X" do dígito verificador fica
+    numero = re.sub(r"[^0-9X]", "", re.sub(r"[A-Z]{2,}", "", texto))
+    return bool(FORMATOS_RG_POR_UF.get(uf, FORMATO_RG_GENERICO).fullmatch(numero))
+
+
+def validar_inscricao_enem(inscricao) -> bool:
+    return len(somente_digitos(inscricao)) == DIGITOS_INSCRICAO_ENEM
+
+
+def coluna(registros, campo):
+    return [dados.get(campo) if isinstance(dados, dict) else None for dados in registros]
+
+
+def preenchido(valor) -> bool:
+    return valor is not None and valor != ""
+
+
+def validar_registros(registros: list, hoje=None) -> list:
+    """
+    Valida vários "dados_organizados" de uma vez, campo a campo (cada regra percorre a coluna inteira).
+    Retorna, na mesma ordem, a lista de problemas de cada registro; campos ausentes são responsabilidade
+    de validar_contra_esquema e ficam de fora daqui.
+    """
+    hoje = hoje or datetime.now().date()
+    problemas = [[] for _ in registros]
+    campos = {campo for dados in registros if isinstance(dados, dict) for campo in dados}
+
+    for campo in sorted(campos):
+        valores = coluna(registros, campo)
+
+        if campo in CAMPOS_CPF_IDENTIDADE:
+            for i, valor in enumerate(valores):
+                if preenchido(valor) and not cpf_mascarado(valor) and not validar_cpf(valor):
+                    problemas[i].append(f"CPF '{campo}' com dígitos verificadores inválidos: {valor!r}")
+
+        if campo.startswith("data_"):
+            datas = [converter_data(valor) if preenchido(valor) else None for valor in valores]
+            for i, (valor, data) in enumerate(zip(valores, datas)):
+                if preenchido(valor) and data is None:
+                    problemas[i].append(f"Data '{campo}' fora do formato DD/MM/AAAA: {valor!r}")
+                elif data is not None and data > hoje:
+                    problemas[i].append(f"Data '{campo}' no futuro: {valor}")
+
+        if campo in CAMPOS_UF:
+            for i, valor in enumerate(valores):
+                # "estado" do histórico pode vir por extenso; só a sigla é conferida
+                sigla = campo != "estado" or len(str(valor or "").strip()) == 2
+                if preenchido(valor) and sigla and not validar_uf(valor):
+                    problemas[i].append(f"UF '{campo}' inexistente: {valor!r}")
+
+        if campo in CAMPOS_LOCAL:
+            for i, valor in enumerate(valores):
+                encontrado = PADRAO_UF_NO_FIM.search(str(valor or "").strip().upper())
+                if encontrado and not validar_uf(encontrado.group(1)):
+                    problemas[i].append(f"UF de '{campo}' inexistente: {valor!r}")
+
+        if campo == "registro_geral":
+            for i, valor in enumerate(valores):
+                if preenchido(valor) and not validar_rg(valor):
+                    uf = uf_do_rg(valor)
+                    formato = f"do RG de {uf}" if uf in FORMATOS_RG_POR_UF else "de RG"
+                    problemas[i].append(f"Registro geral fora do formato {formato}: {valor!r}")
+
+        if campo == "cep":
+            for i, valor in enumerate(valores):
+                if preenchido(valor) and len(somente_digitos(valor)) != 8:
+                    problemas[i].append(f"CEP deve ter 8 dígitos: {valor!r}")
+
+        if campo in ("numero_inscricao", "inscricao"):
+            for i, valor in enumerate(valores):
+                if preenchido(valor) and not validar_inscricao_enem(valor):
+                    problemas[i].append(f"Inscrição do ENEM deve ter {DIGITOS_INSCRICAO_ENEM} dígitos: {valor!r}")
+
+        if campo == "ano_enem":
+            for i, valor in enumerate(valores):
+                ano = int(valor) if isinstance(valor, int) or str(valor).strip().isdigit() else None
+                if preenchido(valor) and (ano is None or not ANO_PRIMEIRO_ENEM <= ano <= hoje.year):
+                    problemas[i].append(f"Ano do ENEM fora de {ANO_PRIMEIRO_ENEM}-{hoje.year}: {valor!r}")
+
+    for anterior, posterior in ORDEM_DATAS:
+        if anterior not in campos or posterior not in campos:
+            continue
+        for i, (inicio, fim) in enumerate(zip(coluna(registros, anterior), coluna(registros, posterior))):
+            inicio, fim = converter_data(inicio), converter_data(fim)
+            if inicio and fim and inicio >= fim:
+                problemas[i].append(f"'{anterior}' ({inicio:%d/%m/%Y}) deveria ser anterior a '{posterior}' ({fim:%d/%m/%Y})")
+
+    return problemas
+
+
+def validar_dados(dados: dict, hoje=None) -> list:
+    return validar_registros([dados], hoje)[0]
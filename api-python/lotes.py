@@ -0,0 +1,49 @@
+import threading
+
+
+class AcumuladorLote:
+    """
+    Agrupa itens e os envia de uma vez quando o lote atinge `tamanho_max`
+    ou quando a janela de tempo expira, o que acontecer primeiro.
+    """
+
+    def __init__(self, enviar, tamanho_max=10, janela=0.5, nome="lote"):
+        self.enviar = enviar
+        self.tamanho_max = tamanho_max
+        self.janela = janela
+        self.nome = nome
+        self._itens = []
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name=f"flush-{nome}", daemon=True)
+        self._thread.start()
+
+    def adicionar(self, item):
+        lote = None
+        with self._lock:
+            self._itens.append(item)
+            if len(self._itens) >= self.tamanho_max:
+                lote, self._itens = self._itens, []
+        if lote:
+            self._enviar(lote)
+
+    def flush(self):
+        with self._lock:
+            lote, self._itens = self._itens, []
+        if lote:
+            self._enviar(lote)
+
+    def encerrar(self):
+        self._parar.set()
+        self._thread.join()
+        self.flush()
+
+    def _loop(self):
+        while not self._parar.wait(self.janela):
+            self.flush()
+
+    def _enviar(self, lote):
+        try:
+            self.enviar(lote)
+        except Exception as e:
+            print(f"[{self.nome}] Erro ao enviar lote com {len(lote)} itens: {e}")
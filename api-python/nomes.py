@@ -0,0 +1,91 @@
+import os
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+# Comparação local de nomes brasileiros: só os pares ambíguos precisam de uma chamada à IA
+
+NOME_LIMIAR_MATCH = float(os.getenv('NOME_LIMIAR_MATCH', '0.92'))
+NOME_LIMIAR_NAO_MATCH = float(os.getenv('NOME_LIMIAR_NAO_MATCH', '0.6'))
+
+PARTICULAS = {"da", "de", "do", "das", "dos", "e", "d"}
+
+MATCH = "match"
+NAO_MATCH = "nao_match"
+AMBIGUO = "ambiguo"
+
+
+def tokens_nome(nome) -> list:
+    """Minúsculas, sem acentos, sem pontuação e sem partículas (da, de, dos...)"""
+    texto = unicodedata.normalize("NFKD", str(nome or ""))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = re.sub(r"[^a-z\s]", " ", texto)
+    return [t for t in texto.split() if t not in PARTICULAS]
+
+
+def expandir_iniciais(tokens, referencia) -> list:
+    """Troca iniciais ("p") pelo primeiro nome da referência que começa com a mesma letra e ainda não foi usado"""
+    disponiveis = [t for t in referencia if len(t) > 1 and t not in tokens]
+    expandidos = []
+    for token in tokens:
+        if len(token) == 1:
+            completo = next((t for t in disponiveis if t.startswith(token)), None)
+            if completo:
+                disponiveis.remove(completo)
+                token = completo
+        expandidos.append(token)
+    return expandidos
+
+
+def similaridade(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def razao_conjunto_tokens(tokens_a, tokens_b) -> float:
+    """Token set ratio: compara a interseção com cada lado, tolerando nomes do meio omitidos"""
+    conjunto_a, conjunto_b = set(tokens_a), set(tokens_b)
+    comum = " ".join(sorted(conjunto_a & conjunto_b))
+    resto_a = " ".join(sorted(conjunto_a - conjunto_b))
+    resto_b = " ".join(sorted(conjunto_b - conjunto_a))
+    com_a = f"{comum} {resto_a}".strip()
+    com_b = f"{comum} {resto_b}".strip()
+    return max(similaridade(comum, com_a), similaridade(comum, com_b), similaridade(com_a, com_b))
+
+
+def comparar_nomes(nome_a, nome_b):
+    """Retorna (resultado, similaridade) com resultado em MATCH, NAO_MATCH ou AMBIGUO"""
+    tokens_a, tokens_b = tokens_nome(nome_a), tokens_nome(nome_b)
+    if not tokens_a or not tokens_b:
+        return AMBIGUO, 0.0
+
+    tokens_a = expandir_iniciais(tokens_a, tokens_b)
+    tokens_b = expandir_iniciais(tokens_b, tokens_a)
+    if tokens_a == tokens_b:
+        return MATCH, 1.0
+
+    score = round(razao_conjunto_tokens(tokens_a, tokens_b), 3)
+    # Prenomes diferentes ("João Silva" x "Pedro Silva") não se explicam por abreviação ou nome omitido
+    if similaridade(tokens_a[0], tokens_b[0]) < NOME_LIMIAR_NAO_MATCH:
+        return NAO_MATCH, score
+
+    # Um nome contido no outro só é confiável quando o menor tem prenome e sobrenome
+    contido = set(tokens_a) <= set(tokens_b) or set(tokens_b) <= set(tokens_a)
+    if score >= NOME_LIMIAR_MATCH and (not contido or min(len(tokens_a), len(tokens_b)) >= 2):
+        return MATCH, score
+    if score < NOME_LIMIAR_NAO_MATCH:
+        return NAO_MATCH, score
+    return AMBIGUO, score
+
+
+def comparar_par(nome_a, nome_b, documento) -> dict:
+    resultado, score = comparar_nomes(nome_a, nome_b)
+    return {"nome_a": nome_a, "nome_b": nome_b, "documento": documento, "resultado": resultado, "similaridade": score}
+
+
+def melhor_correspondencia(nome, candidatos, documento) -> dict:
+    """Compara `nome` com cada candidato e fica com o par mais favorável"""
+    ordem = {MATCH: 2, AMBIGUO: 1, NAO_MATCH: 0}
+    pares = [comparar_par(nome, c, documento) for c in candidatos]
+    if not pares:
+        return comparar_par(nome, "", documento)
+    return max(pares, key=lambda p: (ordem[p["resultado"]], p["similaridade"]))
@@ -0,0 +1,106 @@
+import os
+import asyncio
+import httpx
+from server import (
+    BACKEND_URL, API_KEY, BACKEND_POOL_SIZE, S3_MODO_STREAMING,
+    carregar_arquivo_s3, baixar_arquivo_s3, montar_payload_status,
+    resolver_tipo_documento, remover_arquivo_temporario
+)
+from apis.ingestao import processar_documento_async
+from apis.triagem import ArquivoGrandeDemais, resultado_triagem
+
+# Máximo de documentos em processamento simultâneo no event loop
+PIPELINE_CONCORRENCIA = int(os.getenv('PIPELINE_CONCORRENCIA', '32'))
+
+_semaforo = None
+_http_client = None
+
+
+def obter_semaforo():
+    global _semaforo
+    if _semaforo is None:
+        _semaforo = asyncio.Semaphore(PIPELINE_CONCORRENCIA)
+    return _semaforo
+
+
+def obter_http_client():
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=30,
+            limits=httpx.Limits(max_connections=BACKEND_POOL_SIZE, max_keepalive_connections=BACKEND_POOL_SIZE),
+            headers={"X-API-Key": API_KEY or "", "Content-Type": "application/json"}
+        )
+    return _http_client
+
+
+async def fechar_recursos():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def carregar_arquivo_s3_async(caminho_arquivo):
+    # boto3 não tem API assíncrona; a leitura roda numa thread sem bloquear o event loop
+    if S3_MODO_STREAMING:
+        return await asyncio.to_thread(carregar_arquivo_s3, caminho_arquivo)
+    return await asyncio.to_thread(baixar_arquivo_s3, caminho_arquivo)
+
+
+async def atualizar_status_backend_async(resultado):
+    if not resultado.get("documentoId"):
+        print("Erro Crítico: Tentativa de atualizar status sem documentoId.")
+        return False
+    try:
+        payload = montar_payload_status(resultado)
+        print(f"Atualizando status no backend: {payload}")
+
+        response = await obter_http_client().post(f"{BACKEND_URL}/api/documentos/atualizar-status", json=payload)
+        response.raise_for_status()
+
+        print(f"Status atualizado com sucesso: {response.status_code}")
+        return True
+    except httpx.HTTPError as e:
+        print(f"Erro de comunicação com o backend: {e}")
+        return False
+    except Exception as e:
+        print(f"Erro inesperado ao atualizar status no backend: {e}")
+        return False
+
+
+async def escolher_pipeline_async(payload, notificar=atualizar_status_backend_async):
+    """Versão asyncio de server.escolher_pipeline, limitada por PIPELINE_CONCORRENCIA"""
+    documento_id = payload["documentoId"]
+
+    async with obter_semaforo():
+        try:
+            tipo = payload.get("tipoDocumento", "").lower()
+            subtipo = payload.get("subtipo")
+            caminho = payload["caminhoArquivo"]
+
+            print(f"Processando documento ID: {documento_id}")
+            print(f"Tipo: {tipo}, Subtipo: {subtipo}, Caminho: {caminho}")
+
+            tipo_documento, motivo_erro = resolver_tipo_documento(tipo, subtipo)
+            if tipo_documento is None:
+                resultado = {"status": "erro", "motivoErro": motivo_erro}
+            else:
+                arquivo_local = None
+                try:
+                    arquivo_local = await carregar_arquivo_s3_async(caminho)
+                    resultado = await processar_documento_async(tipo_documento, arquivo_local, caminho)
+                except ArquivoGrandeDemais as e:
+                    resultado = resultado_triagem(tipo_documento, str(e))
+                finally:
+                    remover_arquivo_temporario(arquivo_local)
+        except Exception as e:
+            print(f"Erro no processamento do documento {documento_id}: {e}")
+            resultado = {
+                "status": "erro",
+                "motivoErro": f"Erro inesperado no pipeline: {str(e)}"
+            }
+
+    resultado["documentoId"] = documento_id
+    await notificar(resultado)
+    return resultado
@@ -5,61 +5,107 @@ import json
 import os
 import time
 import sys
-from server import escolher_pipeline
-
-sqs_client = boto3.client('sqs', region_name='us-east-1')
+import signal
+import asyncio
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from server import escolher_pipeline, atualizar_status_backend, StatusBackendEmLote
+from lotes import AcumuladorLote
 
 SQS_QUEUE_URL = os.getenv('SQS_QUEUE_URL')
+# Permite apontar para um SQS local (ElasticMQ, moto server) em testes
+SQS_ENDPOINT_URL = os.getenv('SQS_ENDPOINT_URL')
+# Com concorrência > 1 o processador roda em modo pool
+SQS_CONCURRENCIA = int(os.getenv('SQS_CONCURRENCIA', '1'))
+SQS_VISIBILITY_TIMEOUT = int(os.getenv('SQS_VISIBILITY_TIMEOUT', '120'))
+SQS_HEARTBEAT_INTERVALO = int(os.getenv('SQS_HEARTBEAT_INTERVALO', str(max(SQS_VISIBILITY_TIMEOUT // 3, 1))))
+SQS_WAIT_TIME = int(os.getenv('SQS_WAIT_TIME', '20'))
+# Janela (s) para agrupar confirmações em delete_message_batch no modo pool
+SQS_JANELA_EXCLUSAO = float(os.getenv('SQS_JANELA_EXCLUSAO', '0.5'))
+# Requer o endpoint /api/documentos/atualizar-status/lote no backend
+BACKEND_STATUS_EM_LOTE = os.getenv('BACKEND_STATUS_EM_LOTE', 'false').lower() == 'true'
+# Processa as mensagens no pipeline asyncio (pipeline_async.py) em vez de threads
+SQS_MODO_ASYNC = os.getenv('SQS_MODO_ASYNC', 'false').lower() == 'true'
+
+sqs_client = boto3.client('sqs', region_name='us-east-1', endpoint_url=SQS_ENDPOINT_URL)
 
 print(f"Iniciando processador SQS...")
 print(f"  - SQS Queue: {SQS_QUEUE_URL}")
+print(f"  - Concorrência: {SQS_CONCURRENCIA}")
 print(f"  - Pressione Ctrl+C para parar")
 print("-" * 50)
 
+def remover_mensagem(message):
+    sqs_client.delete_message(
+        QueueUrl=SQS_QUEUE_URL,
+        ReceiptHandle=message['ReceiptHandle']
+    )
+
+def remover_lote_mensagens(mensagens):
+    """Remove até 10 mensagens da fila com uma única chamada delete_message_batch"""
+    response = sqs_client.delete_message_batch(
+        QueueUrl=SQS_QUEUE_URL,
+        Entries=[
+            {"Id": str(n), "ReceiptHandle": message['ReceiptHandle']}
+            for n, message in enumerate(mensagens)
+        ]
+    )
+    print(f"[SQS] {len(response.get('Successful', []))} mensagens removidas da fila em lote.")
+    for falha in response.get('Failed', []):
+        message = mensagens[int(falha['Id'])]
+        print(f"[SQS] Falha ao remover mensagem {message['MessageId']}: {falha.get('Message')}")
+
+def tratar_mensagem(message, remover=remover_mensagem, notificar=atualizar_status_backend):
+    """
+    Processa uma mensagem já recebida e a remove da fila. Com o status em lote (StatusBackendEmLote)
+    a remoção só acontece quando o backend confirma o status do documento.
+    """
+    print(f"[SQS] Mensagem recebida: {message['Body']}")
+
+    try:
+        payload = json.loads(message['Body'])
+        print(f"[SQS] Iniciando processamento do documento ID: {payload.get('documentoId')}")
+        print(f"[SQS] Tipo: {payload.get('tipoDocumento')}, Subtipo: {payload.get('subtipo')}")
+
+        em_lote = isinstance(notificar, StatusBackendEmLote)
+        if em_lote:
+            notificar = partial(notificar, ao_confirmar=partial(remover, message))
+
+        resultado = escolher_pipeline(payload, notificar=notificar)
+        print(f"[SQS] Resultado do processamento: {json.dumps(resultado, ensure_ascii=False)}")
+
+        if em_lote:
+            print(f"[SQS] Remoção da fila aguardando a confirmação do status pelo backend.")
+        else:
+            remover(message)
+            print(f"[SQS] Mensagem confirmada para remoção da fila.")
+
+        if resultado.get('status') == 'erro':
+            print(f"[SQS] Erro detectado: {resultado.get('motivoErro')}")
+
+        return resultado
+
+    except Exception as e:
+        print(f"[SQS] Erro ao processar mensagem: {e}")
+        remover(message)
+        print(f"[SQS] Mensagem confirmada para remoção da fila após erro.")
+        return {
+            "status": "erro",
+            "motivoErro": f"Erro ao processar mensagem: {str(e)}"
+        }
+
 def processar_mensagem_sqs():
     """Processa uma mensagem da fila SQS"""
     try:
         response = sqs_client.receive_message(
             QueueUrl=SQS_QUEUE_URL,
             MaxNumberOfMessages=1,
-            WaitTimeSeconds=20 
+            WaitTimeSeconds=SQS_WAIT_TIME
         )
         
         if 'Messages' in response:
-            message = response['Messages'][0]
-            receipt_handle = message['ReceiptHandle']
-            print(f"[SQS] Mensagem recebida: {message['Body']}")
-            
-            try:
-                payload = json.loads(message['Body'])
-                print(f"[SQS] Iniciando processamento do documento ID: {payload.get('documentoId')}")
-                print(f"[SQS] Tipo: {payload.get('tipoDocumento')}, Subtipo: {payload.get('subtipo')}")
-                
-                resultado = escolher_pipeline(payload)
-                print(f"[SQS] Resultado do processamento: {json.dumps(resultado, ensure_ascii=False)}")
-                
-                sqs_client.delete_message(
-                    QueueUrl=SQS_QUEUE_URL,
-                    ReceiptHandle=receipt_handle
-                )
-                print(f"[SQS] Mensagem removida da fila.")
-                
-                if resultado.get('status') == 'erro':
-                    print(f"[SQS] Erro detectado: {resultado.get('motivoErro')}")
-                
-                return resultado
-                
-            except Exception as e:
-                print(f"[SQS] Erro ao processar mensagem: {e}")
-                sqs_client.delete_message(
-                    QueueUrl=SQS_QUEUE_URL,
-                    ReceiptHandle=receipt_handle
-                )
-                print(f"[SQS] Mensagem removida da fila após erro.")
-                return {
-                    "status": "erro",
-                    "motivoErro": f"Erro ao processar mensagem: {str(e)}"
-                }
+            return tratar_mensagem(response['Messages'][0])
         else:
             return None
             
@@ -103,5 +149,228 @@ def main():
         print(f"Erro crítico: {e}")
         sys.exit(1)
 
+class HeartbeatVisibilidade:
+    """Renova periodicamente o visibility timeout das mensagens em processamento"""
+
+    def __init__(self, intervalo=SQS_HEARTBEAT_INTERVALO, timeout=SQS_VISIBILITY_TIMEOUT):
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self._handles = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="sqs-heartbeat", daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+
+    def encerrar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def registrar(self, message):
+        with self._lock:
+            self._handles[message['MessageId']] = message['ReceiptHandle']
+
+    def remover(self, message):
+        with self._lock:
+            self._handles.pop(message['MessageId'], None)
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            with self._lock:
+                em_andamento = list(self._handles.items())
+
+            # change_message_visibility_batch aceita no máximo 10 entradas por chamada
+            for i in range(0, len(em_andamento), 10):
+                entradas = [
+                    {"Id": str(n), "ReceiptHandle": handle, "VisibilityTimeout": self.timeout}
+                    for n, (_, handle) in enumerate(em_andamento[i:i + 10])
+                ]
+                try:
+                    response = sqs_client.change_message_visibility_batch(
+                        QueueUrl=SQS_QUEUE_URL,
+                        Entries=entradas
+                    )
+                    for falha in response.get('Failed', []):
+                        print(f"[SQS] Heartbeat falhou para entrada {falha.get('Id')}: {falha.get('Message')}")
+                except Exception as e:
+                    print(f"[SQS] Erro no heartbeat de visibilidade: {e}")
+
+
+def main_pool(concorrencia=SQS_CONCURRENCIA):
+    """Loop em modo pool: recebe até 10 mensagens por vez e processa em paralelo"""
+    parar = threading.Event()
+    slots = threading.BoundedSemaphore(concorrencia)
+    heartbeat = HeartbeatVisibilidade()
+    exclusoes = AcumuladorLote(remover_lote_mensagens, tamanho_max=10, janela=SQS_JANELA_EXCLUSAO, nome="sqs-delete")
+    notificar = StatusBackendEmLote() if BACKEND_STATUS_EM_LOTE else atualizar_status_backend
+    stats_lock = threading.Lock()
+    stats = {"processadas": 0, "erros": 0}
+
+    def sinal_parada(signum, frame):
+        print(f"\n[SQS] Sinal {signum} recebido. Aguardando mensagens em andamento...")
+        parar.set()
+
+    signal.signal(signal.SIGTERM, sinal_parada)
+    signal.signal(signal.SIGINT, sinal_parada)
+
+    def executar(message):
+        try:
+            resultado = tratar_mensagem(message, remover=exclusoes.adicionar, notificar=notificar)
+            with stats_lock:
+                stats["processadas"] += 1
+                if resultado.get('status') == 'erro':
+                    stats["erros"] += 1
+                processadas, erros = stats["processadas"], stats["erros"]
+            print(f"[SQS] Estatísticas: Processadas={processadas}, Erros={erros}, Sucesso={(processadas - erros)}, Taxa de sucesso={((processadas - erros) / processadas * 100):.1f}%")
+        finally:
+            heartbeat.remover(message)
+            slots.release()
+
+    heartbeat.iniciar()
+    print(f"[SQS] Modo pool iniciado com {concorrencia} workers.")
+
+    with ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix="sqs-worker") as executor:
+        while not parar.is_set():
+            # Só busca mensagens quando há pelo menos um worker livre
+            if not slots.acquire(timeout=1):
+                continue
+            livres = 1
+            while livres < min(concorrencia, 10) and slots.acquire(blocking=False):
+                livres += 1
+
+            # O sinal pode ter chegado enquanto esperava um slot: em drenagem não aceita trabalho novo
+            if parar.is_set():
+                for _ in range(livres):
+                    slots.release()
+                break
+
+            try:
+                response = sqs_client.receive_message(
+                    QueueUrl=SQS_QUEUE_URL,
+                    MaxNumberOfMessages=livres,
+                    WaitTimeSeconds=SQS_WAIT_TIME,
+                    VisibilityTimeout=SQS_VISIBILITY_TIMEOUT
+                )
+                mensagens = response.get('Messages', [])
+            except Exception as e:
+                print(f"Erro ao acessar SQS: {e}")
+                mensagens = []
+                parar.wait(5)
+
+            for _ in range(livres - len(mensagens)):
+                slots.release()
+
+            for message in mensagens:
+                heartbeat.registrar(message)
+                executor.submit(executar, message)
+
+    # Os status pendentes saem primeiro: cada confirmação ainda acrescenta a mensagem ao lote de remoção
+    if isinstance(notificar, StatusBackendEmLote):
+        notificar.encerrar()
+    exclusoes.encerrar()
+    heartbeat.encerrar()
+    print(f"[SQS] Processador finalizado.")
+    print(f"[SQS] Total de mensagens processadas: {stats['processadas']}")
+    print(f"[SQS] Total de erros: {stats['erros']}")
+
+
+async def main_async(concorrencia=SQS_CONCURRENCIA):
+    """Loop asyncio: cada mensagem vira uma corrotina, limitadas a `concorrencia` simultâneas"""
+    from pipeline_async import escolher_pipeline_async, fechar_recursos
+
+    loop = asyncio.get_running_loop()
+    parar = asyncio.Event()
+    slots = asyncio.Semaphore(concorrencia)
+    heartbeat = HeartbeatVisibilidade()
+    exclusoes = AcumuladorLote(remover_lote_mensagens, tamanho_max=10, janela=SQS_JANELA_EXCLUSAO, nome="sqs-delete")
+    tarefas = set()
+    stats = {"processadas": 0, "erros": 0}
+
+    def sinal_parada():
+        print(f"\n[SQS] Sinal de parada recebido. Aguardando mensagens em andamento...")
+        parar.set()
+
+    loop.add_signal_handler(signal.SIGTERM, sinal_parada)
+    loop.add_signal_handler(signal.SIGINT, sinal_parada)
+
+    async def executar(message):
+        try:
+            print(f"[SQS] Mensagem recebida: {message['Body']}")
+            try:
+                payload = json.loads(message['Body'])
+                resultado = await escolher_pipeline_async(payload)
+            except Exception as e:
+                print(f"[SQS] Erro ao processar mensagem: {e}")
+                resultado = {
+                    "status": "erro",
+                    "motivoErro": f"Erro ao processar mensagem: {str(e)}"
+                }
+            # Pode disparar um delete_message_batch quando o lote enche
+            await asyncio.to_thread(exclusoes.adicionar, message)
+
+            stats["processadas"] += 1
+            if resultado.get('status') == 'erro':
+                stats["erros"] += 1
+            processadas, erros = stats["processadas"], stats["erros"]
+            print(f"[SQS] Estatísticas: Processadas={processadas}, Erros={erros}, Sucesso={(processadas - erros)}, Taxa de sucesso={((processadas - erros) / processadas * 100):.1f}%")
+        finally:
+            heartbeat.remover(message)
+            slots.release()
+
+    heartbeat.iniciar()
+    print(f"[SQS] Modo async iniciado com até {concorrencia} mensagens simultâneas.")
+
+    while not parar.is_set():
+        await slots.acquire()
+        livres = 1
+        while livres < min(concorrencia, 10) and not slots.locked():
+            await slots.acquire()
+            livres += 1
+
+        # O sinal pode ter chegado enquanto esperava um slot: em drenagem não aceita trabalho novo
+        if parar.is_set():
+            for _ in range(livres):
+                slots.release()
+            break
+
+        try:
+            response = await asyncio.to_thread(
+                sqs_client.receive_message,
+                QueueUrl=SQS_QUEUE_URL,
+                MaxNumberOfMessages=livres,
+                WaitTimeSeconds=SQS_WAIT_TIME,
+                VisibilityTimeout=SQS_VISIBILITY_TIMEOUT
+            )
+            mensagens = response.get('Messages', [])
+        except Exception as e:
+            print(f"Erro ao acessar SQS: {e}")
+            mensagens = []
+            await asyncio.sleep(5)
+
+        for _ in range(livres - len(mensagens)):
+            slots.release()
+
+        for message in mensagens:
+            heartbeat.registrar(message)
+            tarefa = asyncio.create_task(executar(message))
+            tarefas.add(tarefa)
+            tarefa.add_done_callback(tarefas.discard)
+
+    if tarefas:
+        await asyncio.gather(*tarefas)
+    await asyncio.to_thread(exclusoes.encerrar)
+    await fechar_recursos()
+    heartbeat.encerrar()
+    print(f"[SQS] Processador finalizado.")
+    print(f"[SQS] Total de mensagens processadas: {stats['processadas']}")
+    print(f"[SQS] Total de erros: {stats['erros']}")
+
 if __name__ == "__main__":
-    main() 
+    if SQS_MODO_ASYNC:
+        asyncio.run(main_async())
+    elif SQS_CONCURRENCIA > 1:
+        main_pool()
+    else:
+        main()
+
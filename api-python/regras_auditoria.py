@@ -0,0 +1,298 @@
+import re
+import json
+import hashlib
+import unicodedata
+from datetime import datetime, date
+from nomes import MATCH, NAO_MATCH, AMBIGUO
+
+# Regras do auditor que são comparações diretas sobre o dossiê de fatos.
+# Rodam localmente; só as regras de nome (1, 5 e 8) podem precisar da IA.
+
+FORMATOS_DATA = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y')
+
+REGRA_NOME = "Regra 1 - Consistência de Nome"
+REGRA_CPF = "Regra 2 - Consistência de CPF"
+REGRA_RG = "Regra 3 - Consistência de RG"
+REGRA_DATA_NASCIMENTO = "Regra 4 - Consistência de Data de Nascimento"
+REGRA_FILIACAO = "Regra 5 - Consistência de Filiação"
+REGRA_RG_VENCIDO = "Regra 6 - RG Vencido"
+REGRA_COMPROVANTE_VENCIDO = "Regra 7 - Comprovante de Residência Vencido"
+REGRA_TITULARIDADE = "Regra 8 - Titularidade do Comprovante de Residência"
+REGRA_CONCLUSAO = "Regra 9 - Histórico Escolar - Certificação de Conclusão"
+REGRA_OBRIGATORIOS = "Regra 10 - Validação de Documentos Obrigatórios"
+REGRA_RG_A_VENCER = "Regra 11 - RG a Vencer"
+
+OBSERVACAO_SEM_AVISOS = "Dados consistentes e pré-aprovados pela IA."
+
+
+def finding(tipo, regra, detalhe, documentos=None):
+    """documentos: nomes dos documentos que causaram o ERRO e devem ser reprovados"""
+    resultado = {"tipo": tipo, "regra": regra, "detalhe": detalhe}
+    if documentos:
+        resultado["documentos"] = documentos
+    return resultado
+
+
+def eh_vazio(valor) -> bool:
+    return valor is None or (isinstance(valor, str) and valor.strip().lower() in ("", "null", "none"))
+
+
+def normalizar_texto(valor) -> str:
+    """Minúsculas, sem acentos e com espaços simples"""
+    texto = unicodedata.normalize("NFKD", str(valor or ""))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto).strip().lower()
+
+
+def normalizar_documento(valor) -> str:
+    return re.sub(r"[^0-9a-z]", "", normalizar_texto(valor))
+
+
+def normalizar_data(valor):
+    """Data em ISO quando o formato é reconhecido; caso contrário o texto normalizado"""
+    texto = str(valor).strip()
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            continue
+    return normalizar_texto(texto)
+
+
+def eh_comprovante(nome_documento) -> bool:
+    return "comprovante" in normalizar_texto(nome_documento)
+
+
+def documento_enviado(fatos, trecho) -> bool:
+    return any(trecho in normalizar_texto(d) for d in fatos["fatos_especificos"]["documentos_enviados"])
+
+
+def divergencias(valores):
+    """Agrupa {valor normalizado: [documentos]} e descreve os grupos quando há mais de um"""
+    grupos = {}
+    for valor, documento in valores:
+        grupos.setdefault(valor, []).append(documento)
+    if len(grupos) <= 1:
+        return None
+    return "; ".join(f"{valor} ({', '.join(docs)})" for valor, docs in grupos.items())
+
+
+def regra_cpf(fatos):
+    cpf_cadastro = normalizar_documento(fatos["dados_cadastro"]["cpf"])
+    valores = [(cpf_cadastro, "cadastro")] + [
+        (normalizar_documento(c["cpf"]), c["documento"])
+        for c in fatos["harmonizacao_consistencia"]["cpfs_encontrados"]
+        if not eh_comprovante(c["documento"]) and not eh_vazio(c["cpf"])
+    ]
+    detalhe = divergencias(valores)
+    if detalhe:
+        divergentes = [documento for valor, documento in valores[1:] if valor != cpf_cadastro]
+        return finding("ERRO", REGRA_CPF, f"CPFs divergentes entre os documentos: {detalhe}.", divergentes)
+    return finding("OK", REGRA_CPF, "CPF consistente entre o cadastro e os documentos.")
+
+
+def regra_rg(fatos):
+    rgs = fatos["harmonizacao_consistencia"]["rgs_encontrados"]
+    detalhe = divergencias([(normalizar_documento(r["normalizado"]), r["documento"]) for r in rgs if not eh_vazio(r["normalizado"])])
+    if detalhe:
+        return finding("ERRO", REGRA_RG, f"Números de RG divergentes: {detalhe}.")
+    return finding("OK", REGRA_RG, "Número de RG consistente entre os documentos.")
+
+
+def regra_data_nascimento(fatos):
+    datas = fatos["harmonizacao_consistencia"]["datas_nascimento_encontradas"]
+    detalhe = divergencias([(normalizar_data(d["data"]), d["documento"]) for d in datas if not eh_vazio(d["data"])])
+    if detalhe:
+        return finding("ERRO", REGRA_DATA_NASCIMENTO, f"Datas de nascimento divergentes: {detalhe}.")
+    return finding("OK", REGRA_DATA_NASCIMENTO, "Data de nascimento consistente entre os documentos.")
+
+
+def regra_rg_vencido(fatos):
+    rg = fatos["fatos_especificos"]["rg"]
+    vencimento = rg.get("calculado_data_vencimento")
+    hoje = date.fromisoformat(fatos["referencias_calculadas"]["data_hoje"])
+    if not vencimento:
+        return finding("AVISO", REGRA_RG_VENCIDO, "Não foi possível calcular o vencimento do RG (data de expedição ausente ou inválida).")
+    if date.fromisoformat(vencimento) < hoje:
+        return finding("ERRO", REGRA_RG_VENCIDO, f"RG vencido em {vencimento}.", [rg.get("documento")])
+    return finding("OK", REGRA_RG_VENCIDO, f"RG válido até {vencimento}.")
+
+
+def regra_rg_a_vencer(fatos):
+    vencimento = fatos["fatos_especificos"]["rg"].get("calculado_data_vencimento")
+    if not vencimento:
+        return None
+    vencimento_dt = date.fromisoformat(vencimento)
+    hoje = date.fromisoformat(fatos["referencias_calculadas"]["data_hoje"])
+    limite = date.fromisoformat(fatos["referencias_calculadas"]["data_limite_curso_4_anos"])
+    if hoje <= vencimento_dt < limite:
+        return finding("AVISO", REGRA_RG_A_VENCER, f"RG vencerá em {vencimento}, antes da conclusão do curso prevista para {limite.year}.")
+    return None
+
+
+def regra_comprovante_vencido(fatos):
+    comprovante = fatos["fatos_especificos"]["comprovante_residencia"]
+    if not comprovante:
+        return None
+    emissao = comprovante.get("calculado_data_emissao")
+    limite = date.fromisoformat(fatos["referencias_calculadas"]["data_limite_comprovante_3_meses"])
+    if not emissao:
+        return finding("AVISO", REGRA_COMPROVANTE_VENCIDO, "Data de emissão do comprovante não identificada.")
+    if date.fromisoformat(emissao) < limite:
+        return finding("ERRO", REGRA_COMPROVANTE_VENCIDO, f"Comprovante emitido em {emissao}, há mais de 3 meses.", [comprovante.get("documento")])
+    return finding("OK", REGRA_COMPROVANTE_VENCIDO, f"Comprovante emitido em {emissao}, dentro do prazo de 3 meses.")
+
+
+def regra_conclusao(fatos):
+    historico = fatos["fatos_especificos"]["historico_escolar"]
+    if historico.get("certificacao_conclusao") is True:
+        return finding("OK", REGRA_CONCLUSAO, "Histórico escolar com certificação de conclusão.")
+    return finding("ERRO", REGRA_CONCLUSAO, "Histórico escolar sem certificação de conclusão.", [historico.get("documento")])
+
+
+def regra_obrigatorios(fatos):
+    ausentes = []
+    if not fatos["fatos_especificos"]["rg"]:
+        ausentes.append("RG")
+    if not fatos["fatos_especificos"]["historico_escolar"]:
+        ausentes.append("Histórico Escolar")
+    if ausentes:
+        return finding("ERRO", REGRA_OBRIGATORIOS, f"Documentos obrigatórios ausentes: {', '.join(ausentes)}.")
+    return finding("OK", REGRA_OBRIGATORIOS, "RG e Histórico Escolar presentes.")
+
+
+REGRAS_DETERMINISTICAS = {
+    2: regra_cpf,
+    3: regra_rg,
+    4: regra_data_nascimento,
+    6: regra_rg_vencido,
+    7: regra_comprovante_vencido,
+    9: regra_conclusao,
+    10: regra_obrigatorios,
+    11: regra_rg_a_vencer,
+}
+
+
+def avaliar_regras(fatos, ignorar=()) -> list:
+    """Findings das regras 2, 3, 4, 6, 7, 9, 10 e 11, no mesmo formato devolvido pela IA"""
+    findings = []
+    for numero, regra in REGRAS_DETERMINISTICAS.items():
+        if numero in ignorar:
+            continue
+        resultado = regra(fatos)
+        if resultado:
+            findings.append(resultado)
+    return findings
+
+
+def avaliar_par_regra(regra, pares, descricao_ok, descricao_erro, reprovar_divergentes=False):
+    """Finding de uma regra de nomes, ou None quando há pares ambíguos e nenhum divergente"""
+    divergentes = [p for p in pares if p["resultado"] == NAO_MATCH]
+    if divergentes:
+        detalhe = "; ".join(f"'{p['nome_a']}' x '{p['nome_b']}' ({p['documento']})" for p in divergentes)
+        documentos = [p["documento"] for p in divergentes] if reprovar_divergentes else None
+        return finding("ERRO", regra, f"{descricao_erro}: {detalhe}.", documentos)
+    if any(p["resultado"] == AMBIGUO for p in pares):
+        return None
+    return finding("OK", regra, descricao_ok)
+
+
+def avaliar_regras_nomes(fatos, ignorar=()):
+    """
+    Resolve as regras 1, 5 e 8 com a comparação local de nomes (nomes.py).
+    Retorna (findings, pares_ambiguos); pares_ambiguos = {regra: [pares]} que precisam da IA.
+    """
+    findings = []
+    pares_ambiguos = {}
+    comparacao = fatos["harmonizacao_consistencia"]["comparacao_nomes"]
+
+    # O cadastro é a referência do nome; na filiação não há como saber qual documento está errado
+    regras = [
+        (1, REGRA_NOME, comparacao["nome"], "Todos os nomes estão consistentes entre os documentos.", "Nome divergente do cadastro", True),
+        (5, REGRA_FILIACAO, comparacao["filiacao"], "Filiação consistente entre os documentos.", "Filiação divergente entre documentos", False),
+    ]
+    for numero, regra, pares, descricao_ok, descricao_erro, reprovar in regras:
+        if numero in ignorar:
+            continue
+        resultado = avaliar_par_regra(regra, pares, descricao_ok, descricao_erro, reprovar)
+        if resultado:
+            findings.append(resultado)
+        else:
+            pares_ambiguos[regra] = [p for p in pares if p["resultado"] == AMBIGUO]
+
+    titularidade = comparacao["titularidade"]
+    if titularidade and 8 not in ignorar:
+        if titularidade["resultado"] == MATCH:
+            findings.append(finding("OK", REGRA_TITULARIDADE, "Titular do comprovante é o candidato ou um dos pais."))
+        elif titularidade["resultado"] == AMBIGUO:
+            pares_ambiguos[REGRA_TITULARIDADE] = [titularidade]
+        elif documento_enviado(fatos, "responsavel"):
+            findings.append(finding("AVISO", REGRA_TITULARIDADE, f"Titular do comprovante ({titularidade['nome_a']}) não é o candidato nem um dos pais; vínculo com o responsável requer análise humana."))
+        else:
+            findings.append(finding("ERRO", REGRA_TITULARIDADE, f"Titular do comprovante ({titularidade['nome_a']}) não é o candidato nem um dos pais, e o documento do responsável não foi enviado.", [titularidade["documento"]]))
+
+    return findings, pares_ambiguos
+
+
+# Tipos de documento (tipo_id) lidos por cada regra, e se ela usa o cadastro e a data de hoje.
+# Uma regra só é reavaliada quando a impressão dessas entradas muda.
+# Nomes, CPFs, datas de nascimento, filiação e documentos enviados vêm do loop genérico do
+# prepare_facts_for_ai, que lê todo documento: as regras sobre essas listas dependem de TODOS_OS_TIPOS.
+TODOS_OS_TIPOS = None
+DEPENDENCIAS_REGRAS = {
+    1: (TODOS_OS_TIPOS, True, False),
+    2: (TODOS_OS_TIPOS, True, False),
+    3: ((1,), False, False),
+    4: (TODOS_OS_TIPOS, False, False),
+    5: (TODOS_OS_TIPOS, False, False),
+    6: ((1,), False, True),
+    7: ((4,), False, True),
+    8: (TODOS_OS_TIPOS, True, False),
+    9: ((3,), False, False),
+    10: ((1, 3), False, False),
+    11: ((1,), False, True),
+    13: (TODOS_OS_TIPOS, True, False),
+}
+
+
+def impressao(valor) -> str:
+    return hashlib.sha256(json.dumps(valor, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def impressoes_regras(documents, candidate, data_hoje) -> dict:
+    """Impressão das entradas de cada regra a partir da impressão de cada documento"""
+    impressoes_documentos = sorted(
+        (doc["tipo_id"], doc.get("documento_id"), impressao(doc["dados"])) for doc in documents
+    )
+    resultado = {}
+    for numero, (tipos, usa_cadastro, usa_data) in DEPENDENCIAS_REGRAS.items():
+        entradas = [d for d in impressoes_documentos if tipos is TODOS_OS_TIPOS or d[0] in tipos]
+        if usa_cadastro:
+            entradas.append(("cadastro", candidate["nome"], candidate["cpf"]))
+        if usa_data:
+            entradas.append(("data_hoje", data_hoje))
+        resultado[str(numero)] = impressao(entradas)
+    return resultado
+
+
+def numero_regra(finding_regra):
+    encontrado = re.search(r"Regra (\d+)", finding_regra.get("regra", ""))
+    return encontrado.group(1) if encontrado else None
+
+
+def agrupar_por_regra(findings) -> dict:
+    grupos = {}
+    for f in findings:
+        numero = numero_regra(f)
+        if numero:
+            grupos.setdefault(numero, []).append(f)
+    return grupos
+
+
+def decidir(findings):
+    """Retorna (decisao_final, observacao_final) a partir dos findings"""
+    erros = [f["detalhe"] for f in findings if f["tipo"] == "ERRO"]
+    if erros:
+        return "pendente", " ".join(erros)
+    avisos = [f["detalhe"] for f in findings if f["tipo"] == "AVISO"]
+    return "aprovado", " ".join(avisos) if avisos else OBSERVACAO_SEM_AVISOS
@@ -4,33 +4,72 @@ from flask import Flask, request, jsonify
 import boto3
 import json
 import os
+import time
+import uuid
 import tempfile
+import threading
 import requests
-from apis.ai_rg import processar_rg
-from apis.ai_historico_escolar import processar_historico_escolar
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from lotes import AcumuladorLote
+from apis.ingestao import processar_documento, copiar_estatisticas_cascata
+from apis.triagem import ArquivoGrandeDemais, TRIAGEM_ATIVA, TRIAGEM_MAX_BYTES, motivo_tamanho, resultado_triagem
+from apis.ai_rg import TIPO_RG
+from apis.ai_historico_escolar import TIPO_HISTORICO_ESCOLAR
 # from apis.ai_conclusao_em import processar_conclusao_em
-from apis.ai_comprovante_residencial import processar_comprovante_residencial
-from apis.ai_reservista import processar_reservista
-from apis.ai_certidao_nascimento import processar_certidao_nascimento
-from apis.ai_enem import processar_enem
+from apis.ai_comprovante_residencial import TIPO_COMPROVANTE_RESIDENCIAL
+from apis.ai_reservista import TIPO_RESERVISTA
+from apis.ai_certidao_nascimento import TIPO_CERTIDAO_NASCIMENTO
+from apis.ai_enem import TIPO_ENEM
 
 app = Flask(__name__)
 
 s3_client = boto3.client('s3', region_name='us-east-1')
-sqs_client = boto3.client('sqs', region_name='us-east-1')
+sqs_client = boto3.client('sqs', region_name='us-east-1', endpoint_url=os.getenv('SQS_ENDPOINT_URL'))
 
 BUCKET_NAME = os.getenv('S3_BUCKET_NAME') 
 SQS_QUEUE_URL = os.getenv('SQS_QUEUE_URL')  
 BACKEND_URL = os.getenv('BACKEND_URL')  
 API_KEY = os.getenv('API_KEY')  
+S3_MODO_STREAMING = os.getenv('S3_MODO_STREAMING', 'true').lower() == 'true'
+# Teto de memória por documento, independente da triagem: objetos maiores nem são baixados
+S3_MAX_BYTES = int(os.getenv('S3_MAX_BYTES', str(20 * 1024 * 1024)))
+BACKEND_POOL_SIZE = int(os.getenv('BACKEND_POOL_SIZE', '10'))
+# Modo job do /processar: workers, limite de jobs na fila e tempo que um resultado fica disponível
+JOBS_MAX_WORKERS = int(os.getenv('JOBS_MAX_WORKERS', '4'))
+JOBS_MAX_PENDENTES = int(os.getenv('JOBS_MAX_PENDENTES', '100'))
+JOBS_TTL = int(os.getenv('JOBS_TTL', '3600'))
+PROCESSAR_ASYNC_PADRAO = os.getenv('PROCESSAR_ASYNC_PADRAO', 'false').lower() == 'true'
+# Compila o grafo do verify_docs ao subir o servidor, fora do caminho da primeira requisição
+VERIFY_PRE_CARREGAR = os.getenv('VERIFY_PRE_CARREGAR', 'true').lower() == 'true'
+
+# Sessão compartilhada: reaproveita conexões keep-alive com o backend
+http_session = requests.Session()
+http_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=BACKEND_POOL_SIZE))
+http_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=BACKEND_POOL_SIZE))
+http_session.headers.update({
+    "X-API-Key": API_KEY or "",
+    "Content-Type": "application/json"
+})
 
 print(f"Configurações carregadas:")
 print(f"  - S3 Bucket: {BUCKET_NAME}")
 print(f"  - SQS Queue: {SQS_QUEUE_URL}")
 
+def limite_arquivo_s3():
+    # Com a triagem ligada vale o menor dos dois limites; sem ela o S3_MAX_BYTES continua protegendo a memória
+    return min(S3_MAX_BYTES, TRIAGEM_MAX_BYTES) if TRIAGEM_ATIVA else S3_MAX_BYTES
+
+
 def baixar_arquivo_s3(caminho_arquivo):
     """Baixa um arquivo do S3 para um arquivo temporário local"""
     try:
+        # O arquivo baixado é lido inteiro depois: o tamanho é conferido antes do download
+        tamanho = s3_client.head_object(Bucket=BUCKET_NAME, Key=caminho_arquivo).get('ContentLength', 0)
+        motivo = motivo_tamanho(tamanho, limite_arquivo_s3())
+        if motivo:
+            raise ArquivoGrandeDemais(motivo)
+
         ext = os.path.splitext(caminho_arquivo)[1] or '.pdf'
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=ext)
         temp_path = temp_file.name
@@ -40,10 +79,50 @@ def baixar_arquivo_s3(caminho_arquivo):
         print(f"Arquivo baixado do S3: {caminho_arquivo} -> {temp_path}")
         
         return temp_path
+    except ArquivoGrandeDemais:
+        raise
     except Exception as e:
         print(f"Erro ao baixar arquivo do S3: {e}")
         raise
 
+def carregar_arquivo_s3(caminho_arquivo):
+    """
+    Lê um arquivo do S3 via get_object e retorna os bytes. Objetos acima de limite_arquivo_s3()
+    não são baixados: o ContentLength já basta para reprovar (levanta ArquivoGrandeDemais).
+    """
+    try:
+        response = s3_client.get_object(Bucket=BUCKET_NAME, Key=caminho_arquivo)
+        tamanho = response.get('ContentLength', 0)
+
+        motivo = motivo_tamanho(tamanho, limite_arquivo_s3())
+        if motivo:
+            response['Body'].close()
+            raise ArquivoGrandeDemais(motivo)
+
+        conteudo = response['Body'].read()
+        print(f"Arquivo lido do S3 em memória: {caminho_arquivo} ({tamanho} bytes)")
+        return conteudo
+    except ArquivoGrandeDemais:
+        raise
+    except Exception as e:
+        print(f"Erro ao baixar arquivo do S3: {e}")
+        raise
+
+def montar_payload_status(resultado):
+    payload = {
+        "documentoId": resultado["documentoId"],
+        "status": resultado["status"]
+    }
+    
+    if "dadosExtraidos" in resultado and resultado["dadosExtraidos"]:
+        payload["dadosExtraidos"] = json.dumps(resultado["dadosExtraidos"])
+    
+    if "motivoErro" in resultado and resultado["motivoErro"]:
+        motivo_erro_obj = {"mensagem": resultado["motivoErro"]}
+        payload["motivoErro"] = json.dumps(motivo_erro_obj)
+
+    return payload
+
 def atualizar_status_backend(resultado):
 
     if not resultado.get("documentoId"):
@@ -51,27 +130,11 @@ def atualizar_status_backend(resultado):
         return False
     try:
         url = f"{BACKEND_URL}/api/documentos/atualizar-status"
-        
-        payload = {
-            "documentoId": resultado["documentoId"],
-            "status": resultado["status"]
-        }
-        
-        if "dadosExtraidos" in resultado and resultado["dadosExtraidos"]:
-            payload["dadosExtraidos"] = json.dumps(resultado["dadosExtraidos"])
-        
-        if "motivoErro" in resultado and resultado["motivoErro"]:
-            motivo_erro_obj = {"mensagem": resultado["motivoErro"]}
-            payload["motivoErro"] = json.dumps(motivo_erro_obj)
+        payload = montar_payload_status(resultado)
         
         print(f"Atualizando status no backend: {payload}")
         
-        headers = {
-            "X-API-Key": API_KEY,
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        response = http_session.post(url, json=payload, timeout=30)
         response.raise_for_status()
         
         print(f"Status atualizado com sucesso: {response.status_code}")
@@ -83,59 +146,123 @@ def atualizar_status_backend(resultado):
         print(f"Erro inesperado ao atualizar status no backend: {e}")
         return False
 
-def escolher_pipeline(payload):
+def enviar_lote_status_backend(payloads):
+    """
+    Envia vários status em uma única chamada ao endpoint de lote do backend.
+    Retorna os documentoId que o backend recebeu (inclusive os recusados por ele, que não adianta reenviar).
+    """
+    url = f"{BACKEND_URL}/api/documentos/atualizar-status/lote"
+    print(f"Atualizando {len(payloads)} status no backend em lote")
+    try:
+        response = http_session.post(url, json=payloads, timeout=30)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"Erro no envio em lote, reenviando individualmente: {e}")
+        entregues = set()
+        for payload in payloads:
+            try:
+                http_session.post(f"{BACKEND_URL}/api/documentos/atualizar-status", json=payload, timeout=30).raise_for_status()
+                entregues.add(payload["documentoId"])
+            except requests.exceptions.RequestException as erro:
+                print(f"Erro de comunicação com o backend (documento {payload['documentoId']}): {erro}")
+        return entregues
+
+    for item in response.json():
+        if item.get("erro"):
+            print(f"Backend recusou status do documento {item.get('documentoId')}: {item['erro']}")
+    return {payload["documentoId"] for payload in payloads}
+
+class StatusBackendEmLote:
+    """
+    Acumula atualizações de status e as envia ao backend em lote.
+    `ao_confirmar` roda só depois que o backend recebeu o status (ex: remover a mensagem da fila):
+    se o processo cair antes, a mensagem volta para a fila em vez de o resultado se perder.
+    """
+
+    def __init__(self, tamanho_max=20, janela=1.0):
+        self._acumulador = AcumuladorLote(self._enviar, tamanho_max, janela, nome="status-backend")
+
+    def __call__(self, resultado, ao_confirmar=None):
+        if not resultado.get("documentoId"):
+            print("Erro Crítico: Tentativa de atualizar status sem documentoId.")
+            # Não há status a entregar: reprocessar a mensagem não mudaria nada
+            if ao_confirmar:
+                ao_confirmar()
+            return False
+        self._acumulador.adicionar((montar_payload_status(resultado), ao_confirmar))
+        return True
+
+    def _enviar(self, itens):
+        entregues = enviar_lote_status_backend([payload for payload, _ in itens])
+        for payload, ao_confirmar in itens:
+            if not ao_confirmar:
+                continue
+            if payload["documentoId"] in entregues:
+                ao_confirmar()
+            else:
+                print(f"Status do documento {payload['documentoId']} não confirmado; a mensagem voltará para a fila.")
+
+    def encerrar(self):
+        self._acumulador.encerrar()
+
+def resolver_tipo_documento(tipo, subtipo):
+    """Retorna (TipoDocumento, None) ou (None, motivoErro) a partir do tipo/subtipo enviados pelo backend"""
+    tipo = (tipo or "").lower()
+    if "identidade" in tipo:
+        if subtipo == "rg":
+            return TIPO_RG, None
+        elif subtipo == "cin":
+            # TODO: Implementar processamento de CIN
+            return None, "CIN não implementado ainda"
+        else:
+            return None, f"Subtipo '{subtipo}' não reconhecido para documentos de identidade"
+    # elif "conclusao_em" in tipo or "certificado" in tipo:
+    #     return TIPO_CONCLUSAO_EM, None
+    elif "histórico escolar" in tipo:
+        return TIPO_HISTORICO_ESCOLAR, None
+    elif "comprovante de residência" in tipo:
+        return TIPO_COMPROVANTE_RESIDENCIAL, None
+    elif "certificado de reservista (obrigatório para homens)" in tipo:
+        return TIPO_RESERVISTA, None
+    elif "certidão de nascimento ou casamento" in tipo:
+        return TIPO_CERTIDAO_NASCIMENTO, None
+    elif "boletim do enem (obrigatório para alunos que entram pelo sisu ou pela nota do enem)" in tipo:
+        return TIPO_ENEM, None
+    return None, f"Tipo de documento '{tipo}' não reconhecido."
+
+def remover_arquivo_temporario(arquivo_local):
+    if isinstance(arquivo_local, str) and os.path.exists(arquivo_local):
+        os.remove(arquivo_local)
+        print(f"Arquivo temporário removido: {arquivo_local}")
+
+def escolher_pipeline(payload, notificar=atualizar_status_backend):
     documento_id = payload["documentoId"]
 
     try:
         tipo = payload.get("tipoDocumento", "").lower()
         subtipo = payload.get("subtipo")
         caminho = payload["caminhoArquivo"]
-        documento_id = payload["documentoId"]
         
         print(f"Processando documento ID: {documento_id}")
         print(f"Tipo: {tipo}, Subtipo: {subtipo}, Caminho: {caminho}")
         
-        arquivo_local = None
-        resultado = None
-
-            
-        try:
-            arquivo_local = baixar_arquivo_s3(caminho)
-
-            if "identidade" in tipo:
-                if subtipo == "rg":
-                    resultado = processar_rg(arquivo_local)
-                elif subtipo == "cin":
-                    # TODO: Implementar processamento de CIN
-                    return {
-                        "documentoId": documento_id, 
-                        "status": "erro", 
-                        "motivoErro": "CIN não implementado ainda"
-                    }
+        # Resolve o tipo antes de baixar: documentos não suportados nem chegam a ir ao S3
+        tipo_documento, motivo_erro = resolver_tipo_documento(tipo, subtipo)
+        if tipo_documento is None:
+            resultado = {"status": "erro", "motivoErro": motivo_erro}
+        else:
+            arquivo_local = None
+            try:
+                if S3_MODO_STREAMING:
+                    arquivo_local = carregar_arquivo_s3(caminho)
                 else:
-                    return {
-                        "documentoId": documento_id, 
-                        "status": "erro", 
-                        "motivoErro": f"Subtipo '{subtipo}' não reconhecido para documentos de identidade"
-                    }
-            # elif "conclusao_em" in tipo or "certificado" in tipo:
-            #     resultado = processar_conclusao_em(arquivo_local)
-            elif "histórico escolar" in tipo:
-                resultado = processar_historico_escolar(arquivo_local)
-            elif "comprovante de residência" in tipo:
-                resultado = processar_comprovante_residencial(arquivo_local)
-            elif "certificado de reservista (obrigatório para homens)" in tipo:
-                resultado = processar_reservista(arquivo_local)
-            elif "certidão de nascimento ou casamento" in tipo:
-                resultado = processar_certidao_nascimento(arquivo_local)
-            elif "boletim do enem (obrigatório para alunos que entram pelo sisu ou pela nota do enem)" in tipo:
-                resultado = processar_enem(arquivo_local)
-            else:
-                resultado = {"status": "erro", "motivoErro": f"Tipo de documento '{tipo}' não reconhecido."}
-        finally:
-            if arquivo_local and os.path.exists(arquivo_local):
-                os.remove(arquivo_local)
-                print(f"Arquivo temporário removido: {arquivo_local}")            
+                    arquivo_local = baixar_arquivo_s3(caminho)
+
+                resultado = processar_documento(tipo_documento, arquivo_local, caminho)
+            except ArquivoGrandeDemais as e:
+                resultado = resultado_triagem(tipo_documento, str(e))
+            finally:
+                remover_arquivo_temporario(arquivo_local)
     except Exception as e:
         print(f"Erro no processamento do documento {documento_id}: {e}")
         resultado = {
@@ -143,9 +270,62 @@ def escolher_pipeline(payload):
             "motivoErro": f"Erro inesperado no pipeline: {str(e)}"
         }
     resultado["documentoId"] = documento_id
-    atualizar_status_backend(resultado)
+    notificar(resultado)
     return resultado
 
+def executar_verificacao(matricula_id):
+    """Roda o grafo de verificação de documentos de uma matrícula"""
+    # Import tardio: LangGraph/LangChain só são carregados por quem usa a verificação
+    from verify_docs import verificar_matricula
+
+    final_state = verificar_matricula(matricula_id) or {}
+
+    return {
+        "status": final_state.get("final_status", "pendente"),
+        "observacao": final_state.get("final_observation", "Erro na verificação")
+    }
+
+
+def converter_ids_matricula(matricula_ids):
+    """Retorna (lista de ids inteiros, erro); o MySQL devolve matricula_id como int, então "12" vira 12"""
+    convertidos = []
+    for mid in matricula_ids:
+        if isinstance(mid, bool) or isinstance(mid, float) and not mid.is_integer():
+            return None, f"ID de matrícula inválido: {mid!r}"
+        try:
+            convertidos.append(int(mid))
+        except (TypeError, ValueError):
+            return None, f"ID de matrícula inválido: {mid!r}"
+    return convertidos, None
+
+
+def executar_verificacao_lote(matricula_ids):
+    """Verifica várias matrículas com uma consulta e uma transação de escrita"""
+    from verify_docs import verificar_matriculas_em_lote
+
+    estados = verificar_matriculas_em_lote(matricula_ids)
+    return [
+        {"matricula_id": mid, "erro": estado["erro"]} if estado.get("erro") else {
+            "matricula_id": mid,
+            "status": estado.get("final_status", "pendente"),
+            "observacao": estado.get("final_observation", "Erro na verificação")
+        }
+        for mid, estado in estados.items()
+    ]
+
+
+def pre_carregar_verificacao():
+    """Compila o grafo em segundo plano para a primeira chamada de /verify-docs não pagar esse custo"""
+    def carregar():
+        try:
+            from verify_docs import obter_grafo
+            obter_grafo()
+        except Exception as e:
+            print(f"Aviso: não foi possível pré-carregar o grafo de verificação: {e}")
+
+    threading.Thread(target=carregar, daemon=True, name="pre-carregar-verificacao").start()
+
+
 # Rota para verificar documentos
 @app.route("/verify-docs", methods=["POST"])
 def verify_docs():
@@ -154,25 +334,7 @@ def verify_docs():
         if not payload or "matricula_id" not in payload:
             return jsonify({"erro": "ID da matrícula não fornecido"}), 400
 
-        # Importa a função verify do módulo verify_docs
-        from verify_docs import app as verify_workflow
-        
-        # Executa a verificação
-        inputs = {"matricula_id": payload["matricula_id"]}
-        final_state = None
-        
-        for state in verify_workflow.stream(inputs):
-            final_state = state
-            
-        # Pega o resultado final
-        result = final_state.get("END", {})
-        
-        response = {
-            "status": result.get("final_status", "pendente"),
-            "observacao": result.get("final_observation", "Erro na verificação")
-        }
-        
-        return jsonify(response)
+        return jsonify(executar_verificacao(payload["matricula_id"]))
         
     except Exception as e:
         print(f"Erro ao verificar documentos: {e}")
@@ -181,6 +343,27 @@ def verify_docs():
             "observacao": f"Erro ao verificar documentos: {str(e)}"
         }), 500
 
+@app.route("/verify-docs/batch", methods=["POST"])
+def verify_docs_batch():
+    try:
+        payload = request.get_json()
+        matricula_ids = (payload or {}).get("matricula_ids")
+        if not matricula_ids or not isinstance(matricula_ids, list):
+            return jsonify({"erro": "Lista de IDs de matrícula não fornecida"}), 400
+        matricula_ids, erro = converter_ids_matricula(matricula_ids)
+        if erro:
+            return jsonify({"erro": erro}), 400
+
+        from verify_docs import VERIFY_LOTE_MAX
+        if len(matricula_ids) > VERIFY_LOTE_MAX:
+            return jsonify({"erro": f"Máximo de {VERIFY_LOTE_MAX} matrículas por lote"}), 400
+
+        return jsonify({"resultados": executar_verificacao_lote(matricula_ids)})
+
+    except Exception as e:
+        print(f"Erro ao verificar documentos em lote: {e}")
+        return jsonify({"erro": f"Erro ao verificar documentos em lote: {str(e)}"}), 500
+
 def processar_mensagem_sqs():
     """Processa mensagens da fila SQS"""
     try:
@@ -234,16 +417,76 @@ def processar_mensagem_sqs():
             "motivoErro": f"Erro ao acessar SQS: {str(e)}"
         }
 
+executor_jobs = ThreadPoolExecutor(max_workers=JOBS_MAX_WORKERS, thread_name_prefix="job")
+jobs = {}
+jobs_lock = threading.Lock()
+
+def executar_job(job_id, payload):
+    with jobs_lock:
+        jobs[job_id]["status"] = "processando"
+    try:
+        # escolher_pipeline também dispara o callback para o backend ao terminar
+        resultado = escolher_pipeline(payload)
+        atualizacao = {"status": "concluido", "resultado": resultado}
+    except Exception as e:
+        atualizacao = {"status": "erro", "erro": str(e)}
+    with jobs_lock:
+        jobs[job_id].update(atualizacao, finalizado_em=time.time())
+
+def criar_job(payload):
+    """Enfileira o processamento e retorna o id do job, ou None se a fila estiver cheia"""
+    agora = time.time()
+    with jobs_lock:
+        expirados = [
+            job_id for job_id, job in jobs.items()
+            if job.get("finalizado_em") and agora - job["finalizado_em"] > JOBS_TTL
+        ]
+        for job_id in expirados:
+            del jobs[job_id]
+
+        pendentes = sum(1 for job in jobs.values() if job["status"] in ("pendente", "processando"))
+        if pendentes >= JOBS_MAX_PENDENTES:
+            return None
+
+        job_id = uuid.uuid4().hex
+        jobs[job_id] = {
+            "jobId": job_id,
+            "documentoId": payload.get("documentoId"),
+            "status": "pendente",
+            "criado_em": agora
+        }
+    executor_jobs.submit(executar_job, job_id, payload)
+    return job_id
+
 # Endpoint para testes manuais (pode ser chamado pelo backend)
+# Com ?async=true responde na hora com um jobId, consultável em GET /jobs/<jobId>
 @app.route("/processar", methods=["POST"])
 def processar():
     try:
         payload = request.get_json()
-        resultado = escolher_pipeline(payload)
-        return jsonify(resultado)
+        modo_async = request.args.get("async", str(PROCESSAR_ASYNC_PADRAO)).lower() == "true"
+        if not modo_async:
+            resultado = escolher_pipeline(payload)
+            return jsonify(resultado)
+
+        if not payload or "documentoId" not in payload:
+            return jsonify({"erro": "documentoId não fornecido"}), 400
+
+        job_id = criar_job(payload)
+        if job_id is None:
+            return jsonify({"erro": "Fila de processamento cheia, tente novamente mais tarde"}), 503
+        return jsonify({"jobId": job_id, "status": "pendente", "url": f"/jobs/{job_id}"}), 202
     except Exception as e:
         return jsonify({"erro": str(e)}), 500
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def consultar_job(job_id):
+    with jobs_lock:
+        job = dict(jobs[job_id]) if job_id in jobs else None
+    if job is None:
+        return jsonify({"erro": "Job não encontrado"}), 404
+    return jsonify(job)
+
 # Endpoint para processar mensagens do SQS
 @app.route("/processar-sqs", methods=["POST"])
 def processar_sqs():
@@ -265,8 +508,11 @@ def health():
         "configuracoes": {
             "s3_bucket": BUCKET_NAME,
             "sqs_queue": SQS_QUEUE_URL
-        }
+        },
+        "cascata_modelos": copiar_estatisticas_cascata()
     })
 
 if __name__ == "__main__":
+    if VERIFY_PRE_CARREGAR:
+        pre_carregar_verificacao()
     app.run(debug=True, port=5000, host='0.0.0.0')
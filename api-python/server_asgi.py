@@ -0,0 +1,95 @@
+import asyncio
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from server import (
+    BUCKET_NAME, SQS_QUEUE_URL, VERIFY_PRE_CARREGAR, executar_verificacao,
+    executar_verificacao_lote, converter_ids_matricula, pre_carregar_verificacao
+)
+from pipeline_async import escolher_pipeline_async, fechar_recursos
+
+# Variante ASGI do server.py: cada documento ocupa uma corrotina, não uma thread do servidor.
+# Executar com: uvicorn server_asgi:app --host 0.0.0.0 --port 5000
+
+
+async def processar(request):
+    try:
+        payload = await request.json()
+        resultado = await escolher_pipeline_async(payload)
+        return JSONResponse(resultado)
+    except Exception as e:
+        return JSONResponse({"erro": str(e)}, status_code=500)
+
+
+async def verify_docs(request):
+    try:
+        payload = await request.json()
+        if not payload or "matricula_id" not in payload:
+            return JSONResponse({"erro": "ID da matrícula não fornecido"}, status_code=400)
+
+        # O grafo de verificação é síncrono (MySQL + LangChain): roda numa thread
+        return JSONResponse(await asyncio.to_thread(executar_verificacao, payload["matricula_id"]))
+
+    except Exception as e:
+        print(f"Erro ao verificar documentos: {e}")
+        return JSONResponse({
+            "status": "pendente",
+            "observacao": f"Erro ao verificar documentos: {str(e)}"
+        }, status_code=500)
+
+
+async def verify_docs_batch(request):
+    try:
+        payload = await request.json()
+        matricula_ids = (payload or {}).get("matricula_ids")
+        if not matricula_ids or not isinstance(matricula_ids, list):
+            return JSONResponse({"erro": "Lista de IDs de matrícula não fornecida"}, status_code=400)
+        matricula_ids, erro = converter_ids_matricula(matricula_ids)
+        if erro:
+            return JSONResponse({"erro": erro}, status_code=400)
+
+        from verify_docs import VERIFY_LOTE_MAX
+        if len(matricula_ids) > VERIFY_LOTE_MAX:
+            return JSONResponse({"erro": f"Máximo de {VERIFY_LOTE_MAX} matrículas por lote"}, status_code=400)
+
+        resultados = await asyncio.to_thread(executar_verificacao_lote, matricula_ids)
+        return JSONResponse({"resultados": resultados})
+
+    except Exception as e:
+        print(f"Erro ao verificar documentos em lote: {e}")
+        return JSONResponse({"erro": f"Erro ao verificar documentos em lote: {str(e)}"}, status_code=500)
+
+
+async def health(request):
+    return JSONResponse({
+        "status": "ok",
+        "mensagem": "Servidor de IA funcionando (ASGI)",
+        "configuracoes": {
+            "s3_bucket": BUCKET_NAME,
+            "sqs_queue": SQS_QUEUE_URL
+        }
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if VERIFY_PRE_CARREGAR:
+        pre_carregar_verificacao()
+    yield
+    await fechar_recursos()
+
+
+app = Starlette(
+    routes=[
+        Route("/processar", processar, methods=["POST"]),
+        Route("/verify-docs", verify_docs, methods=["POST"]),
+        Route("/verify-docs/batch", verify_docs_batch, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+    ],
+    lifespan=lifespan
+)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -0,0 +1,70 @@
+import os
+import sys
+
+# Confere a comparação local de nomes (nomes.py) que decide quais pares vão para a IA auditora.
+# Roda sem IA nem banco: python tests/teste10_nomes.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nomes import MATCH, NAO_MATCH, AMBIGUO, comparar_nomes, comparar_par, melhor_correspondencia, tokens_nome
+
+
+def resultado(nome_a, nome_b):
+    return comparar_nomes(nome_a, nome_b)[0]
+
+
+def verificar_tokens():
+    assert tokens_nome("JOSÉ DA CONCEIÇÃO") == ["jose", "conceicao"]
+    assert tokens_nome("Maria  dos   Santos-Silva") == ["maria", "santos", "silva"]
+    assert tokens_nome(None) == []
+
+
+def verificar_iguais():
+    assert comparar_nomes("Maria da Silva", "MARIA DA SILVA") == (MATCH, 1.0)
+    # Acentos, partículas e espaços não contam
+    assert resultado("JOSÉ DA CONCEIÇÃO", "Jose Conceicao") == MATCH
+    assert resultado("Maria Silva", "Maria da Silva") == MATCH
+    # Nome do meio omitido, com prenome e sobrenome presentes
+    assert resultado("Maria Aparecida Souza", "Maria Souza") == MATCH
+
+
+def verificar_iniciais():
+    assert resultado("J. Silva", "João Silva") == MATCH
+    assert resultado("João P. Silva", "João Pedro Silva") == MATCH
+    # A inicial só se expande para um nome que começa com a mesma letra
+    assert resultado("J. Silva", "Pedro Silva") == NAO_MATCH
+
+
+def verificar_divergentes():
+    assert resultado("João Silva", "Pedro Silva") == NAO_MATCH
+    assert resultado("Ana Lima", "Carlos Pereira") == NAO_MATCH
+
+
+def verificar_ambiguos():
+    # Só o prenome não basta para afirmar que é a mesma pessoa
+    assert resultado("Maria", "Maria Silva") == AMBIGUO
+    assert resultado("Ana Lima", "Ana Lins") == AMBIGUO
+    assert comparar_nomes("", "Maria") == (AMBIGUO, 0.0)
+
+
+def verificar_pares():
+    par = comparar_par("maria silva", "maria da silva", "rg")
+    assert par == {"nome_a": "maria silva", "nome_b": "maria da silva", "documento": "rg",
+                   "resultado": MATCH, "similaridade": 1.0}, par
+
+    melhor = melhor_correspondencia("ANA PEREIRA", ["CARLOS LIMA", "ANA PEREIRA LIMA"], "conta")
+    assert melhor["nome_b"] == "ANA PEREIRA LIMA" and melhor["resultado"] == MATCH, melhor
+    assert melhor_correspondencia("ANA PEREIRA", [], "conta")["resultado"] == AMBIGUO
+
+
+if __name__ == "__main__":
+    verificacoes = [
+        verificar_tokens,
+        verificar_iguais,
+        verificar_iniciais,
+        verificar_divergentes,
+        verificar_ambiguos,
+        verificar_pares,
+    ]
+    for verificacao in verificacoes:
+        verificacao()
+    print(f"✅ {len(verificacoes)} verificações de comparação de nomes passaram")
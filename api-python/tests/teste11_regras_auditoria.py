@@ -0,0 +1,243 @@
+import os
+import sys
+import copy
+
+# Confere o resultado (ERRO/OK/AVISO) de cada regra determinística do auditor sobre um dossiê de fatos
+# no formato montado pelo verify_docs. Roda sem IA nem banco: python tests/teste11_regras_auditoria.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nomes import comparar_par, melhor_correspondencia
+from regras_auditoria import (
+    REGRAS_DETERMINISTICAS, REGRA_NOME, REGRA_FILIACAO, REGRA_TITULARIDADE,
+    avaliar_regras, avaliar_regras_nomes, agrupar_por_regra, decidir, impressoes_regras,
+)
+
+# Dossiê de um candidato com tudo em ordem; cada verificação estraga um campo
+FATOS = {
+    "referencias_calculadas": {
+        "data_hoje": "2025-03-10",
+        "data_limite_curso_4_anos": "2029-03-10",
+        "data_limite_comprovante_3_meses": "2024-12-10",
+    },
+    "dados_cadastro": {"nome": "maria da silva", "cpf": "529.982.247-25"},
+    "harmonizacao_consistencia": {
+        "cpfs_encontrados": [
+            {"cpf": "52998224725", "documento": "rg"},
+            {"cpf": "52998224725", "documento": "enem"},
+            # CPF do titular da conta não precisa ser o do candidato
+            {"cpf": "11144477735", "documento": "comprovante de residência"},
+        ],
+        "rgs_encontrados": [
+            {"original": "12.345.678-9", "normalizado": "123456789", "documento": "rg"},
+            {"original": "123456789", "normalizado": "123456789", "documento": "reservista"},
+        ],
+        "datas_nascimento_encontradas": [
+            {"data": "15/04/2005", "documento": "rg"},
+            {"data": "2005-04-15", "documento": "certidão de nascimento"},
+        ],
+        "comparacao_nomes": {
+            "nome": [comparar_par("maria da silva", "MARIA SILVA", "rg")],
+            "filiacao": [{"tipo": "mae", **comparar_par("ANA DA SILVA", "Ana Silva", "certidão de nascimento")}],
+            "titularidade": melhor_correspondencia("ANA DA SILVA", ["ANA DA SILVA"], "comprovante de residência"),
+        },
+    },
+    "fatos_especificos": {
+        "rg": {"documento": "rg", "calculado_data_vencimento": "2032-01-01"},
+        "historico_escolar": {"documento": "histórico escolar", "certificacao_conclusao": True},
+        "comprovante_residencia": {"documento": "comprovante de residência", "calculado_data_emissao": "2025-02-01"},
+        "documentos_enviados": ["rg", "histórico escolar", "comprovante de residência", "certidão de nascimento"],
+    },
+}
+
+
+def fatos(**alteracoes):
+    """Cópia do dossiê com `caminho__do__campo=valor` substituído"""
+    resultado = copy.deepcopy(FATOS)
+    for caminho, valor in alteracoes.items():
+        *pais, campo = caminho.split("__")
+        destino = resultado
+        for chave in pais:
+            destino = destino[chave]
+        destino[campo] = valor
+    return resultado
+
+
+def tipo(numero, dossie):
+    resultado = REGRAS_DETERMINISTICAS[numero](dossie)
+    return resultado["tipo"] if resultado else None
+
+
+def verificar_dossie_valido():
+    findings = avaliar_regras(FATOS)
+    assert {f["tipo"] for f in findings} == {"OK"}, findings
+    # A regra 11 só se manifesta quando o RG vence durante o curso
+    assert len(findings) == len(REGRAS_DETERMINISTICAS) - 1
+    assert decidir(findings)[0] == "aprovado"
+
+
+def verificar_regra_cpf():
+    cpfs = copy.deepcopy(FATOS["harmonizacao_consistencia"]["cpfs_encontrados"])
+    cpfs[1]["cpf"] = "11144477735"
+    resultado = REGRAS_DETERMINISTICAS[2](fatos(harmonizacao_consistencia__cpfs_encontrados=cpfs))
+    assert resultado["tipo"] == "ERRO" and resultado["documentos"] == ["enem"], resultado
+    # Pontuação não é divergência
+    assert tipo(2, fatos(dados_cadastro__cpf="52998224725")) == "OK"
+
+
+def verificar_regra_rg():
+    rgs = copy.deepcopy(FATOS["harmonizacao_consistencia"]["rgs_encontrados"])
+    rgs[1]["normalizado"] = "987654321"
+    assert tipo(3, fatos(harmonizacao_consistencia__rgs_encontrados=rgs)) == "ERRO"
+    rgs[1]["normalizado"] = None
+    assert tipo(3, fatos(harmonizacao_consistencia__rgs_encontrados=rgs)) == "OK"
+
+
+def verificar_regra_data_nascimento():
+    datas = copy.deepcopy(FATOS["harmonizacao_consistencia"]["datas_nascimento_encontradas"])
+    datas[1]["data"] = "16/04/2005"
+    assert tipo(4, fatos(harmonizacao_consistencia__datas_nascimento_encontradas=datas)) == "ERRO"
+    # Formatos diferentes da mesma data são consistentes
+    assert tipo(4, FATOS) == "OK"
+
+
+def verificar_regra_rg_vencido():
+    rg = {"documento": "rg", "calculado_data_vencimento": "2025-03-09"}
+    resultado = REGRAS_DETERMINISTICAS[6](fatos(fatos_especificos__rg=rg))
+    assert resultado["tipo"] == "ERRO" and resultado["documentos"] == ["rg"], resultado
+    assert tipo(6, fatos(fatos_especificos__rg={"documento": "rg"})) == "AVISO"
+
+
+def verificar_regra_comprovante_vencido():
+    comprovante = {"documento": "comprovante de residência", "calculado_data_emissao": "2024-12-09"}
+    assert tipo(7, fatos(fatos_especificos__comprovante_residencia=comprovante)) == "ERRO"
+    comprovante["calculado_data_emissao"] = None
+    assert tipo(7, fatos(fatos_especificos__comprovante_residencia=comprovante)) == "AVISO"
+    assert tipo(7, fatos(fatos_especificos__comprovante_residencia={})) is None
+
+
+def verificar_regra_conclusao():
+    historico = {"documento": "histórico escolar", "certificacao_conclusao": False}
+    assert tipo(9, fatos(fatos_especificos__historico_escolar=historico)) == "ERRO"
+
+
+def verificar_regra_obrigatorios():
+    resultado = REGRAS_DETERMINISTICAS[10](fatos(fatos_especificos__rg={}, fatos_especificos__historico_escolar={}))
+    assert resultado["tipo"] == "ERRO" and "RG, Histórico Escolar" in resultado["detalhe"], resultado
+    assert tipo(10, FATOS) == "OK"
+
+
+def verificar_regra_rg_a_vencer():
+    rg = {"documento": "rg", "calculado_data_vencimento": "2027-06-01"}
+    assert tipo(11, fatos(fatos_especificos__rg=rg)) == "AVISO"
+    # Já vencido é assunto da regra 6
+    rg["calculado_data_vencimento"] = "2025-01-01"
+    assert tipo(11, fatos(fatos_especificos__rg=rg)) is None
+
+
+def verificar_regras_nomes():
+    findings, ambiguos = avaliar_regras_nomes(FATOS)
+    assert [(f["regra"], f["tipo"]) for f in findings] == [
+        (REGRA_NOME, "OK"), (REGRA_FILIACAO, "OK"), (REGRA_TITULARIDADE, "OK")
+    ], findings
+    assert not ambiguos
+
+    comparacao = copy.deepcopy(FATOS["harmonizacao_consistencia"]["comparacao_nomes"])
+    comparacao["nome"] = [comparar_par("maria da silva", "JOANA SILVA", "rg"), comparar_par("maria da silva", "MARIA", "enem")]
+    comparacao["titularidade"] = melhor_correspondencia("CARLOS PEREIRA", ["ANA DA SILVA"], "comprovante de residência")
+    findings, ambiguos = avaliar_regras_nomes(fatos(harmonizacao_consistencia__comparacao_nomes=comparacao))
+    nome = next(f for f in findings if f["regra"] == REGRA_NOME)
+    assert nome["tipo"] == "ERRO" and nome["documentos"] == ["rg"], nome
+    titularidade = next(f for f in findings if f["regra"] == REGRA_TITULARIDADE)
+    assert titularidade["tipo"] == "ERRO", titularidade
+    assert decidir(findings)[0] == "pendente"
+
+    # Só ambíguos: a regra fica para a IA
+    comparacao["nome"] = [comparar_par("maria da silva", "MARIA", "enem")]
+    findings, ambiguos = avaliar_regras_nomes(fatos(harmonizacao_consistencia__comparacao_nomes=comparacao), ignorar={5, 8})
+    assert not findings and list(ambiguos) == [REGRA_NOME], (findings, ambiguos)
+
+
+def verificar_impressoes():
+    documentos = [
+        {"tipo_id": 1, "documento_id": 10, "dados": {"cpf": "52998224725"}},
+        {"tipo_id": 5, "documento_id": 50, "dados": {"cpf": "52998224725", "data_nascimento": "15/04/1980"}},
+    ]
+    candidato = {"nome": "maria da silva", "cpf": "52998224725"}
+    antes = impressoes_regras(documentos, candidato, "2025-03-10")
+    documentos[1]["dados"]["data_nascimento"] = "16/04/1980"
+    depois = impressoes_regras(documentos, candidato, "2025-03-10")
+    mudaram = {numero for numero in antes if antes[numero] != depois[numero]}
+    # O documento do responsável passa pelo loop genérico (nome, CPF, data, filiação); o RG (regra 3) não o lê
+    assert {"1", "2", "4", "5", "8", "13"} <= mudaram and "3" not in mudaram, mudaram
+
+    documentos.append({"tipo_id": 4, "documento_id": 40, "dados": {"filiacao": {"mae": "ANA DA SILVA"}}})
+    com_comprovante = impressoes_regras(documentos, candidato, "2025-03-10")
+    documentos[2]["dados"]["filiacao"]["mae"] = "ANA SOUZA"
+    mudaram = {numero for numero, valor in impressoes_regras(documentos, candidato, "2025-03-10").items()
+               if com_comprovante[numero] != valor}
+    assert {"5", "8"} <= mudaram and not {"3", "6", "9", "10", "11"} & mudaram, mudaram
+
+    grupos = agrupar_por_regra(avaliar_regras(FATOS))
+    assert set(grupos) == {str(n) for n in REGRAS_DETERMINISTICAS if n != 11}, grupos
+
+
+class CacheAuditoriaMemoria:
+    def __init__(self):
+        self.auditorias = {}
+
+    def obter(self, matricula_id):
+        return self.auditorias.get(matricula_id, (None, None))
+
+    def salvar(self, matricula_id, impressoes, findings):
+        self.auditorias[matricula_id] = (impressoes, findings)
+
+
+def verificar_regra_13_sem_duplicar():
+    """Na reauditoria com os mesmos documentos, a IA chamada de novo não pode somar outra regra 13"""
+    import verify_docs
+
+    comparacao = copy.deepcopy(FATOS["harmonizacao_consistencia"]["comparacao_nomes"])
+    comparacao["nome"] = [comparar_par("maria da silva", "MARIA", "enem")]
+    estado = {
+        "matricula_id": 1,
+        "facts_dossier": fatos(harmonizacao_consistencia__comparacao_nomes=comparacao),
+        "documents_data": [{"tipo_id": 8, "documento_id": 80, "tipo_nome": "enem", "dados": {"nome_participante": "MARIA"}}],
+        "candidate_data": {"nome": "maria da silva", "cpf": "52998224725"},
+    }
+    findings_ia = [
+        {"tipo": "OK", "regra": "Regra 1 - Consistência de Nome", "detalhe": "Nome abreviado."},
+        {"tipo": "AVISO", "regra": "Regra 13 - Inconsistências Menores", "detalhe": "Nome abreviado no ENEM."},
+    ]
+    cache_original, ia_original = verify_docs.cache_auditoria, verify_docs.auditar_nomes_com_ia
+    verify_docs.cache_auditoria = CacheAuditoriaMemoria()
+    verify_docs.auditar_nomes_com_ia = lambda fatos, pares: copy.deepcopy(findings_ia)
+    try:
+        for rodada in range(2):
+            findings = verify_docs.run_ai_auditor(estado)["findings"]
+            regra_13 = [f for f in findings if f["regra"].startswith("Regra 13")]
+            assert len(regra_13) == 1, (rodada, findings)
+            # Regra 1 a reavaliar com a 13 ainda em cache: a IA roda de novo
+            impressoes, _ = verify_docs.cache_auditoria.obter(1)
+            impressoes["1"] = "alterada"
+    finally:
+        verify_docs.cache_auditoria, verify_docs.auditar_nomes_com_ia = cache_original, ia_original
+
+
+if __name__ == "__main__":
+    verificacoes = [
+        verificar_dossie_valido,
+        verificar_regra_cpf,
+        verificar_regra_rg,
+        verificar_regra_data_nascimento,
+        verificar_regra_rg_vencido,
+        verificar_regra_comprovante_vencido,
+        verificar_regra_conclusao,
+        verificar_regra_obrigatorios,
+        verificar_regra_rg_a_vencer,
+        verificar_regras_nomes,
+        verificar_impressoes,
+        verificar_regra_13_sem_duplicar,
+    ]
+    for verificacao in verificacoes:
+        verificacao()
+    print(f"✅ {len(verificacoes)} verificações das regras do auditor passaram")
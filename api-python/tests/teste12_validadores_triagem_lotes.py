@@ -0,0 +1,183 @@
+import os
+import sys
+import time
+import struct
+import zlib
+from datetime import date
+
+# Confere as validações de conteúdo (CPF, RG por UF, datas), a triagem que reprova arquivos antes da IA
+# e o acumulador de lotes. Roda sem IA nem banco: python tests/teste12_validadores_triagem_lotes.py
+os.environ.setdefault("OPENAI_API_KEY", "teste")
+os.environ.setdefault("CACHE_EXTRACAO_ATIVO", "false")
+os.environ.setdefault("CACHE_UPLOADS_ATIVO", "false")
+os.environ["TRIAGEM_ATIVA"] = "true"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+from apis import triagem
+from apis.triagem import triar_arquivo
+from apis.validadores import validar_cpf, validar_rg, uf_do_rg, validar_campo, validar_dados
+from apis.ai_enem import TIPO_ENEM
+from lotes import AcumuladorLote
+
+HOJE = date(2025, 3, 10)
+
+
+def verificar_cpf():
+    assert validar_cpf("529.982.247-25")
+    assert validar_cpf("11144477735")
+    assert not validar_cpf("529.982.247-26")
+    assert not validar_cpf("111.111.111-11")
+    assert not validar_cpf("5299822472")
+    # Só o CPF de identificação confere dígitos, e o mascarado fica de fora
+    assert not validar_campo("string", "cpf", "529.982.247-26")
+    assert validar_campo("string", "cpf", "***.982.247-**")
+    assert validar_campo("string", "cpf_vinculado", "123")
+
+
+def verificar_rg_por_uf():
+    assert uf_do_rg("SSP/SP 12.345.678-9") == "SP"
+    assert uf_do_rg("12.345.678-9") is None
+
+    assert validar_rg("12.345.678-9", "SP")
+    assert validar_rg("12.345.678-X", "SP")
+    assert not validar_rg("1.234.567", "SP")
+    assert validar_rg("12.345.678-9", "RJ")
+    assert not validar_rg("12.345.678", "RJ")
+    assert validar_rg("MG-12.345.678")
+    assert not validar_rg("MG-123.456.789")
+    assert validar_rg("1234567890", "RS")
+    assert not validar_rg("123456789", "RS")
+    # UF sem formato próprio: formato genérico
+    assert validar_rg("12345", "BA")
+    assert not validar_rg("1234", "BA")
+
+
+def verificar_dados():
+    problemas = validar_dados({
+        "cpf": "529.982.247-26",
+        "cpf_vinculado": "***.456.789-**",
+        "data_nascimento": "01/01/2030",
+        "data_expedicao": "31/02/2020",
+        "estado_uf": "XX",
+        "estado": "São Paulo",
+        "registro_geral": "SSP/RJ 12.345.678",
+        "cep": "123",
+        "ano_enem": 1990,
+    }, hoje=HOJE)
+    esperados = ["CPF 'cpf'", "'data_nascimento' no futuro", "'data_expedicao' fora do formato",
+                 "UF 'estado_uf'", "formato do RG de RJ", "CEP", "Ano do ENEM"]
+    for trecho in esperados:
+        assert any(trecho in p for p in problemas), (trecho, problemas)
+    assert len(problemas) == len(esperados), problemas
+
+    ordem = validar_dados({"data_nascimento": "10/05/2010", "data_expedicao": "10/05/2005"}, hoje=HOJE)
+    assert len(ordem) == 1 and "anterior" in ordem[0], ordem
+    assert validar_dados({"cpf": "529.982.247-25", "estado_uf": "SP", "cep": "01234-567"}, hoje=HOJE) == []
+
+
+def gerar_pdf(paginas):
+    doc = fitz.open()
+    for i in range(paginas):
+        doc.new_page().insert_text((50, 60), f"Página {i + 1}")
+    conteudo = doc.tobytes()
+    doc.close()
+    return conteudo
+
+
+def gerar_imagem(largura, altura, formato="png"):
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, largura, altura), False)
+    pix.clear_with(255)
+    return pix.tobytes(formato)
+
+
+def cabecalho_png(largura, altura):
+    """Só o cabeçalho: a triagem lê as dimensões sem decodificar a imagem"""
+    ihdr = struct.pack(">IIBBBBB", largura, altura, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr
+            + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr)))
+
+
+def motivo(conteudo, nome="documento.pdf"):
+    return triar_arquivo(TIPO_ENEM, conteudo, nome)[0]
+
+
+def verificar_triagem_aprovados():
+    assert triar_arquivo(TIPO_ENEM, gerar_pdf(1), "boletim.pdf") == (None, "boletim.pdf")
+    assert motivo(gerar_imagem(800, 600, "jpeg"), "foto.jpeg") is None
+    # A extensão errada é corrigida pelo formato real
+    assert triar_arquivo(TIPO_ENEM, gerar_pdf(1), "boletim.jpg") == (None, "boletim.pdf")
+    assert triar_arquivo(TIPO_ENEM, gerar_imagem(800, 600), "foto.jpg") == (None, "foto.png")
+
+
+def verificar_triagem_reprovados():
+    assert motivo(b"") == "Arquivo vazio."
+    assert "não suportado (detectado: GIF)" in motivo(b"GIF89a" + b"\x00" * 64, "foto.gif")
+    assert "não suportado" in motivo(b"texto qualquer", "documento.txt")
+    assert "corrompido" in motivo(b"%PDF-1.7\n" + b"\x00" * 64)
+    assert f"o limite para {TIPO_ENEM.rotulo} é {TIPO_ENEM.max_paginas}" in motivo(gerar_pdf(TIPO_ENEM.max_paginas + 1))
+    assert "megapixels" in motivo(cabecalho_png(10_000, 6_000), "foto.png")
+    assert "resolução baixa" in motivo(gerar_imagem(200, 150), "foto.png")
+
+    limite = triagem.TRIAGEM_MAX_BYTES
+    triagem.TRIAGEM_MAX_BYTES = 1024
+    try:
+        assert "excede o limite" in motivo(gerar_pdf(1) + b"\x00" * 2048)
+    finally:
+        triagem.TRIAGEM_MAX_BYTES = limite
+
+
+def verificar_triagem_desligada():
+    triagem.TRIAGEM_ATIVA = False
+    try:
+        assert triar_arquivo(TIPO_ENEM, b"", "documento.pdf") == (None, "documento.pdf")
+    finally:
+        triagem.TRIAGEM_ATIVA = True
+
+
+def verificar_lotes():
+    enviados = []
+    acumulador = AcumuladorLote(enviados.append, tamanho_max=3, janela=0.2, nome="teste")
+    for i in range(4):
+        acumulador.adicionar(i)
+    # Lote cheio sai na hora; o que sobra espera a janela
+    assert enviados == [[0, 1, 2]], enviados
+    time.sleep(0.5)
+    assert enviados == [[0, 1, 2], [3]], enviados
+    acumulador.encerrar()
+
+    enviados.clear()
+    acumulador = AcumuladorLote(enviados.append, tamanho_max=10, janela=60, nome="teste")
+    acumulador.adicionar("a")
+    acumulador.adicionar("b")
+    assert enviados == []
+    # Encerrar não perde o lote parcial
+    acumulador.encerrar()
+    assert enviados == [["a", "b"]], enviados
+
+    def enviar_com_falha(lote):
+        if lote == ["falha"]:
+            raise RuntimeError("backend fora do ar")
+        enviados.append(lote)
+
+    enviados.clear()
+    acumulador = AcumuladorLote(enviar_com_falha, tamanho_max=1, janela=60, nome="teste")
+    acumulador.adicionar("falha")
+    acumulador.adicionar("ok")
+    acumulador.encerrar()
+    assert enviados == [["ok"]], enviados
+
+
+if __name__ == "__main__":
+    verificacoes = [
+        verificar_cpf,
+        verificar_rg_por_uf,
+        verificar_dados,
+        verificar_triagem_aprovados,
+        verificar_triagem_reprovados,
+        verificar_triagem_desligada,
+        verificar_lotes,
+    ]
+    for verificacao in verificacoes:
+        verificacao()
+    print(f"✅ {len(verificacoes)} verificações de validadores, triagem e lotes passaram")
@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+
+# Confere que o OCR local não aprova um RG sozinho: mesmo lido com confiança alta, o RG segue para a
+# análise visual da IA (foto, assinatura, não ser impressão) com os campos pré-lidos como apoio.
+# Não precisa do Tesseract nem da IA: o reconhecimento e a resposta do modelo são simulados.
+os.environ.setdefault("OPENAI_API_KEY", "teste")
+os.environ.setdefault("CACHE_EXTRACAO_ATIVO", "false")
+os.environ.setdefault("CACHE_UPLOADS_ATIVO", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+from apis import ingestao
+from apis.ocr import MAPAS_OCR, MapaOcr, extrair_com_ocr, montar_dica, registrar_mapa_ocr
+from apis.ai_rg import TIPO_RG
+
+# Uma folha impressa com os rótulos do RG: tudo lido com confiança alta
+TEXTO_RG = """REPÚBLICA FEDERATIVA DO BRASIL
+VÁLIDA EM TODO O TERRITÓRIO NACIONAL
+REGISTRO GERAL 12.345.678-9 DATA DE EXPEDIÇÃO 10/01/2020
+NOME
+MARIA DA SILVA SOUZA
+FILIAÇÃO
+JOSE SOUZA
+ANA DA SILVA SOUZA
+NATURALIDADE DATA DE NASCIMENTO
+SAO PAULO - SP 15/04/2005
+CPF 529.982.247-25"""
+LINHAS = [(linha, [(palavra, 96.0) for palavra in linha.split()]) for linha in TEXTO_RG.split("\n")]
+
+
+def gerar_pdf():
+    doc = fitz.open()
+    page = doc.new_page()
+    for i, linha in enumerate(TEXTO_RG.split("\n")):
+        page.insert_text((50, 60 + 20 * i), linha, fontsize=10)
+    conteudo = doc.tobytes()
+    doc.close()
+    return conteudo
+
+
+def verificar_rg_so_pre_preenche():
+    resultado, campos = extrair_com_ocr(TIPO_RG, LINHAS)
+    assert resultado is None, "o OCR não pode decidir sozinho a validade do RG"
+    assert campos["nome"] == "MARIA DA SILVA SOUZA" and campos["cpf"] == "52998224725", campos
+    dica = montar_dica(LINHAS, campos)
+    assert dica.startswith("Campos pré-lidos pelo OCR") and "MARIA DA SILVA SOUZA" in dica
+
+
+def verificar_mapa_que_dispensa_ia():
+    mapa_rg = MAPAS_OCR[TIPO_RG.nome]
+    registrar_mapa_ocr(TIPO_RG.nome, MapaOcr(mapa_rg.ancoras, mapa_rg.campos, mapa_rg.conversores, dispensa_ia=True))
+    try:
+        resultado, campos = extrair_com_ocr(TIPO_RG, LINHAS)
+        assert resultado[TIPO_RG.chave_validade] is True and campos is None, resultado
+    finally:
+        registrar_mapa_ocr(TIPO_RG.nome, mapa_rg)
+
+
+class RespostaFalsa:
+    def __init__(self, texto):
+        self.output_text = texto
+
+
+def verificar_fluxo_com_ia():
+    """A decisão vem da chamada de visão, que recebe a dica com os campos pré-lidos"""
+    entradas = []
+
+    def criar_resposta(model, input):
+        entradas.append(input)
+        return RespostaFalsa(json.dumps({
+            TIPO_RG.chave_validade: False,
+            "motivoErro": ["Cópia impressa, sem foto nem assinatura."],
+            "dados_organizados": {},
+        }))
+
+    originais = (ingestao.ocr_disponivel, ingestao.reconhecer_paginas,
+                 ingestao.client.responses.create, ingestao.carregar_arquivos_para_vision)
+    ingestao.ocr_disponivel = lambda tipo=None: True
+    ingestao.reconhecer_paginas = lambda paginas: LINHAS
+    ingestao.client.responses.create = criar_resposta
+    ingestao.carregar_arquivos_para_vision = lambda conteudo, nome_arquivo, paginas=None: []
+    try:
+        resultado = ingestao.analisar_com_ia(TIPO_RG, gerar_pdf(), "rg.pdf")
+    finally:
+        (ingestao.ocr_disponivel, ingestao.reconhecer_paginas,
+         ingestao.client.responses.create, ingestao.carregar_arquivos_para_vision) = originais
+
+    assert entradas, "o RG lido pelo OCR precisa passar pela análise visual da IA"
+    assert resultado[TIPO_RG.chave_validade] is False, resultado
+    textos = [parte["text"] for parte in entradas[0][0]["content"] if parte["type"] == "input_text"]
+    assert any("Campos pré-lidos pelo OCR" in texto for texto in textos), textos
+
+
+if __name__ == "__main__":
+    verificacoes = [
+        verificar_rg_so_pre_preenche,
+        verificar_mapa_que_dispensa_ia,
+        verificar_fluxo_com_ia,
+    ]
+    for verificacao in verificacoes:
+        verificacao()
+    print(f"✅ {len(verificacoes)} verificações do OCR do RG passaram")
@@ -0,0 +1,67 @@
+import os
+import sys
+import asyncio
+
+# Confere que objetos do S3 acima de S3_MAX_BYTES são reprovados pelo ContentLength, sem baixar o corpo,
+# mesmo com a triagem desligada, nos dois modos de leitura (memória e arquivo temporário) e nos dois pipelines.
+# Usa o moto em memória: python tests/teste15_s3_limite.py
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "teste")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "teste")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("OPENAI_API_KEY", "teste")
+os.environ.setdefault("CACHE_EXTRACAO_ATIVO", "false")
+os.environ.setdefault("CACHE_UPLOADS_ATIVO", "false")
+os.environ["S3_BUCKET_NAME"] = "bucket-docs"
+os.environ["TRIAGEM_ATIVA"] = "false"
+os.environ["S3_MAX_BYTES"] = str(1024 * 1024)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moto import mock_aws
+mock_aws().start()
+
+import boto3
+import server
+import pipeline_async
+
+s3 = boto3.client("s3", region_name="us-east-1")
+s3.create_bucket(Bucket="bucket-docs")
+s3.put_object(Bucket="bucket-docs", Key="grande.pdf", Body=b"%PDF-1.7\n" + b"\x00" * (1536 * 1024))
+
+PAYLOAD = {"documentoId": 1, "tipoDocumento": "identidade", "subtipo": "rg", "caminhoArquivo": "grande.pdf"}
+
+processados = []
+
+
+def processar_falso(tipo, arquivo, nome_arquivo=None):
+    processados.append(nome_arquivo)
+    return {"status": "aprovado"}
+
+
+async def processar_falso_async(tipo, arquivo, nome_arquivo=None):
+    return processar_falso(tipo, arquivo, nome_arquivo)
+
+
+def verificar(modo_streaming):
+    server.S3_MODO_STREAMING = modo_streaming
+    pipeline_async.S3_MODO_STREAMING = modo_streaming
+    resultados = []
+
+    async def notificar_async(resultado):
+        resultados.append(resultado)
+
+    server.escolher_pipeline(dict(PAYLOAD), notificar=resultados.append)
+    asyncio.run(pipeline_async.escolher_pipeline_async(dict(PAYLOAD), notificar=notificar_async))
+    assert len(resultados) == 2, resultados
+    for resultado in resultados:
+        assert resultado["status"] == "reprovado", resultado
+        assert "Arquivo de 1.5 MB excede o limite de 1 MB" in resultado["motivoErro"], resultado
+    assert not processados, "o objeto grande não deveria chegar ao pipeline de extração"
+
+
+if __name__ == "__main__":
+    assert not server.TRIAGEM_ATIVA
+    server.processar_documento = processar_falso
+    pipeline_async.processar_documento_async = processar_falso_async
+    verificar(modo_streaming=True)
+    verificar(modo_streaming=False)
+    print("✅ Limite de tamanho do S3 aplicado com a triagem desligada")
@@ -0,0 +1,115 @@
+import os
+import sys
+import json
+import time
+
+# Compara o render adaptativo (orçamento de pixels, JPEG para foto, PNG em cinza para texto) com o render
+# fixo anterior (PNG colorido em escala 2x) num PDF sintético de várias páginas: as fotos do RG de teste
+# escaneadas em página A4 e uma página só de texto.
+# Cache desligado: com --com-ia cada modo precisa chamar a IA de verdade
+os.environ.setdefault("CACHE_EXTRACAO_ATIVO", "false")
+os.environ.setdefault("CACHE_UPLOADS_ATIVO", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+from apis import renderizacao
+from apis.renderizacao import renderizar_pagina
+
+FOTOS_TESTE = ["rg_livia.png", "rg-verso.png"]
+CHAMAR_IA = "--com-ia" in sys.argv
+REPETICOES = int(os.getenv("REPETICOES", "3"))
+
+TEXTO_DECLARACAO = [
+    "DECLARAÇÃO DE RESIDÊNCIA",
+    "",
+    "Declaro, para os devidos fins, que LIVIA DE OLIVEIRA SANTOS, portadora do RG",
+    "acima, reside no endereço informado no cadastro de matrícula desde 2019.",
+    "",
+    *[f"Cláusula {i}: as informações prestadas são verdadeiras e de minha responsabilidade." for i in range(1, 25)],
+]
+
+
+def gerar_pdf(script_dir):
+    """Páginas 1 e 2: fotos cobrindo a folha (documento escaneado); página 3: texto vetorial"""
+    doc = fitz.open()
+    for nome in FOTOS_TESTE:
+        caminho = os.path.join(script_dir, nome)
+        foto = fitz.Pixmap(caminho)
+        # A4 na orientação da foto, como sai de um scanner
+        largura, altura = (842, 595) if foto.width > foto.height else (595, 842)
+        page = doc.new_page(width=largura, height=altura)
+        page.insert_image(fitz.Rect(20, 20, largura - 20, altura - 20), filename=caminho)
+    page = doc.new_page(width=595, height=842)
+    for i, linha in enumerate(TEXTO_DECLARACAO):
+        page.insert_text((50, 60 + 22 * i), linha, fontsize=11)
+    conteudo = doc.tobytes()
+    doc.close()
+    return conteudo
+
+
+def renderizar(conteudo, adaptativo):
+    """Retorna [(bytes, mime)] por página e a mediana do tempo de render do documento inteiro"""
+    renderizacao.RENDER_ADAPTATIVO = adaptativo
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        with fitz.open(stream=conteudo, filetype="pdf") as doc:
+            paginas = [renderizar_pagina(page) for page in doc]
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return paginas, tempos[len(tempos) // 2]
+
+
+def medir_extracao(conteudo, adaptativo):
+    from apis.ingestao import analisar_com_ia
+    from apis.ai_rg import TIPO_RG
+
+    renderizacao.RENDER_ADAPTATIVO = adaptativo
+    inicio = time.perf_counter()
+    resultado = analisar_com_ia(TIPO_RG, conteudo, "rg_escaneado.pdf")
+    return resultado.get("dados_organizados", {}), time.perf_counter() - inicio
+
+
+def comparar_campos(referencia, candidato):
+    campos = set(referencia) | set(candidato)
+    iguais = sum(1 for c in campos if referencia.get(c) == candidato.get(c))
+    return iguais, len(campos)
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    conteudo = gerar_pdf(script_dir)
+    print(f"PDF sintético: {len(FOTOS_TESTE) + 1} páginas, {len(conteudo) / 1024:.0f} KB")
+
+    fixo, tempo_fixo = renderizar(conteudo, adaptativo=False)
+    adaptativo, tempo_adaptativo = renderizar(conteudo, adaptativo=True)
+
+    for i, ((bytes_fixo, _), (bytes_adaptativo, mime)) in enumerate(zip(fixo, adaptativo), start=1):
+        print(f"Página {i}: fixo 2x PNG={len(bytes_fixo) / 1024:.0f} KB | "
+              f"adaptativo {mime}={len(bytes_adaptativo) / 1024:.0f} KB "
+              f"({len(bytes_adaptativo) / len(bytes_fixo) * 100:.1f}% do fixo)")
+
+    total_fixo = sum(len(b) for b, _ in fixo)
+    total_adaptativo = sum(len(b) for b, _ in adaptativo)
+    print(f"Payload total: fixo={total_fixo / 1024:.0f} KB adaptativo={total_adaptativo / 1024:.0f} KB "
+          f"({total_adaptativo / total_fixo * 100:.1f}%)")
+    print(f"Tempo de render: fixo={tempo_fixo * 1000:.0f} ms adaptativo={tempo_adaptativo * 1000:.0f} ms")
+
+    # Foto vira JPEG, texto vira PNG em cinza, e cada página respeita o orçamento de pixels
+    mimes = [mime for _, mime in adaptativo]
+    assert mimes == ["image/jpeg", "image/jpeg", "image/png"], mimes
+    for imagem, _ in adaptativo:
+        pix = fitz.Pixmap(imagem)
+        assert pix.width * pix.height <= renderizacao.RENDER_MAX_PIXELS, (pix.width, pix.height)
+    assert fitz.Pixmap(adaptativo[2][0]).n == 1, "página de texto deveria sair em tons de cinza"
+    assert total_adaptativo < total_fixo
+
+    if CHAMAR_IA:
+        dados_fixo, latencia_fixo = medir_extracao(conteudo, adaptativo=False)
+        dados_adaptativo, latencia_adaptativo = medir_extracao(conteudo, adaptativo=True)
+        iguais, total = comparar_campos(dados_fixo, dados_adaptativo)
+        print(f"Latência fim a fim: fixo={latencia_fixo:.2f}s adaptativo={latencia_adaptativo:.2f}s")
+        print(f"Campos idênticos entre os modos: {iguais}/{total}")
+        print(json.dumps({"fixo": dados_fixo, "adaptativo": dados_adaptativo}, indent=2, ensure_ascii=False))
+    else:
+        print("\nUse --com-ia para comparar também latência e precisão da extração.")
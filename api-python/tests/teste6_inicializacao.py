@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+import subprocess
+import statistics
+
+# Mede o tempo de import do server.py (subida do processo) e o custo da primeira compilação do grafo
+DIRETORIO_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRETORIO_API)
+
+REPETICOES = int(os.getenv("REPETICOES", "5"))
+
+
+def medir_import(modulo):
+    """Importa o módulo num processo novo, para não aproveitar o cache de módulos deste processo"""
+    codigo = f"import time; inicio = time.perf_counter(); import {modulo}; print(time.perf_counter() - inicio)"
+    saida = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=DIRETORIO_API, capture_output=True, text=True, check=True
+    )
+    return float(saida.stdout.strip().splitlines()[-1])
+
+
+def medir_grafo():
+    from verify_docs import obter_grafo
+    inicio = time.perf_counter()
+    obter_grafo()
+    primeira = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    obter_grafo()
+    segunda = time.perf_counter() - inicio
+    return primeira, segunda
+
+
+if __name__ == "__main__":
+    for modulo in ("server", "verify_docs"):
+        tempos = [medir_import(modulo) for _ in range(REPETICOES)]
+        print(f"import {modulo}: mediana={statistics.median(tempos) * 1000:.0f} ms "
+              f"min={min(tempos) * 1000:.0f} ms max={max(tempos) * 1000:.0f} ms ({REPETICOES} execuções)")
+
+    primeira, segunda = medir_grafo()
+    print(f"obter_grafo(): primeira chamada={primeira * 1000:.1f} ms, seguintes={segunda * 1000:.3f} ms")
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+# Compara conexão nova por chamada x pool do verify_docs contra um MySQL/MariaDB local.
+# Subir o banco antes, por exemplo:
+#   docker run -d --name mariadb-teste -p 3306:3306 -e MARIADB_ROOT_PASSWORD=teste -e MARIADB_DATABASE=docflow mariadb:11
+# e exportar DB_HOST=127.0.0.1 DB_USER=root DB_PASSWORD=teste DB_NAME=docflow
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector
+from verify_docs import get_db_connection, DB_POOL_SIZE
+
+CHAMADAS = int(os.getenv("CHAMADAS", "200"))
+THREADS = int(os.getenv("THREADS", str(DB_POOL_SIZE)))
+
+
+def conexao_direta():
+    return mysql.connector.connect(
+        host=os.getenv("DB_HOST"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME")
+    )
+
+
+def consulta(obter_conexao):
+    """Simula um nó do grafo: pega a conexão, faz uma consulta curta e fecha (ou devolve ao pool)"""
+    inicio = time.perf_counter()
+    conn = obter_conexao()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1")
+    cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return time.perf_counter() - inicio
+
+
+def medir(nome, obter_conexao):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        tempos = list(executor.map(lambda _: consulta(obter_conexao), range(CHAMADAS)))
+    total = time.perf_counter() - inicio
+    tempos.sort()
+    print(f"{nome}: total={total:.2f}s vazão={CHAMADAS / total:.0f} chamadas/s "
+          f"p50={statistics.median(tempos) * 1000:.2f} ms p95={tempos[int(len(tempos) * 0.95) - 1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    print(f"{CHAMADAS} chamadas, {THREADS} threads, pool de {DB_POOL_SIZE} conexões")
+    medir("Conexão nova por chamada", conexao_direta)
+    get_db_connection().close()  # cria o pool fora da medição
+    medir("Pool do verify_docs", get_db_connection)
@@ -0,0 +1,151 @@
+import os
+import sys
+from datetime import date, timedelta
+
+# Gera PDFs sintéticos com o layout de cada template (e rótulos "distratores" parecidos) e confere
+# que a extração local pega o campo certo. Roda sem IA: python tests/teste8_templates.py
+os.environ.setdefault("OPENAI_API_KEY", "teste")
+os.environ.setdefault("CACHE_EXTRACAO_ATIVO", "false")
+os.environ.setdefault("CACHE_UPLOADS_ATIVO", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz
+from apis import templates
+from apis.templates import extrair_com_template, eh_rotulo
+from apis.ai_enem import TIPO_ENEM
+from apis.ai_reservista import TIPO_RESERVISTA
+from apis.ai_comprovante_residencial import TIPO_COMPROVANTE_RESIDENCIAL
+
+templates.TEMPLATES_ATIVOS = True
+
+EMISSAO = (date.today() - timedelta(days=10)).strftime("%d/%m/%Y")
+
+
+def gerar_pdf(linhas):
+    """`linhas` é uma lista de (x, y, texto) em pontos de uma página A4"""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    for x, y, texto in linhas:
+        page.insert_text((x, y), texto, fontsize=10)
+    conteudo = doc.tobytes()
+    doc.close()
+    return conteudo
+
+
+def dados(tipo, linhas):
+    resultado = extrair_com_template(tipo, gerar_pdf(linhas), "documento.pdf")
+    assert resultado is not None, "template deveria reconhecer o documento"
+    assert resultado[tipo.chave_validade] is True
+    return resultado["dados_organizados"]
+
+
+def verificar_rotulos():
+    assert eh_rotulo("Nome", "Nome")
+    assert eh_rotulo("NOME: MARIA", "Nome")
+    assert eh_rotulo("Nome da Mãe", "Nome da Mae")
+    assert not eh_rotulo("Nome Social: Fulano", "Nome")
+    assert not eh_rotulo("Nome da Mãe", "Nome")
+    assert not eh_rotulo("Nomenclatura", "Nome")
+
+
+def verificar_boletim_inep():
+    linhas = [
+        (50, 60, "INEP - Instituto Nacional de Estudos e Pesquisas Educacionais"),
+        (50, 90, "Resultado Individual ENEM 2023"),
+        (50, 130, "Nome Social: Fulano"),
+        (50, 170, "Nome: MARIA DA SILVA SOUZA"),
+        (50, 210, "CPF: 529.982.247-25"),
+        (50, 250, "Inscrição: 231234567890"),
+        (50, 290, "Matemática e suas Tecnologias 712,4"),
+        (50, 330, "Redação 880"),
+    ]
+    extraido = dados(TIPO_ENEM, linhas)
+    assert extraido["nome_participante"] == "MARIA DA SILVA SOUZA", extraido
+    assert extraido["cpf"] == "52998224725", extraido
+    assert extraido["ano_enem"] == 2023, extraido
+
+
+def verificar_certificado_gov_br():
+    linhas = [
+        (50, 60, "Ministério da Defesa"),
+        (50, 80, "Certificado de Dispensa de Incorporação - Serviço Militar"),
+        (50, 130, "Nome Social"),
+        (50, 146, "FULANO"),
+        (50, 190, "Nome"),
+        (50, 206, "JOAO PEREIRA LIMA"),
+        (50, 250, "Nome da Mãe"),
+        (50, 266, "ANA PEREIRA LIMA"),
+        (50, 310, "Nome do Pai"),
+        (50, 326, "CARLOS LIMA"),
+        (50, 370, "CPF: 529.982.247-25"),
+    ]
+    extraido = dados(TIPO_RESERVISTA, linhas)
+    assert extraido["nome"] == "JOAO PEREIRA LIMA", extraido
+    assert extraido["filiacao"] == {"mae": "ANA PEREIRA LIMA", "pai": "CARLOS LIMA"}, extraido
+    assert extraido["cpf"] == "52998224725", extraido
+
+
+def linhas_conta(ancoras):
+    return [(50, 60 + 30 * i, ancora) for i, ancora in enumerate(ancoras)] + [
+        (50, 150, "Nome Social: FULANO"),
+        (50, 190, "Nome: JOSE CARLOS ALMEIDA"),
+        (50, 230, "RUA DAS FLORES, 123"),
+        (50, 245, "CENTRO - SAO PAULO - SP"),
+        (50, 270, "CEP: 01234-567"),
+        (50, 310, f"Data de Emissão: {EMISSAO}"),
+        # Contas costumam mascarar o CPF: o campo é opcional e fica de fora
+        (50, 350, "CPF: ***.456.789-**"),
+    ]
+
+
+def verificar_conta(ancoras, empresa, tipo_conta):
+    extraido = dados(TIPO_COMPROVANTE_RESIDENCIAL, linhas_conta(ancoras))
+    esperado = {
+        "nome_titular": "JOSE CARLOS ALMEIDA",
+        "rua_avenida": "RUA DAS FLORES",
+        "numero_endereco": "123",
+        "bairro": "CENTRO",
+        "cidade": "SAO PAULO",
+        "estado_uf": "SP",
+        "cep": "01234567",
+        "data_emissao": EMISSAO,
+        "cpf_vinculado": None,
+        "tipo_documento": tipo_conta,
+    }
+    for campo, valor in esperado.items():
+        assert extraido.get(campo) == valor, (campo, extraido)
+    assert extraido["empresa_emissora"].startswith(empresa), extraido
+
+
+def verificar_layout_desconhecido():
+    assert extrair_com_template(TIPO_ENEM, gerar_pdf([(50, 60, "Nome: MARIA DA SILVA")]), "documento.pdf") is None
+    # Rótulo distrator sozinho não pode virar o nome do participante
+    linhas = [(50, 60, "INEP ENEM 2023 Inscrição Redação Matemática e suas Tecnologias"),
+              (50, 130, "Nome Social: Fulano"), (50, 210, "CPF: 529.982.247-25")]
+    assert extrair_com_template(TIPO_ENEM, gerar_pdf(linhas), "documento.pdf") is None
+
+
+def verificar_desligado():
+    templates.TEMPLATES_ATIVOS = False
+    try:
+        linhas = [(50, 60, "INEP ENEM 2023 Inscrição Redação Matemática e suas Tecnologias"),
+                  (50, 130, "Nome: MARIA DA SILVA SOUZA")]
+        assert extrair_com_template(TIPO_ENEM, gerar_pdf(linhas), "documento.pdf") is None
+    finally:
+        templates.TEMPLATES_ATIVOS = True
+
+
+if __name__ == "__main__":
+    verificacoes = [
+        verificar_rotulos,
+        verificar_boletim_inep,
+        verificar_certificado_gov_br,
+        lambda: verificar_conta(("Enel", "Conta de Energia", "Enel Distribuição São Paulo"),
+                                "Enel Distribuição São Paulo", "conta de luz"),
+        lambda: verificar_conta(("Sabesp", "Consumo"), "Sabesp", "conta de água"),
+        verificar_layout_desconhecido,
+        verificar_desligado,
+    ]
+    for verificacao in verificacoes:
+        verificacao()
+    print(f"✅ {len(verificacoes)} verificações de templates passaram")
@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import signal
+import threading
+
+# Roda o processador SQS (modo pool) de ponta a ponta contra uma fila local e confere o recebimento em lote,
+# a remoção de cada mensagem (só após o status chegar ao backend), o heartbeat de visibilidade e a drenagem após SIGTERM.
+# Sem SQS_ENDPOINT_URL usa o moto em memória; para ElasticMQ ou moto server:
+#   docker run -d -p 9324:9324 softwaremill/elasticmq-native
+#   SQS_ENDPOINT_URL=http://localhost:9324 python tests/teste9_sqs_local.py
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "teste")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "teste")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("OPENAI_API_KEY", "teste")
+os.environ.setdefault("CACHE_EXTRACAO_ATIVO", "false")
+os.environ.setdefault("CACHE_UPLOADS_ATIVO", "false")
+os.environ["SQS_WAIT_TIME"] = "1"
+os.environ["SQS_VISIBILITY_TIMEOUT"] = "2"
+os.environ["SQS_HEARTBEAT_INTERVALO"] = "1"
+os.environ["SQS_JANELA_EXCLUSAO"] = "0.2"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MENSAGENS = 9
+CONCORRENCIA = 3
+# Maior que o visibility timeout: sem heartbeat as mensagens voltariam para a fila no meio do processamento
+DURACAO_PROCESSAMENTO = 3.5
+
+if not os.getenv("SQS_ENDPOINT_URL"):
+    from moto import mock_aws
+    mock_aws().start()
+
+import boto3
+import server
+import process_sqs
+
+sqs = boto3.client("sqs", region_name="us-east-1", endpoint_url=os.getenv("SQS_ENDPOINT_URL"))
+fila = sqs.create_queue(QueueName=f"teste-docflow-{int(time.time())}")["QueueUrl"]
+process_sqs.SQS_QUEUE_URL = fila
+
+recebimentos = []
+processados = []
+exclusoes = []
+entregas_duplicadas = []
+lock = threading.Lock()
+
+receive_original = process_sqs.sqs_client.receive_message
+delete_batch_original = process_sqs.sqs_client.delete_message_batch
+
+
+def receive_registrado(**kwargs):
+    inicio = time.monotonic()
+    response = receive_original(**kwargs)
+    with lock:
+        recebimentos.append((inicio, kwargs["MaxNumberOfMessages"], len(response.get("Messages", []))))
+    return response
+
+
+def delete_batch_registrado(**kwargs):
+    with lock:
+        exclusoes.append(len(kwargs["Entries"]))
+    return delete_batch_original(**kwargs)
+
+
+def pipeline_falso(payload, notificar=None):
+    """Substitui o download + IA: só segura o worker pelo tempo de um documento real"""
+    with lock:
+        if payload["documentoId"] in processados:
+            entregas_duplicadas.append(payload["documentoId"])
+        processados.append(payload["documentoId"])
+    time.sleep(DURACAO_PROCESSAMENTO)
+    return {"documentoId": payload["documentoId"], "status": "aprovado"}
+
+
+process_sqs.sqs_client.receive_message = receive_registrado
+process_sqs.sqs_client.delete_message_batch = delete_batch_registrado
+process_sqs.escolher_pipeline = pipeline_falso
+
+
+def contar_na_fila():
+    atributos = sqs.get_queue_attributes(
+        QueueUrl=fila,
+        AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"]
+    )["Attributes"]
+    return int(atributos["ApproximateNumberOfMessages"]) + int(atributos["ApproximateNumberOfMessagesNotVisible"])
+
+
+def verificar_remocao_individual():
+    sqs.send_message(QueueUrl=fila, MessageBody=json.dumps({"documentoId": 0, "tipoDocumento": "rg"}))
+    mensagem = sqs.receive_message(QueueUrl=fila, MaxNumberOfMessages=1, WaitTimeSeconds=1)["Messages"][0]
+    resultado = process_sqs.tratar_mensagem(mensagem, notificar=lambda r: None)
+    assert resultado["status"] == "aprovado", resultado
+    assert contar_na_fila() == 0, "tratar_mensagem deveria remover a mensagem com delete_message"
+    processados.clear()
+
+
+def verificar_remocao_apos_status():
+    """Com o status em lote, a mensagem só sai da fila depois que o backend confirmou o status dela"""
+    entregas = []
+
+    def enviar_lote_falso(payloads):
+        entregas.append([p["documentoId"] for p in payloads])
+        # O backend ficou fora do ar para o documento 102
+        return {p["documentoId"] for p in payloads} - {102}
+
+    def pipeline_notificando(payload, notificar=None):
+        resultado = {"documentoId": payload["documentoId"], "status": "aprovado"}
+        notificar(resultado)
+        return resultado
+
+    for documento_id in (101, 102):
+        sqs.send_message(QueueUrl=fila, MessageBody=json.dumps({"documentoId": documento_id, "tipoDocumento": "rg"}))
+    mensagens = sqs.receive_message(QueueUrl=fila, MaxNumberOfMessages=2, WaitTimeSeconds=1)["Messages"]
+    assert len(mensagens) == 2, mensagens
+
+    enviar_original = server.enviar_lote_status_backend
+    server.enviar_lote_status_backend = enviar_lote_falso
+    process_sqs.escolher_pipeline = pipeline_notificando
+    try:
+        status = server.StatusBackendEmLote(tamanho_max=20, janela=60)
+        for mensagem in mensagens:
+            process_sqs.tratar_mensagem(mensagem, notificar=status)
+        assert contar_na_fila() == 2, "nenhuma mensagem pode sair da fila antes de o status ser enviado"
+        status.encerrar()
+    finally:
+        server.enviar_lote_status_backend = enviar_original
+        process_sqs.escolher_pipeline = pipeline_falso
+
+    assert sorted(entregas[0]) == [101, 102], entregas
+    # Só a 102, sem status confirmado, continua na fila para ser reprocessada
+    assert contar_na_fila() == 1, contar_na_fila()
+    pendente = next(m for m in mensagens if json.loads(m["Body"])["documentoId"] == 102)
+    sqs.delete_message(QueueUrl=fila, ReceiptHandle=pendente["ReceiptHandle"])
+
+
+def verificar_heartbeat():
+    sqs.send_message(QueueUrl=fila, MessageBody=json.dumps({"documentoId": -1, "tipoDocumento": "rg"}))
+    mensagem = sqs.receive_message(QueueUrl=fila, MaxNumberOfMessages=1, VisibilityTimeout=2)["Messages"][0]
+    heartbeat = process_sqs.HeartbeatVisibilidade(intervalo=0.5, timeout=2)
+    heartbeat.registrar(mensagem)
+    heartbeat.iniciar()
+    try:
+        time.sleep(DURACAO_PROCESSAMENTO)
+        reentregue = sqs.receive_message(QueueUrl=fila, MaxNumberOfMessages=1).get("Messages", [])
+        assert not reentregue, "com heartbeat a mensagem não pode voltar a ficar visível durante o processamento"
+    finally:
+        heartbeat.encerrar()
+    sqs.delete_message(QueueUrl=fila, ReceiptHandle=mensagem["ReceiptHandle"])
+
+
+def verificar_pool():
+    for i in range(1, MENSAGENS + 1):
+        sqs.send_message(QueueUrl=fila, MessageBody=json.dumps({"documentoId": i, "tipoDocumento": "rg"}))
+
+    # O SIGTERM chega pouco antes de a primeira rodada liberar os slots, com o loop bloqueado esperando
+    # um deles: o slot obtido depois do sinal não pode virar um receive_message novo
+    sinal_em = DURACAO_PROCESSAMENTO - 0.3
+    threading.Timer(sinal_em, os.kill, (os.getpid(), signal.SIGTERM)).start()
+    inicio = time.monotonic()
+    process_sqs.main_pool(concorrencia=CONCORRENCIA)
+    parada = inicio + sinal_em
+
+    lotes = [recebidas for _, _, recebidas in recebimentos]
+    assert max(lotes) > 1, f"receive_message deveria trazer várias mensagens por chamada: {recebimentos}"
+    assert all(pedidas <= CONCORRENCIA for _, pedidas, _ in recebimentos), recebimentos
+    assert not entregas_duplicadas, f"heartbeat falhou, mensagens reentregues: {entregas_duplicadas}"
+    assert sum(exclusoes) == len(processados), f"{sum(exclusoes)} removidas x {len(processados)} processadas"
+    assert all(instante < parada for instante, _, _ in recebimentos), \
+        "após o SIGTERM nenhum receive_message novo deveria ser iniciado"
+
+    # O que não foi recebido antes da parada continua na fila para outro worker
+    assert contar_na_fila() == MENSAGENS - len(processados), (contar_na_fila(), processados)
+    print(f"Recebimentos (pedidas, recebidas): {[(p, r) for _, p, r in recebimentos]}")
+    print(f"Exclusões em lote: {exclusoes}; processadas antes da parada: {sorted(processados)}")
+
+
+if __name__ == "__main__":
+    verificar_remocao_individual()
+    verificar_remocao_apos_status()
+    verificar_heartbeat()
+    verificar_pool()
+    print("✅ Processador SQS verificado contra a fila local")
@@ -1,6 +1,10 @@
 import os
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import mysql.connector
+from mysql.connector import pooling
 from typing import TypedDict, List, Optional, Dict, Any
 from dotenv import load_dotenv
 from datetime import datetime
@@ -11,22 +15,78 @@ from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 
+from nomes import comparar_par, melhor_correspondencia
+from regras_auditoria import (
+    avaliar_regras, avaliar_regras_nomes, decidir, finding, impressoes_regras, agrupar_por_regra, numero_regra
+)
+from apis.cache import cache_auditoria
+
 # --- 1. Configuração ---
 load_dotenv()
-llm = ChatOpenAI(model="gpt-5-nano", temperature=0)
+
+_llm = None
+_grafo = None
+_grafo_lock = threading.Lock()
+
+
+def obter_llm():
+    global _llm
+    if _llm is None:
+        _llm = ChatOpenAI(model="gpt-5-nano", temperature=0)
+    return _llm
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+# Tempo máximo esperando uma conexão livre quando todas do pool estão em uso
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_RECONEXAO_TENTATIVAS = int(os.getenv("DB_RECONEXAO_TENTATIVAS", "3"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obter_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="verify_docs",
+                    pool_size=DB_POOL_SIZE,
+                    pool_reset_session=True,
+                    host=os.getenv("DB_HOST"),
+                    user=os.getenv("DB_USER"),
+                    password=os.getenv("DB_PASSWORD"),
+                    database=os.getenv("DB_NAME")
+                )
+    return _pool
+
 
 def get_db_connection():
-    try:
-        conn = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME")
-        )
-        return conn
-    except mysql.connector.Error as err:
-        print(f"Erro ao conectar ao banco: {err}")
-        return None
+    """
+    Conexão emprestada do pool do processo; conn.close() devolve ao pool.
+    Conexões derrubadas pelo servidor (wait_timeout, failover) são reconectadas antes do uso.
+    """
+    limite = time.monotonic() + DB_POOL_TIMEOUT
+    while True:
+        try:
+            conn = obter_pool().get_connection()
+        except mysql.connector.errors.PoolError:
+            if time.monotonic() >= limite:
+                print("Erro ao conectar ao banco: pool de conexões esgotado")
+                return None
+            time.sleep(0.05)
+            continue
+        except mysql.connector.Error as err:
+            print(f"Erro ao conectar ao banco: {err}")
+            return None
+
+        try:
+            conn.ping(reconnect=True, attempts=DB_RECONEXAO_TENTATIVAS, delay=1)
+            return conn
+        except mysql.connector.Error as err:
+            print(f"Erro ao conectar ao banco: {err}")
+            conn.close()
+            return None
 
 # --- 2. Definição do Estado ---
 class ValidationState(TypedDict):
@@ -39,23 +99,17 @@ class ValidationState(TypedDict):
     prereq_met: bool
     prereq_message: str
     
+    findings: Optional[List[Dict[str, Any]]]
+    documents_to_reject: Optional[List[int]]
     final_status: str
     final_observation: str
 
 # --- 3. Definição dos Nós ---
 
-def fetch_data(state: ValidationState):
-    print(f"--- [Nó: fetch_data] Processando Matrícula ID: {state['matricula_id']} ---")
-    matricula_id = state['matricula_id']
-    conn = get_db_connection()
-    if not conn:
-        return {**state, "prereq_met": False, "prereq_message": "Falha na conexão com o DB"}
-
-    cursor = conn.cursor(dictionary=True)
-    query = """
+CONSULTA_DOCUMENTOS_APROVADOS = """
     SELECT 
-        c.id_candidato, c.nome as candidato_nome, c.cpf as candidato_cpf, 
-        d.dados_extraidos, dt.nome as tipo_documento, d.fk_documento_tipo
+        m.id as matricula_id, c.id_candidato, c.nome as candidato_nome, c.cpf as candidato_cpf, 
+        d.id as documento_id, d.dados_extraidos, dt.nome as tipo_documento, d.fk_documento_tipo
     FROM 
         matricula m
     JOIN 
@@ -65,15 +119,12 @@ def fetch_data(state: ValidationState):
     JOIN 
         documento_tipo dt ON d.fk_documento_tipo = dt.id_documento_tipo
     WHERE 
-        m.id = %s AND d.status_documento = 'aprovado'
+        m.id IN ({ids}) AND d.status_documento = 'aprovado'
     """
-    cursor.execute(query, (matricula_id,))
-    results = cursor.fetchall()
-    conn.close()
-    
-    if not results:
-        return {**state, "prereq_met": False, "prereq_message": "Candidato sem documentos aprovados."}
 
+
+def montar_dados_matricula(results):
+    """Converte as linhas de uma matrícula em (candidate_data, documents_data)"""
     candidate_data = {
         "id_candidato": results[0]["id_candidato"],
         "nome": results[0]["candidato_nome"],
@@ -87,11 +138,33 @@ def fetch_data(state: ValidationState):
         except json.JSONDecodeError:
             dados_json = {"erro": "Formato JSON inválido"}
         documents_data.append({
+            "documento_id": row["documento_id"],
             "tipo_id": row["fk_documento_tipo"],
             "tipo_nome": row["tipo_documento"],
             "dados": dados_json
         })
-        
+    return candidate_data, documents_data
+
+
+def fetch_data(state: ValidationState):
+    print(f"--- [Nó: fetch_data] Processando Matrícula ID: {state['matricula_id']} ---")
+    matricula_id = state['matricula_id']
+    conn = get_db_connection()
+    if not conn:
+        return {**state, "prereq_met": False, "prereq_message": "Falha na conexão com o DB"}
+
+    # Em caso de erro a conexão também precisa voltar ao pool, senão ele se esgota
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(CONSULTA_DOCUMENTOS_APROVADOS.format(ids="%s"), (matricula_id,))
+        results = cursor.fetchall()
+    finally:
+        conn.close()
+    
+    if not results:
+        return {**state, "prereq_met": False, "prereq_message": "Candidato sem documentos aprovados."}
+
+    candidate_data, documents_data = montar_dados_matricula(results)
     return {**state, "candidate_data": candidate_data, "documents_data": documents_data}
 
 
@@ -193,6 +266,7 @@ def prepare_facts_for_ai(state: ValidationState):
         
         # ID 1: RG
         if doc['tipo_id'] == 1:
+            fatos_rg['documento'] = doc_tipo_nome
             try:
                 exp_str = dados.get('data_expedicao')
                 exp_dt = datetime.strptime(exp_str, '%d/%m/%Y').date()
@@ -215,10 +289,12 @@ def prepare_facts_for_ai(state: ValidationState):
 
         # ID 3: Histórico Escolar
         elif doc['tipo_id'] == 3:
+            fatos_historico['documento'] = doc_tipo_nome
             fatos_historico['certificacao_conclusao'] = dados.get('certificacao_conclusao', False)
         
         # ID 4: Comprovante de Residência
         elif doc['tipo_id'] == 4:
+            fatos_comprovante['documento'] = doc_tipo_nome
             fatos_comprovante['titular'] = dados.get('nome_titular')
             fatos_comprovante['titular_upper'] = dados.get('nome_titular', '').upper()
             fatos_comprovante['cpf_vinculado'] = dados.get('cpf_vinculado')
@@ -268,6 +344,18 @@ def prepare_facts_for_ai(state: ValidationState):
         for f in filiacao_encontradas
     ]
     nomes_validos_titularidade_lower = [n.lower() for n in nomes_validos_titularidade]
+
+    # Comparação local dos nomes: só os pares "ambiguo" vão para a IA
+    comparacao_filiacao = []
+    for tipo_filiacao in ("mae", "pai"):
+        nomes_filiacao = [f for f in filiacao_encontradas if f["tipo"] == tipo_filiacao]
+        for f in nomes_filiacao[1:]:
+            comparacao_filiacao.append({"tipo": tipo_filiacao, **comparar_par(nomes_filiacao[0]["nome"], f["nome"], f["documento"])})
+    comparacao_nomes = {
+        "nome": [comparar_par(candidate['nome'], n["nome"], n["documento"]) for n in nomes_encontrados],
+        "filiacao": comparacao_filiacao,
+        "titularidade": melhor_correspondencia(fatos_comprovante.get('titular'), nomes_validos_titularidade, fatos_comprovante['documento']) if fatos_comprovante else None
+    }
     documentos_enviados_lower = [d.lower() for d in documentos_enviados]
 
     candidate_for_ai = {**candidate, 'nome': candidate['nome'].lower(), 'cpf': candidate['cpf']}
@@ -284,7 +372,8 @@ def prepare_facts_for_ai(state: ValidationState):
             "cpfs_encontrados": cpfs_encontrados_lower,
             "rgs_encontrados": rgs_encontrados_lower,
             "datas_nascimento_encontradas": dobs_encontrados_lower,
-            "filiacao_encontradas": filiacao_encontradas_lower
+            "filiacao_encontradas": filiacao_encontradas_lower,
+            "comparacao_nomes": comparacao_nomes
         },
         "fatos_especificos": {
             "rg": fatos_rg,
@@ -303,119 +392,29 @@ def prepare_facts_for_ai(state: ValidationState):
 
 
 # Nó 4: (NOVO) A IA Auditora
-def run_ai_auditor(state: ValidationState):
-    """
-    Nó 4: A IA Generativa aplica as Regras de Negócio ao Dossiê de Fatos HARMONIZADO.
-    """
-    print("--- [Nó: run_ai_auditor] IA está auditando o dossiê harmonizado ---")
-    
-    dossie_json = json.dumps(state['facts_dossier'], indent=2, ensure_ascii=False)
-    
-    prompt_regras = """### REGRAS DE AUDITORIA DE MATRÍCULA
-
-Você deve auditar o "Dossiê de Fatos" de um candidato.
-O dossiê contém dados de referência, dados do cadastro e dados HARMONIZADOS de todos os documentos aprovados.
-
-IMPORTANTE: Este processo só é acionado quando o RG (ID 1) e o Histórico Escolar (ID 3) estão com status 'aprovado'.
-Todos os outros documentos são opcionais, mas se enviados e aprovados, devem ser validados.
+PROMPT_REGRAS_NOMES = """### REGRAS DE AUDITORIA DE NOMES
 
-Siga as regras abaixo e para CADA REGRA aplicável, gere um "finding" (descoberta).
-
-#### REGRAS DE CONSISTÊNCIA ENTRE DOCUMENTOS (Erros Bloqueantes)
+Você deve auditar pares de nomes de um candidato à matrícula que a comparação automática não conseguiu decidir.
+As demais regras (CPF, RG, datas, vencimentos, documentos obrigatórios) e os demais pares de nomes já foram verificados por outro processo.
+Avalie SOMENTE as regras presentes em "pares_ambiguos" e a regra 13. Cada par tem "nome_a", "nome_b" e o documento de origem.
 
 1. **Consistência de Nome entre Documentos:**
-   - Compare o nome do cadastro (dados_cadastro.nome) com TODOS os nomes encontrados em harmonizacao_consistencia.nomes_encontrados.
+   - Cada par compara o nome do cadastro (nome_a) com o nome de um documento (nome_b).
    - Nomes são considerados iguais mesmo com diferenças de maiúsculas/minúsculas, acentos, espaços extras ou abreviações comuns (ex: "José" = "Jose", "Maria Silva" = "Maria da Silva", "João P." = "João Pedro").
    - ATENÇÃO: Variações significativas de nome (ex: "João Silva" vs "Pedro Santos") são ERRO.
-   - Se houver discrepância significativa entre o nome do cadastro e qualquer documento (RG, Histórico Escolar, ENEM, Reservista, Certidão), é um ERRO.
-   - Documentos que devem ter nome: RG, Histórico Escolar, ENEM (se presente), Reservista (se presente), Certidão (se presente).
-
-2. **Consistência de CPF entre Documentos:**
-   - O CPF do cadastro (dados_cadastro.cpf) deve ser idêntico a TODOS os CPFs encontrados em harmonizacao_consistencia.cpfs_encontrados.
-   - IGNORE CPFs de comprovante de residência nesta regra (eles podem ser de terceiros).
-   - CPFs são considerados iguais mesmo com pontuação diferente (ex: '123.456.789-00' = '12345678900').
-   - Documentos que devem ter CPF: RG, ENEM (se presente), Reservista (se presente).
-   - Se houver discrepância entre CPFs de documentos oficiais (RG, ENEM, Reservista), é um ERRO.
-
-3. **Consistência de RG entre Documentos:**
-   - Se houver múltiplos documentos com RG, compare todos entre si.
-   - RGs são considerados iguais mesmo com pontuação diferente (ex: '12.345.678-9' = '123456789').
-   - Se houver discrepância entre RGs de diferentes documentos, é um ERRO.
-   - Normalmente apenas o RG (ID 1) contém número de RG, mas verifique se outros documentos também contêm.
-
-4. **Consistência de Data de Nascimento entre Documentos:**
-   - Todas as datas de nascimento em harmonizacao_consistencia.datas_nascimento_encontradas devem ser idênticas.
-   - Datas são consideradas iguais mesmo em formatos diferentes (ex: '01/01/2000' = '2000-01-01' = '01-01-2000').
-   - Documentos que devem ter data de nascimento: RG, Certidão de Nascimento (se presente).
-   - Se houver discrepância entre datas de nascimento de documentos oficiais, é um ERRO.
 
 5. **Consistência de Filiação entre Documentos:**
-   - Compare todos os nomes de mãe em harmonizacao_consistencia.filiacao_encontradas onde tipo='mae'.
-   - Compare todos os nomes de pai em harmonizacao_consistencia.filiacao_encontradas onde tipo='pai'.
+   - Cada par compara o nome da mãe (ou do pai) entre dois documentos oficiais.
    - Nomes são considerados iguais mesmo com diferenças de maiúsculas/minúsculas, acentos ou espaços extras.
-   - Documentos que devem ter filiação: RG, Certidão de Nascimento (se presente), Reservista (se presente).
-   - Se houver discrepância significativa entre filiações de documentos oficiais (ex: RG e Certidão com nomes de mãe diferentes), é um ERRO.
-
-#### REGRAS DE VALIDAÇÃO DE DOCUMENTOS ESPECÍFICOS (Erros Bloqueantes)
-
-6. **RG Vencido:**
-   - Se fatos_especificos.rg.calculado_data_vencimento existir e for ANTERIOR à referencias_calculadas.data_hoje, é um ERRO.
-   - RG vencido não pode ser aceito para matrícula.
-
-7. **Comprovante de Residência Vencido:**
-   - PRIMEIRO, verifique se 'comprovante de residencia' está na lista fatos_especificos.documentos_enviados.
-   - Se NÃO estiver, ignore esta regra (OK/Não Aplicável).
-   - Se ESTIVER, verifique se fatos_especificos.comprovante_residencia.calculado_data_emissao existe e é ANTERIOR à referencias_calculadas.data_limite_comprovante_3_meses.
-   - Se o comprovante estiver vencido (mais de 3 meses), é um ERRO.
+   - Se houver discrepância significativa, é um ERRO.
 
 8. **Titularidade do Comprovante de Residência:**
-   - PRIMEIRO, verifique se 'comprovante de residencia' está na lista fatos_especificos.documentos_enviados.
-   - Se NÃO estiver, ignore esta regra (OK/Não Aplicável - comprovante não é obrigatório para pré-matrícula).
-   - Se ESTIVER, verifique se fatos_especificos.comprovante_residencia.titular_upper está na lista fatos_especificos.nomes_validos_titularidade.
-   - Nomes válidos incluem: candidato, mãe e pai (se presentes nos documentos).
-   - Se o titular NÃO estiver na lista de nomes válidos:
-     - Verifique se "documento do responsável" está na lista fatos_especificos.documentos_enviados.
-     - Se o documento do responsável NÃO estiver presente, é um ERRO.
-     - Se o documento do responsável ESTIVER presente, é um AVISO (requer análise humana para validar o vínculo).
-
-9. **Histórico Escolar - Certificação de Conclusão:**
-   - Verifique se fatos_especificos.historico_escolar.certificacao_conclusao existe e é True.
-   - Se o histórico escolar não tiver certificação de conclusão, é um ERRO.
-   - NOTA: Esta regra já foi validada no pré-requisito, mas confirme novamente.
-
-10. **Validação de Documentos Obrigatórios:**
-    - RG (ID 1) e Histórico Escolar (ID 3) são obrigatórios e já foram validados no pré-requisito.
-    - Se algum deles estiver ausente, é um ERRO (mas isso não deveria acontecer, pois o processo só roda se ambos estiverem aprovados).
-
-#### REGRAS DE AVISO (Não-Bloqueantes, mas importantes)
-
-11. **RG a Vencer:**
-    - Se fatos_especificos.rg.calculado_data_vencimento for POSTERIOR à referencias_calculadas.data_hoje, mas ANTERIOR à referencias_calculadas.data_limite_curso_4_anos, é um AVISO.
-    - O candidato precisará renovar o RG antes de se formar.
-
-12. **Documentos Opcionais Ausentes:**
-    - Se o candidato for do sexo masculino e não tiver Certificado de Reservista na lista fatos_especificos.documentos_enviados, é um AVISO (pode ser obrigatório dependendo da instituição).
-    - Se o candidato entrar pelo SISU/ENEM e não tiver Boletim do ENEM na lista fatos_especificos.documentos_enviados, é um AVISO.
-    - NOTA: Esta validação é informativa, pois não temos acesso ao sexo do candidato ou forma de ingresso no dossiê atual.
+   - O par compara o titular do comprovante (nome_a) com o nome mais próximo entre candidato, mãe e pai (nome_b).
+   - Se NÃO corresponder e "documento do responsável" NÃO estiver em documentos_enviados, é um ERRO.
+   - Se NÃO corresponder e o documento do responsável ESTIVER presente, é um AVISO (requer análise humana).
 
 13. **Inconsistências Menores:**
-    - Se houver pequenas variações de nome que não sejam erros (ex: abreviações aceitáveis), mas que mereçam atenção, gere um AVISO.
-
----
-### SUA TAREFA
-
-1. Analise cuidadosamente o "Dossiê de Fatos" do candidato.
-2. Aplique TODAS as regras acima que sejam aplicáveis aos documentos recebidos.
-   - Se um documento não foi enviado, ignore as regras específicas daquele documento.
-   - Se um documento foi enviado, valide todas as regras relacionadas a ele.
-3. Gere uma lista de findings (descobertas) para cada regra aplicável.
-   - Cada finding deve ter: tipo ("OK", "AVISO" ou "ERRO"), regra (número e nome), e detalhe (descrição clara).
-4. Tome uma decisao_final:
-   - 'pendente': se houver QUALQUER finding do tipo 'ERRO'.
-   - 'aprovado': se NÃO houver erros e todos os dados estiverem consistentes e em conformidade.
-5. Escreva uma observacao_final em português para o administrador:
-   - Se 'pendente': liste APENAS os motivos dos ERROS encontrados, de forma clara e objetiva.
-   - Se 'aprovado': liste APENAS os AVISOS (se houver). Se não houver avisos, escreva "Dados consistentes e pré-aprovados pela IA."
+   - Se houver pequenas variações de nome que não sejam erros (ex: abreviações aceitáveis), mas que mereçam atenção, gere um AVISO.
 
 ### FORMATO DE RESPOSTA
 
@@ -423,49 +422,138 @@ Responda APENAS em formato JSON válido com a estrutura:
 {{
     "findings": [
         {{"tipo": "OK", "regra": "Regra 1 - Consistência de Nome", "detalhe": "Todos os nomes estão consistentes entre os documentos."}},
-        {{"tipo": "ERRO", "regra": "Regra 2 - Consistência de CPF", "detalhe": "CPF do RG (12345678900) difere do CPF do ENEM (98765432100)."}},
-        {{"tipo": "AVISO", "regra": "Regra 11 - RG a Vencer", "detalhe": "RG vencerá em 2026, antes da conclusão do curso prevista para 2029."}}
-    ],
-    "decisao_final": "aprovado" | "pendente",
-    "observacao_final": "Texto descritivo em português para o administrador."
+        {{"tipo": "AVISO", "regra": "Regra 13 - Inconsistências Menores", "detalhe": "Nome abreviado no histórico escolar."}}
+    ]
 }}"""
-    
+
+
+def montar_dossie_nomes(fatos, pares_ambiguos):
+    """Recorte do dossiê com apenas os pares de nomes que a comparação local não decidiu"""
+    return {
+        "pares_ambiguos": pares_ambiguos,
+        "documentos_enviados": fatos["fatos_especificos"]["documentos_enviados"],
+    }
+
+
+def auditar_nomes_com_ia(fatos, pares_ambiguos):
     prompt_template = ChatPromptTemplate.from_messages([
-        ("system", prompt_regras),
-        ("user", "Por favor, audite o seguinte Dossiê de Fatos:\n\n{dossie}")
+        ("system", PROMPT_REGRAS_NOMES),
+        ("user", "Por favor, audite o seguinte Dossiê de Nomes:\n\n{dossie}")
     ])
-    
-    parser = JsonOutputParser()
-    chain = prompt_template | llm | parser
+    chain = prompt_template | obter_llm() | JsonOutputParser()
+
+    dossie_json = json.dumps(montar_dossie_nomes(fatos, pares_ambiguos), indent=2, ensure_ascii=False)
+    print(f"[DEBUG] Dossiê de nomes enviado para a IA: {dossie_json}")
 
-    print("\n" + "="*30 + " [DEBUG] DOSSIÊ DE FATOS ENVIADO PARA A IA " + "="*30)
-    print(dossie_json) 
-    print("\n" + "="* (60 + len(" [DEBUG] DOSSIÊ DE FATOS ENVIADO PARA A IA ")) + "\n")
-    
     try:
         result = chain.invoke({"dossie": dossie_json})
-        print(f"Decisão da IA: {result}")
-        return {
-            **state,
-            "final_status": result['decisao_final'],
-            "final_observation": result['observacao_final']
-        }
+        print(f"Findings da IA: {result}")
+        return result.get("findings", [])
     except Exception as e:
         print(f"Erro no nó de auditoria da IA: {e}")
-        return {
-            **state,
-            "final_status": "pendente",
-            "final_observation": f"Erro interno da IA ao auditar: {e}"
-        }
+        return [{**finding("ERRO", ", ".join(pares_ambiguos), f"Erro interno da IA ao auditar: {e}"), "erro_interno": True}]
+
+
+def run_ai_auditor(state: ValidationState):
+    """
+    Nó 4: Aplica as Regras de Negócio ao Dossiê de Fatos HARMONIZADO.
+    As comparações diretas rodam localmente; a IA só é chamada para pares de nomes ambíguos.
+    """
+    print("--- [Nó: run_ai_auditor] Auditando o dossiê harmonizado ---")
+    fatos = state['facts_dossier']
+
+    findings, pares_ambiguos, impressoes = auditar_localmente(state)
+
+    if pares_ambiguos:
+        print(f"Pares de nomes ambíguos, consultando a IA: {list(pares_ambiguos)}")
+        # A IA sempre reavalia a regra 13: os findings reaproveitados dela sairiam duplicados
+        findings = [f for f in findings if numero_regra(f) != "13"]
+        findings_ia = auditar_nomes_com_ia(fatos, pares_ambiguos)
+        findings += findings_ia
+    else:
+        findings_ia = []
+        print("Nomes resolvidos pela comparação local; IA não consultada.")
+
+    registrar_auditoria(state['matricula_id'], impressoes, findings, findings_ia)
+    return concluir_auditoria(state, findings)
+
+
+def auditar_localmente(state: ValidationState):
+    """
+    Avalia as regras locais, reaproveitando os findings da última auditoria da matrícula
+    para as regras cujas entradas não mudaram.
+    Retorna (findings, pares_ambiguos, impressões por regra).
+    """
+    fatos = state['facts_dossier']
+    impressoes = impressoes_regras(
+        state['documents_data'], state['candidate_data'], fatos['referencias_calculadas']['data_hoje']
+    )
+
+    impressoes_anteriores, findings_anteriores = (None, None)
+    if cache_auditoria:
+        impressoes_anteriores, findings_anteriores = cache_auditoria.obter(state['matricula_id'])
+
+    inalteradas = {
+        numero for numero, valor in impressoes.items()
+        if impressoes_anteriores and impressoes_anteriores.get(numero) == valor
+    }
+    if inalteradas:
+        print(f"Reaproveitando findings das regras inalteradas: {sorted(inalteradas, key=int)}")
+
+    ignorar = {int(numero) for numero in inalteradas}
+    findings = [f for numero in inalteradas for f in findings_anteriores.get(numero, [])]
+    findings += avaliar_regras(fatos, ignorar)
+    findings_nomes, pares_ambiguos = avaliar_regras_nomes(fatos, ignorar)
+    findings += findings_nomes
+    return findings, pares_ambiguos, impressoes
+
+
+def registrar_auditoria(matricula_id, impressoes, findings, findings_ia):
+    """Guarda impressões e findings; regras cuja consulta à IA falhou serão reavaliadas na próxima vez"""
+    if not cache_auditoria:
+        return
+    if any(f.get("erro_interno") for f in findings_ia):
+        impressoes = {numero: valor for numero, valor in impressoes.items() if numero not in ("1", "5", "8", "13")}
+    # Finding sem "Regra N" não entra em nenhum grupo: reaproveitar as impressões o perderia na próxima auditoria
+    sem_regra = [f.get("regra") for f in findings if not numero_regra(f)]
+    if sem_regra:
+        print(f"Findings sem número de regra {sem_regra}; a próxima auditoria reavaliará todas as regras.")
+        impressoes = {}
+    cache_auditoria.salvar(matricula_id, impressoes, agrupar_por_regra(findings))
+
+
+def documentos_a_reprovar(documents, findings):
+    """IDs dos documentos apontados pelos findings de ERRO das regras locais"""
+    nomes = {
+        nome.lower()
+        for f in findings if f["tipo"] == "ERRO"
+        for nome in f.get("documentos", []) if nome
+    }
+    return [doc["documento_id"] for doc in documents if doc["tipo_nome"].lower() in nomes]
+
+
+def concluir_auditoria(state: ValidationState, findings):
+    final_status, final_observation = decidir(findings)
+    documents_to_reject = documentos_a_reprovar(state['documents_data'], findings) if final_status == 'pendente' else []
+    print(f"Decisão da auditoria: {final_status} - {final_observation}")
+    if documents_to_reject:
+        print(f"Documentos a reprovar: {documents_to_reject}")
+    return {
+        **state,
+        "findings": findings,
+        "documents_to_reject": documents_to_reject,
+        "final_status": final_status,
+        "final_observation": final_observation
+    }
 
 def update_db_prereq_fail(state: ValidationState):
     print("--- [Nó: update_db_prereq_fail] Atualizando DB (Falha Prereq) ---")
     conn = get_db_connection()
     if not conn: return {**state, "final_status": "erro", "final_observation": "Falha DB"}
     
-    cursor = conn.cursor()
     query = "UPDATE matricula SET status_pre_matricula = 'pendente', motivo_pre_matricula = %s, data_atualizacao = NOW() WHERE id = %s"
     try:
+        cursor = conn.cursor()
         cursor.execute(query, (state['prereq_message'], state['matricula_id']))
         conn.commit()
     except Exception as e:
@@ -477,13 +565,24 @@ def update_db_prereq_fail(state: ValidationState):
     return {**state, "final_status": "pendente", "final_observation": state['prereq_message']}
 
 
+def reprovar_documentos(cursor, documento_ids, motivo):
+    """Reprova todos os documentos num único UPDATE"""
+    if not documento_ids:
+        return
+    query = f"""
+    UPDATE documento 
+    SET status_documento = 'reprovado',
+        motivo_erro = JSON_OBJECT('motivo', %s)
+    WHERE id IN ({", ".join(["%s"] * len(documento_ids))})
+    """
+    cursor.execute(query, (motivo, *documento_ids))
+
+
 def update_db_final_decision(state: ValidationState):
     print("--- [Nó: update_db_final_decision] Atualizando DB (Decisão Final da IA) ---")
     conn = get_db_connection()
     if not conn: return {**state, "final_status": "erro", "final_observation": "Falha DB"}
     
-    cursor = conn.cursor()
-    
     query = """
     UPDATE matricula 
     SET 
@@ -494,7 +593,7 @@ def update_db_final_decision(state: ValidationState):
     """
     
     try:
-        status_pre_matricula = state['final_status']
+        cursor = conn.cursor()
         # Sempre salva os comentários da IA em motivo_pre_matricula (não em observacoes)
         # observacoes é apenas para quando o admin aprova/reprova a MATRÍCULA final
         motivo_pre_matricula = state['final_observation'] if state['final_observation'] else None
@@ -504,19 +603,12 @@ def update_db_final_decision(state: ValidationState):
             motivo_pre_matricula,
             state['matricula_id']
         ))
+        
+        # Matrícula e documentos na mesma transação: ou as duas atualizações valem, ou nenhuma
+        if state['final_status'] == 'pendente':
+            reprovar_documentos(cursor, state.get('documents_to_reject') or [], state['final_observation'])
         conn.commit()
         print(f"Matrícula {state['matricula_id']} atualizada pela IA para: {state['final_status']}")
-        
-        if state['final_status'] == 'pendente' and state.get('documents_to_reject'):
-            for doc_id in state.get('documents_to_reject', []):
-                update_doc_query = """
-                UPDATE documento 
-                SET status_documento = 'reprovado',
-                    motivo_erro = JSON_OBJECT('motivo', %s)
-                WHERE id = %s
-                """
-                cursor.execute(update_doc_query, (state['final_observation'], doc_id))
-            conn.commit()
             
     except Exception as e:
         print(f"Erro DB: {e}")
@@ -539,33 +631,165 @@ def should_run_audit(state: ValidationState):
         print("Decisão: Ir para 'update_db_prereq_fail'")
         return "fail_prereq"
 
-# --- 5. Montagem do Grafo ---
+# --- 5. Verificação em Lote ---
+# Mesmo fluxo do grafo para várias matrículas: uma consulta, regras locais em sequência,
+# chamadas à IA em paralelo (limitadas) e uma única transação de escrita.
+
+VERIFY_LOTE_MAX = int(os.getenv("VERIFY_LOTE_MAX", "200"))
+VERIFY_LOTE_CONCORRENCIA_IA = int(os.getenv("VERIFY_LOTE_CONCORRENCIA_IA", "4"))
+
+
+def buscar_dados_em_lote(matricula_ids):
+    """
+    Retorna {matricula_id: estado inicial}, com os dados de todas as matrículas numa só consulta.
+    Matrículas inexistentes voltam com "erro" e ficam fora da verificação.
+    """
+    estados = {mid: {"matricula_id": mid, "candidate_data": None, "documents_data": None} for mid in matricula_ids}
+    marcadores = ", ".join(["%s"] * len(matricula_ids))
+
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Falha na conexão com o DB")
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"SELECT id FROM matricula WHERE id IN ({marcadores})", tuple(matricula_ids))
+        existentes = {row["id"] for row in cursor.fetchall()}
+        cursor.execute(CONSULTA_DOCUMENTOS_APROVADOS.format(ids=marcadores), tuple(matricula_ids))
+        linhas_por_matricula = {}
+        for row in cursor.fetchall():
+            linhas_por_matricula.setdefault(row["matricula_id"], []).append(row)
+    finally:
+        conn.close()
+
+    for mid in matricula_ids:
+        if mid not in existentes:
+            estados[mid] = {"matricula_id": mid, "erro": "Matrícula não encontrada"}
 
-print("Compilando o grafo da IA Auditora...")
-workflow = StateGraph(ValidationState)
+    for mid, linhas in linhas_por_matricula.items():
+        candidate_data, documents_data = montar_dados_matricula(linhas)
+        estados[mid].update({"candidate_data": candidate_data, "documents_data": documents_data})
+    return estados
 
-workflow.add_node("fetch_data", fetch_data)
-workflow.add_node("check_prerequisites", check_prerequisites)
-workflow.add_node("prepare_facts_for_ai", prepare_facts_for_ai) 
-workflow.add_node("run_ai_auditor", run_ai_auditor)           
-workflow.add_node("update_db_prereq_fail", update_db_prereq_fail)
-workflow.add_node("update_db_final_decision", update_db_final_decision)
 
-workflow.set_entry_point("fetch_data")
+def salvar_decisoes_em_lote(estados):
+    """Grava o status de pré-matrícula e as reprovações de todas as matrículas numa única transação"""
+    if not estados:
+        return
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Falha na conexão com o DB")
 
-workflow.add_edge("fetch_data", "check_prerequisites")
+    query = """
+    UPDATE matricula 
+    SET 
+        status_pre_matricula = %s,
+        motivo_pre_matricula = %s,
+        data_atualizacao = NOW() 
+    WHERE id = %s
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(query, [
+            (e["final_status"], e["final_observation"] or None, e["matricula_id"]) for e in estados
+        ])
+        for e in estados:
+            if e["final_status"] == "pendente":
+                reprovar_documentos(cursor, e.get("documents_to_reject") or [], e["final_observation"])
+        conn.commit()
+        print(f"{len(estados)} matrículas atualizadas em lote.")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def verificar_matriculas_em_lote(matricula_ids):
+    """Retorna {matricula_id: estado final} para uma lista de matrículas"""
+    matricula_ids = list(dict.fromkeys(matricula_ids))
+    print(f"--- [Lote] Verificando {len(matricula_ids)} matrículas ---")
+    estados = buscar_dados_em_lote(matricula_ids)
+
+    pendentes_ia = {}
+    for mid, estado in estados.items():
+        if estado.get("erro"):
+            continue
+        estado = check_prerequisites(estado)
+        if not estado["prereq_met"]:
+            estados[mid] = {**estado, "final_status": "pendente", "final_observation": estado["prereq_message"]}
+            continue
+
+        estado = prepare_facts_for_ai(estado)
+        findings, pares_ambiguos, impressoes = auditar_localmente(estado)
+        estados[mid] = {**estado, "findings": findings, "impressoes": impressoes}
+        if pares_ambiguos:
+            pendentes_ia[mid] = pares_ambiguos
+
+    if pendentes_ia:
+        print(f"[Lote] {len(pendentes_ia)} matrículas com nomes ambíguos, consultando a IA")
+        obter_llm()
+        with ThreadPoolExecutor(max_workers=VERIFY_LOTE_CONCORRENCIA_IA) as executor:
+            futuros = {
+                mid: executor.submit(auditar_nomes_com_ia, estados[mid]["facts_dossier"], pares)
+                for mid, pares in pendentes_ia.items()
+            }
+            for mid, futuro in futuros.items():
+                estados[mid]["findings_ia"] = futuro.result()
+                estados[mid]["findings"] += estados[mid]["findings_ia"]
+
+    for mid, estado in estados.items():
+        if estado.get("prereq_met"):
+            registrar_auditoria(mid, estado.pop("impressoes"), estado["findings"], estado.pop("findings_ia", []))
+            estados[mid] = concluir_auditoria(estado, estado["findings"])
+
+    salvar_decisoes_em_lote([estado for estado in estados.values() if not estado.get("erro")])
+    return estados
+
+
+# --- 6. Montagem do Grafo ---
+
+def montar_grafo():
+    print("Compilando o grafo da IA Auditora...")
+    workflow = StateGraph(ValidationState)
+
+    workflow.add_node("fetch_data", fetch_data)
+    workflow.add_node("check_prerequisites", check_prerequisites)
+    workflow.add_node("prepare_facts_for_ai", prepare_facts_for_ai)
+    workflow.add_node("run_ai_auditor", run_ai_auditor)
+    workflow.add_node("update_db_prereq_fail", update_db_prereq_fail)
+    workflow.add_node("update_db_final_decision", update_db_final_decision)
+
+    workflow.set_entry_point("fetch_data")
+
+    workflow.add_edge("fetch_data", "check_prerequisites")
+
+    workflow.add_conditional_edges(
+        "check_prerequisites",
+        should_run_audit,
+        {
+            "run_audit": "prepare_facts_for_ai",
+            "fail_prereq": "update_db_prereq_fail"
+        }
+    )
+
+    workflow.add_edge("prepare_facts_for_ai", "run_ai_auditor")
+    workflow.add_edge("run_ai_auditor", "update_db_final_decision")
+    workflow.add_edge("update_db_prereq_fail", END)
+    workflow.add_edge("update_db_final_decision", END)
+    return workflow.compile()
+
+
+def obter_grafo():
+    """Grafo compilado uma única vez por processo, mesmo com várias threads chamando ao mesmo tempo"""
+    global _grafo
+    if _grafo is None:
+        with _grafo_lock:
+            if _grafo is None:
+                obter_llm()
+                _grafo = montar_grafo()
+    return _grafo
 
-workflow.add_conditional_edges(
-    "check_prerequisites",
-    should_run_audit,
-    {
-        "run_audit": "prepare_facts_for_ai", 
-        "fail_prereq": "update_db_prereq_fail" 
-    }
-)
 
-workflow.add_edge("prepare_facts_for_ai", "run_ai_auditor")
-workflow.add_edge("run_ai_auditor", "update_db_final_decision")
-workflow.add_edge("update_db_prereq_fail", END)
-workflow.add_edge("update_db_final_decision", END)
-app = workflow.compile()
+def verificar_matricula(matricula_id):
+    """Executa o grafo e devolve o estado final"""
+    return obter_grafo().invoke({"matricula_id": matricula_id})
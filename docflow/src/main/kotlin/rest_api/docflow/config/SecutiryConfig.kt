@@ -48,6 +48,7 @@ class SecurityConfig(
                     .requestMatchers(HttpMethod.PATCH, "/api/candidatos/me/additional-info").permitAll()
                     .requestMatchers(HttpMethod.POST, "/api/auth/enviar-senha/**").permitAll()
                     .requestMatchers(HttpMethod.POST, "/api/documentos/atualizar-status").permitAll()
+                    .requestMatchers(HttpMethod.POST, "/api/documentos/atualizar-status/lote").permitAll()
                     .requestMatchers(HttpMethod.POST, "/api/admin/matriculas/processar-pendentes").permitAll()
                     .requestMatchers("/h2-console/**").permitAll()
                     .anyRequest().authenticated()
@@ -161,4 +161,31 @@ class DocumentoController(
             return ResponseEntity.badRequest().body(mapOf("erro" to e.message))
         }
     }
+
+    @PostMapping("/atualizar-status/lote")
+    fun atualizarStatusDocumentosEmLote(
+        @RequestBody requests: List<Map<String, Any>>
+    ): ResponseEntity<Any> {
+        val resultados = requests.map { request ->
+            try {
+                val documento = documentoService.atualizarStatusDocumento(
+                    documentoId = (request["documentoId"] as Number).toInt(),
+                    status = request["status"] as String,
+                    dadosExtraidos = request["dadosExtraidos"] as? String,
+                    motivoErro = request["motivoErro"] as? String
+                )
+                mapOf(
+                    "documentoId" to documento.id,
+                    "status" to documento.statusDocumento,
+                    "mensagem" to "Status atualizado com sucesso"
+                )
+            } catch (e: Exception) {
+                mapOf(
+                    "documentoId" to request["documentoId"],
+                    "erro" to e.message
+                )
+            }
+        }
+        return ResponseEntity.ok(resultados)
+    }
 }
\ No newline at end of file
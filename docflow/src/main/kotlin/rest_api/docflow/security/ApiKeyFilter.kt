@@ -18,7 +18,7 @@ class ApiKeyFilter(
         response: HttpServletResponse,
         filterChain: FilterChain
     ) {
-        if (request.requestURI == "/api/documentos/atualizar-status" && request.method == "POST") {
+        if (request.requestURI in ROTAS_PROTEGIDAS && request.method == "POST") {
             val providedApiKey = request.getHeader("X-API-Key")
             
             if (providedApiKey == null || providedApiKey != apiKey) {
@@ -30,4 +30,11 @@ class ApiKeyFilter(
         
         filterChain.doFilter(request, response)
     }
+
+    companion object {
+        private val ROTAS_PROTEGIDAS = setOf(
+            "/api/documentos/atualizar-status",
+            "/api/documentos/atualizar-status/lote"
+        )
+    }
 } 
\ No newline at end of file